@@ -7,3 +7,12 @@ DEBUG = True
 username = os.environ.get("MYSQL_USERNAME", 'root')
 password = os.environ.get("MYSQL_PASSWORD", 'root')
 db_address = os.environ.get("MYSQL_ADDRESS", '127.0.0.1:3306')
+# 完整的数据库连接串，设置后忽略以上三项 (例如本地用 SQLite 运行并发检查: sqlite:////tmp/counter.db)
+database_uri = os.environ.get("DATABASE_URI", 'mysql://{}:{}@{}/flask_demo'.format(username, password, db_address))
+
+# 计数器写回模式：自增先在内存中累加，每隔 COUNTER_FLUSH_INTERVAL 秒合并成一条 UPDATE 写入数据库。
+# 写入更少，但进程异常退出时会丢失最近未写入的自增，多实例部署时各实例返回的计数只包含本实例未写入的部分
+COUNTER_WRITE_BEHIND = os.environ.get("COUNTER_WRITE_BEHIND", "false").lower() == "true"
+COUNTER_FLUSH_INTERVAL = float(os.environ.get("COUNTER_FLUSH_INTERVAL", "1.0"))
+# GET /api/count 的缓存时间 (秒)，0 表示不缓存
+COUNTER_CACHE_TTL = float(os.environ.get("COUNTER_CACHE_TTL", "1.0"))
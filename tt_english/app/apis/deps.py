@@ -1,38 +1,53 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer # 用于从 Header 获取 token
-from sqlmodel import Session
 from jose import JWTError
 
-from app.core import security
+from app.core import auth_cache
 from app.core.config import settings
-from app.db.database import get_session
+from app.db.database import DbSession, get_db
 from app.db.models.user_model import User, TokenData
-from app.crud import user_crud
+from app.crud import async_user_crud
 
 # 定义 OAuth2PasswordBearer，它会从请求的 Authorization header 中提取 Bearer token
 # tokenUrl 只是一个形式上的参数，指向登录接口的URL，FastAPI用它来生成 OpenAPI 文档
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login") # 确保路径正确
 
 async def get_current_user(
-    db: Session = Depends(get_session), token: str = Depends(oauth2_scheme)
+    db: DbSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    openid = await security.verify_token_and_get_openid(token)
+    # 同一 token 在缓存有效期内不再重复解码
+    openid = auth_cache.resolve_openid(token)
     if openid is None:
         raise credentials_exception
-    
-    user = user_crud.get_user_by_openid(db, openid=openid)
+
+    user = auth_cache.get_user(openid)
+    if user is not None:
+        db.add(user) # 关联到本次请求的 Session，后续修改、提交与直接查询出的对象行为一致，不产生查询
+        return user
+
+    read_generation = auth_cache.generation()
+    user = await async_user_crud.get_user_by_openid(db, openid=openid)
     if user is None:
         raise credentials_exception
+    auth_cache.set_user(user, read_generation)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     # 这里可以添加用户是否激活的检查，如果需要的话
     # if not current_user.is_active:
     #     raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+# 简单的内部调用认证 (示例)，用于定时任务和运维接口
+INTERNAL_TRIGGER_TOKEN = settings.INTERNAL_TRIGGER_TOKEN # 复用一个密钥作为示例，生产环境应使用独立密钥
+
+def verify_internal_token(x_internal_trigger_token: Optional[str] = Header(None)):
+    if not x_internal_trigger_token or x_internal_trigger_token != INTERNAL_TRIGGER_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for internal action")
+    return True
@@ -1,23 +1,24 @@
 # app/apis/v1/event_router.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
 from datetime import date
 from typing import Optional
 
-from app.db.database import get_session
+from app.db.database import DbSession, get_db, maybe_await, run_sync
 from app.db.models.user_model import User
-from app.db.models.event_signup_model import EventSignupRead, EventStatusResponse
-from app.crud import event_signup_crud
-from app.apis.deps import get_current_active_user
+from app.db.models.event_signup_model import EventSignupRead, EventStatusResponse, SignupStatsResponse
+from app.crud import async_event_signup_crud
+from app.services import incremental_matching, signup_cache, signup_queue, signup_stats
+from app.apis.deps import get_current_active_user, verify_internal_token
 from app.utils import time_utils # 导入时间工具
 from app.core.config import settings # 导入配置
+from app.core.responses import json_response
 
 router = APIRouter()
 
 @router.post("/signup", response_model=EventSignupRead, status_code=status.HTTP_201_CREATED)
 async def signup_for_tonights_event(
     *,
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -33,16 +34,22 @@ async def signup_for_tonights_event(
         )
 
     today_date_local = now_local.date() # 获取本地日期的date对象
+    # 先取出，create_event_signup 提交后 current_user 会过期
+    user_id, eng_level, industry = current_user.id, current_user.eng_level, current_user.industry
+
+    if settings.SIGNUP_GROUP_COMMIT:
+        # 组提交：查重和写入都在批次中完成。先把本请求的连接还给连接池，等待批次期间不占用连接
+        await maybe_await(db.close())
+        try:
+            new_signup = await signup_queue.submit_signup(user_id, today_date_local)
+        except signup_queue.DuplicateSignupError:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="你今天已经报名过了。")
+        signup_cache.record_signup(new_signup)
+        signup_stats.record_signup(today_date_local, new_signup.id, eng_level, industry)
+        if settings.INCREMENTAL_MATCHING:
+            await run_sync(db, incremental_matching.record_signup, today_date_local, user_id, eng_level)
+        return new_signup
 
-    existing_signup = event_signup_crud.get_event_signup_by_user_and_date(
-        db, user_id=current_user.id, event_date=today_date_local
-    )
-    if existing_signup:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="你今天已经报名过了。"
-        )
-    
     # # 确保用户已填写英语水平
     # if current_user.english_level is None:
     #     raise HTTPException(
@@ -51,14 +58,24 @@ async def signup_for_tonights_event(
     #     )
     # # 也可以在这里检查行业信息是否已填写，如果需要的话
 
-    new_signup = event_signup_crud.create_event_signup(db, user=current_user, event_date=today_date_local)
+    # 插入与查重在同一条语句中完成，由 (user_id, event_date) 唯一约束保证并发重试也不会重复报名
+    new_signup = await async_event_signup_crud.create_event_signup(db, user=current_user, event_date=today_date_local)
+    if new_signup is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="你今天已经报名过了。"
+        )
+    signup_cache.record_signup(new_signup)
+    signup_stats.record_signup(today_date_local, new_signup.id, eng_level, industry)
+    if settings.INCREMENTAL_MATCHING:
+        await run_sync(db, incremental_matching.record_signup, today_date_local, user_id, eng_level)
     return new_signup
 
 
 @router.get("/status", response_model=EventStatusResponse)
 async def get_event_signup_status(
     *,
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_active_user) # 用户可能未登录也想看状态
 ):
     """
@@ -69,8 +86,12 @@ async def get_event_signup_status(
     user_signed_up_today = False
     signup_details_read = None
 
-    if current_user:
-        signup = event_signup_crud.get_event_signup_by_user_and_date(
+    if current_user and settings.TODAY_SIGNUP_CACHE:
+        # 当天的报名记录已缓存在内存中，不需要查询数据库
+        signup_details_read = await run_sync(db, signup_cache.get_user_signup, today_date_local, current_user.id)
+        user_signed_up_today = signup_details_read is not None
+    elif current_user:
+        signup = await async_event_signup_crud.get_event_signup_by_user_and_date(
             db, user_id=current_user.id, event_date=today_date_local
         )
         if signup:
@@ -80,7 +101,7 @@ async def get_event_signup_status(
             signup_details_read = EventSignupRead.model_validate(signup)
 
 
-    return EventStatusResponse(
+    response = EventStatusResponse(
         is_signup_open=is_open,
         user_signed_up_today=user_signed_up_today,
         signup_details=signup_details_read,
@@ -88,4 +109,15 @@ async def get_event_signup_status(
         signup_start_time_local=start_time_local.strftime("%H:%M"),
         signup_end_time_local=end_time_local.strftime("%H:%M"),
         local_timezone_name=settings.LOCAL_TIMEZONE
-    )
\ No newline at end of file
+    )
+    return json_response(response) if settings.FAST_JSON_RESPONSES else response
+
+
+@router.get("/stats", response_model=SignupStatsResponse, dependencies=[Depends(verify_internal_token)])
+async def get_signup_stats(db: DbSession = Depends(get_db)):
+    """
+    当晚报名的实时统计 (运维用，受内部令牌保护)：总人数、英语水平分布、行业分布和预计房间数。
+    数据来自内存中的计数器，频繁轮询也不会访问数据库。
+    """
+    today_date_local = time_utils.get_current_time_in_local_tz().date()
+    return (await run_sync(db, signup_stats.get_stats, today_date_local)).snapshot()
@@ -0,0 +1,19 @@
+# app/apis/v1/internal_router.py
+# 运维用的内部接口，受内部令牌保护
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.apis.deps import verify_internal_token
+from app.db.database import async_engine, engine
+from app.db.pool_metrics import PoolStatus, engines_status
+
+router = APIRouter()
+
+@router.get("/db-pool", response_model=Dict[str, Optional[PoolStatus]], dependencies=[Depends(verify_internal_token)])
+async def get_db_pool_status():
+    """
+    数据库连接池状态：sync 为匹配、组提交等使用的同步引擎，async 为 DATABASE_URL 使用异步驱动时接口使用的引擎。
+    checked_out 长时间接近 pool_size + max_overflow、wait_ms_max 或 timeouts 增长时应调大 DB_POOL_SIZE / DB_MAX_OVERFLOW。
+    """
+    return engines_status({"sync": engine, "async": async_engine})
@@ -1,33 +1,24 @@
 # app/apis/v1/match_router.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import date, timedelta
 from typing import Optional, List
 
-from app.db.database import get_session
+from app.db.database import DbSession, get_db, run_sync
 from app.db.models.user_model import User, UserRead # UserRead 用于 MyMatchResult
 from app.db.models.chat_room_model import ChatRoomRead # 用于管理员或调试接口
-from app.db.models.chat_room_participant_model import MyMatchResult # 导入我们定义好的响应模型
-from app.crud import match_crud, event_signup_crud # 确保导入 event_signup_crud
-from app.apis.deps import get_current_active_user
-from app.services.matching_service import MatchingService
+from app.db.models.chat_room_participant_model import MyMatchResult, RoomRoster # 导入我们定义好的响应模型
+from app.crud import async_match_crud
+from app.apis.deps import get_current_active_user, verify_internal_token
+from app.services import match_snapshots
 from app.core.config import settings # 用于获取 X-Internal-Auth-Token 等配置
+from app.core.responses import json_response
 from app.utils import time_utils # 用于获取当前本地日期
 
 router = APIRouter()
 
-# 简单的内部调用认证 (示例)
-INTERNAL_TRIGGER_TOKEN = settings.INTERNAL_TRIGGER_TOKEN # 复用一个密钥作为示例，生产环境应使用独立密钥
-
-def verify_internal_token(x_internal_trigger_token: Optional[str] = Header(None)):
-    if not x_internal_trigger_token or x_internal_trigger_token != INTERNAL_TRIGGER_TOKEN:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for internal action")
-    return True
-
-
 @router.post("/trigger", status_code=status.HTTP_200_OK, dependencies=[Depends(verify_internal_token)])
 async def trigger_matching_process(
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     # 可以接受一个可选的日期参数用于测试，否则使用当天日期
     event_date_str: Optional[str] = None # 格式 YYYY-MM-DD
 ):
@@ -56,19 +47,25 @@ async def trigger_matching_process(
             )
 
     # 检查当天是否已生成过匹配，避免重复执行 (MatchingService内部也做了检查)
-    if match_crud.check_if_matches_generated_for_date(db, event_dt):
+    if await async_match_crud.check_if_matches_generated_for_date(db, event_dt):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"{event_dt} 的匹配已经生成过。如需重新匹配，请先调用清理接口或手动清理。"
         )
 
-    matcher = MatchingService(db)
     try:
-        rooms_created = matcher.perform_matching(event_date=event_dt)
-        if rooms_created > 0:
-            return {"message": f"为日期 {event_dt} 成功创建了 {rooms_created} 个匹配房间。"}
+        # 匹配服务 (及 NumPy、匹配引擎) 只在触发匹配时才导入，不拖慢冷启动
+        from app.services.matching_service import MatchingService
+        # 匹配服务使用同步 crud，异步会话下通过 run_sync 执行
+        report = await run_sync(db, lambda session: MatchingService(session).perform_matching(event_date=event_dt))
+        if report.rooms_created > 0:
+            message = (
+                f"为日期 {event_dt} 成功创建了 {report.rooms_created} 个匹配房间"
+                f"（其中 {report.three_person_upgrades} 个三人房），{len(report.unmatched_user_ids)} 人轮空。"
+            )
         else:
-            return {"message": f"为日期 {event_dt} 未创建任何匹配房间 (可能用户不足或已匹配过)。"}
+            message = f"为日期 {event_dt} 未创建任何匹配房间 (可能用户不足或已匹配过)。"
+        return {"message": message, "report": report}
     except Exception as e:
         # 实际应用中应该更详细地记录错误
         print(f"匹配过程中发生错误: {e}")
@@ -78,7 +75,7 @@ async def trigger_matching_process(
 @router.get("/me", response_model=Optional[MyMatchResult]) # 用户可能当天没有匹配
 async def get_my_match_result(
     *,
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
     # 可选，查询特定日期的匹配，默认为当天
     event_date_str: Optional[str] = None # 格式 YYYY-MM-DD
@@ -96,21 +93,40 @@ async def get_my_match_result(
         now_local = time_utils.get_current_time_in_local_tz()
         query_date = now_local.date()
 
+    result = await _find_my_match(db, current_user.id, query_date)
+    return json_response(result) if settings.FAST_JSON_RESPONSES else result
+
+async def _find_my_match(db: DbSession, user_id: int, query_date: date) -> Optional[MyMatchResult]:
+    """查找用户在某天的匹配结果，没有匹配到房间时返回 None"""
     # 1. 检查用户当天是否报名了
-    # signup = event_signup_crud.get_event_signup_by_user_and_date(db, user_id=current_user.id, event_date=query_date)
+    # signup = event_signup_crud.get_event_signup_by_user_and_date(db, user_id=user_id, event_date=query_date)
     # if not signup:
     #     # 如果用户当天未报名，理论上不应该有匹配结果
     #     # 但如果匹配逻辑不依赖报名表（而是直接查用户），这里可以省略
     #     # 最好是，只有报名了才会被匹配
     #     return None # 或者返回特定提示，告知未报名
 
+    # 匹配完成时已为每个用户生成了结果：先查内存，再按 (user_id, event_date) 查 matchsnapshot 表
+    if settings.MATCH_SNAPSHOTS:
+        result = match_snapshots.get_cached(query_date, user_id)
+        if result is not None:
+            return result
+        if match_snapshots.is_complete(query_date):
+            return None # 本进程生成了当天的全部结果，缓存里没有就是没有匹配到房间
+        payload = await async_match_crud.get_match_snapshot(db, user_id=user_id, event_date=query_date)
+        if payload is not None:
+            result = MyMatchResult.model_validate_json(payload)
+            match_snapshots.remember(query_date, user_id, result)
+            return result
+        # 没有快照 (功能启用前的匹配，或快照生成失败) 时按原来的方式查询
+
     # 2. 获取用户的匹配房间
-    room = match_crud.get_user_match_for_date(db, user_id=current_user.id, event_date=query_date)
+    room = await async_match_crud.get_user_match_for_date(db, user_id=user_id, event_date=query_date)
     if not room:
         return None # 用户当天没有匹配到房间
 
     # 3. 获取房间内的所有参与者信息
-    participants_users = match_crud.get_participants_for_room(db, room_id=room.id)
+    participants_users = await async_match_crud.get_participants_for_room(db, room_id=room.id)
     
     # 将 User 对象转换为 UserRead 对象
     participants_read = [UserRead.model_validate(p_user) for p_user in participants_users]
@@ -122,11 +138,35 @@ async def get_my_match_result(
         participants=participants_read
     )
 
+@router.get("/me/roster", response_model=Optional[RoomRoster])
+async def get_my_room_roster(
+    *,
+    db: DbSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    event_date_str: Optional[str] = None # 格式 YYYY-MM-DD
+):
+    """
+    获取当前用户当天所在房间及成员的公开信息 (昵称、头像、行业、英语水平)，不含 about me 等内容。
+    开启 ROOM_PARTICIPANT_SNAPSHOT 时只读房间一行，否则为一条联表查询。
+    """
+    if event_date_str:
+        try:
+            query_date = date.fromisoformat(event_date_str)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="日期格式错误，请使用 YYYY-MM-DD")
+    else:
+        query_date = time_utils.get_current_time_in_local_tz().date()
+
+    roster = await async_match_crud.get_room_roster(
+        db, user_id=current_user.id, event_date=query_date, use_snapshot=settings.ROOM_PARTICIPANT_SNAPSHOT,
+    )
+    return json_response(roster) if settings.FAST_JSON_RESPONSES else roster
+
 # (可选) 清理接口，用于测试或特殊情况
 @router.delete("/cleanup/{event_date_str}", status_code=status.HTTP_200_OK, dependencies=[Depends(verify_internal_token)])
 async def cleanup_matches_for_date(
     event_date_str: str,
-    db: Session = Depends(get_session)
+    db: DbSession = Depends(get_db)
 ):
     """为指定日期清理所有匹配数据（房间和参与者）。"""
     try:
@@ -134,5 +174,6 @@ async def cleanup_matches_for_date(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="日期格式错误，请使用 YYYY-MM-DD")
     
-    deleted_count = match_crud.delete_matches_for_date(db, event_dt)
+    deleted_count = await async_match_crud.delete_matches_for_date(db, event_dt) # 同时删除该日期的匹配结果快照
+    match_snapshots.invalidate(event_dt)
     return {"message": f"为日期 {event_dt} 清理了 {deleted_count} 个匹配房间及其参与者。"}
\ No newline at end of file
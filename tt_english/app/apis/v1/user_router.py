@@ -1,12 +1,11 @@
 # import httpx # 这里不再直接需要 httpx 来调用微信接口
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Security
-from sqlmodel import Session
-
-from app.db.database import get_session
+from app.db.database import DbSession, get_db
 from app.db.models.user_model import User, UserCreate, UserRead, UserUpdate, Token, LoginRequest, OrigianlInfo
-from app.crud import user_crud
+from app.crud import async_user_crud
 from app.core import security
-# from app.core.config import settings # settings 现在由 wechat_service 内部使用
+from app.core.config import settings
+from app.core.responses import json_response
 from app.apis.deps import get_current_active_user
 
 # 导入微信服务
@@ -16,7 +15,7 @@ router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     login_data: LoginRequest = Body(...)
 ):
     # 1. 调用微信服务 (模拟或真实) 获取 openid
@@ -38,7 +37,7 @@ async def login_for_access_token(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"微信处理错误: {err_msg}")
 
     # 2. 根据 openid 查找或创建用户 (逻辑保持不变)
-    user = user_crud.get_user_by_openid(db, openid=openid)
+    user = await async_user_crud.get_user_by_openid(db, openid=openid)
     is_new_user = False
     if user:
         update_data = {}
@@ -47,52 +46,50 @@ async def login_for_access_token(
         if login_data.avatar_url and login_data.avatar_url != user.avatar_url:
             update_data["avatar_url"] = login_data.avatar_url
         if update_data:
-            user = user_crud.update_user(db=db, db_user=user, user_in_data=update_data)
+            user = await async_user_crud.update_user(db=db, db_user=user, user_in_data=update_data)
     else:
         user_in = UserCreate(
             openid=openid,
             nickname=login_data.nickname,
             avatar_url=login_data.avatar_url
         )
-        user = user_crud.create_user(db, user_in=user_in)
+        user = await async_user_crud.create_user(db, user_in=user_in)
         is_new_user = True
 
     # 3. 创建 access token (逻辑保持不变)
     access_token = security.create_access_token(data={"sub": openid})
 
-    return Token(
+    token = Token(
         access_token=access_token,
         token_type="bearer",
         user_info=UserRead.model_validate(user),
         is_new_user=is_new_user
     )
+    return json_response(token) if settings.FAST_JSON_RESPONSES else token
 
 # ... user_router.py 的其余部分 (PUT /me, GET /me) 保持不变 ...
 @router.put("/me", response_model=UserRead)
 async def update_user_me(
     *,
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     user_update_data: UserUpdate,
     current_user: User = Depends(get_current_active_user)
 ):
-    updated_user = user_crud.update_user(db=db, db_user=current_user, user_in_data=user_update_data.model_dump(exclude_unset=True))
+    updated_user = await async_user_crud.update_user(db=db, db_user=current_user, user_in_data=user_update_data.model_dump(exclude_unset=True))
     return UserRead.model_validate(updated_user)
 
 # 新用户填写英语水平和所在行业信息 仅仅调用一次
 @router.patch("/original", response_model=UserRead)
 async def get_original_user_info(
     *,
-    db: Session = Depends(get_session),
+    db: DbSession = Depends(get_db),
     oi: OrigianlInfo,
     current_user: User = Depends(get_current_active_user)
 ):
     oi_data = oi.model_dump(exclude_unset=True)
-    current_user.sqlmodel_update(oi_data)
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    return await async_user_crud.update_user_fields(db, current_user, oi_data)
 
 @router.get("/me", response_model=UserRead)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    return UserRead.model_validate(current_user)
\ No newline at end of file
+    user_read = UserRead.model_validate(current_user)
+    return json_response(user_read) if settings.FAST_JSON_RESPONSES else user_read
\ No newline at end of file
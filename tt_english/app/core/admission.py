@@ -0,0 +1,160 @@
+# app/core/admission.py
+# 突发流量下的准入控制 (ADMISSION_CONTROL)：报名窗口打开时小程序的重试风暴会在应用开始丢弃请求之前就压垮 MySQL。
+# 对 ADMISSION_PATHS 中的接口：
+#   1. 每个用户一个令牌桶 (按 token 对应的 openid，经 auth_cache 解析；登录接口、没有 token 或 token 无效时按客户端地址)，
+#      每秒补充 ADMISSION_RATE_PER_SECOND 个令牌，最多积攒 ADMISSION_BURST 个，没有令牌时返回 429。
+#      客户端地址取 X-Forwarded-For 中由可信代理追加的一项 (ADMISSION_TRUSTED_PROXY_HOPS)，伪造该请求头不能绕过限制；
+#      无法确定客户端地址 (代理没有传 X-Forwarded-For) 时不按令牌桶限制，只受并发上限约束，避免所有人共用一个桶；
+#   2. 全局并发上限 ADMISSION_MAX_CONCURRENCY，超出的请求最多排队 ADMISSION_QUEUE_TIMEOUT_MS 毫秒，
+#      排队数超过 ADMISSION_MAX_QUEUE 或等待超时返回 429。429 响应带 Retry-After。
+# 令牌桶保存在固定大小的数组中 (按 key 的哈希取槽位，不同用户偶尔共用一个桶)，内存占用固定，
+# 不需要清理过期条目：长时间没有请求的桶在下次访问时按时间补满，相当于自动过期。
+import asyncio
+import math
+import time
+from array import array
+from typing import Optional, Tuple
+
+from app.core import auth_cache
+from app.core.config import settings
+
+ADMISSION_PATHS = {
+    ("POST", "/api/v1/users/login"),
+    ("POST", "/api/v1/events/signup"),
+    ("GET", "/api/v1/matches/me"),
+}
+LOGIN_PATH = "/api/v1/users/login"
+
+
+class TokenBuckets:
+    """固定槽位数的令牌桶数组，每个槽位 16 字节 (令牌数 + 上次补充时间)"""
+
+    def __init__(self, slots: int, rate: float, burst: float):
+        self.mask = (1 << max(slots - 1, 1).bit_length()) - 1 # 槽位数取不小于 slots 的 2 的幂
+        self.rate = rate
+        self.burst = burst
+        self.tokens = array("d", [burst]) * (self.mask + 1)
+        self.updated = array("d", [0.0]) * (self.mask + 1)
+
+    def acquire(self, key, now: Optional[float] = None) -> float:
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic() if now is None else now
+        slot = hash(key) & self.mask
+        tokens = min(self.burst, self.tokens[slot] + (now - self.updated[slot]) * self.rate)
+        self.updated[slot] = now
+        if tokens >= 1:
+            self.tokens[slot] = tokens - 1
+            return 0.0
+        self.tokens[slot] = tokens
+        return (1 - tokens) / self.rate
+
+
+class AdmissionStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rejected_rate = 0   # 令牌桶拒绝
+        self.rejected_busy = 0   # 并发已满且排队超时 / 队列已满
+
+
+stats = AdmissionStats()
+
+
+class AdmissionMiddleware:
+    """纯 ASGI 中间件。参数默认取自 Settings，基准测试中可以直接传入"""
+
+    def __init__(
+        self, app, *, rate: Optional[float] = None, burst: Optional[int] = None, slots: Optional[int] = None,
+        max_concurrency: Optional[int] = None, queue_timeout_ms: Optional[int] = None, max_queue: Optional[int] = None,
+        trusted_proxy_hops: Optional[int] = None, paths=ADMISSION_PATHS,
+    ):
+        self.app = app
+        self.paths = paths
+        self.buckets = TokenBuckets(
+            slots or settings.ADMISSION_BUCKET_SLOTS,
+            rate or settings.ADMISSION_RATE_PER_SECOND,
+            burst or settings.ADMISSION_BURST,
+        )
+        self.max_concurrency = max_concurrency or settings.ADMISSION_MAX_CONCURRENCY
+        self.queue_timeout = (settings.ADMISSION_QUEUE_TIMEOUT_MS if queue_timeout_ms is None else queue_timeout_ms) / 1000
+        self.max_queue = settings.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+        self.trusted_proxy_hops = settings.ADMISSION_TRUSTED_PROXY_HOPS if trusted_proxy_hops is None else trusted_proxy_hops
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None # 在事件循环中第一次使用时创建
+
+    def _key(self, scope) -> Optional[Tuple[str, object]]:
+        """令牌桶的 key，无法识别客户端时返回 None"""
+        forwarded_for = []
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                forwarded_for.extend(value.split(b","))
+            elif name == b"authorization" and scope["path"] != LOGIN_PATH:
+                scheme, _, credentials = value.partition(b" ")
+                if scheme.lower() == b"bearer" and credentials:
+                    token = credentials.strip().decode("latin-1")
+        if token is not None:
+            openid = auth_cache.resolve_openid(token)
+            if openid is not None:
+                return "user", openid
+        # 登录请求、没有 token 或 token 无效 (随意构造的 token 不会各自得到一个新桶)
+        address = self._client_address(scope, forwarded_for)
+        return ("client", address) if address is not None else None
+
+    def _client_address(self, scope, forwarded_for):
+        if self.trusted_proxy_hops <= 0:
+            client = scope.get("client")
+            return client[0] if client else None
+        if not forwarded_for:
+            return None
+        # 每层代理在末尾追加它看到的对端地址，从右数第 trusted_proxy_hops 项由最外层的可信代理写入
+        return forwarded_for[-min(self.trusted_proxy_hops, len(forwarded_for))].strip()
+
+    async def _reject(self, scope, send, retry_after: float, detail: str) -> None:
+        scope["metrics_route"] = scope["path"] # ADMISSION_PATHS 都是不带参数的路径，即路由路径
+        body = ('{"detail":"%s"}' % detail).encode()
+        await send({
+            "type": "http.response.start", "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        key = self._key(scope)
+        wait = self.buckets.acquire(key) if key is not None else 0.0
+        if wait > 0:
+            stats.rejected_rate += 1
+            await self._reject(scope, send, wait, "请求过于频繁，请稍后再试")
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                stats.rejected_busy += 1
+                await self._reject(scope, send, 1, "服务繁忙，请稍后再试")
+                return
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                stats.rejected_busy += 1
+                await self._reject(scope, send, 1, "服务繁忙，请稍后再试")
+                return
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        stats.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
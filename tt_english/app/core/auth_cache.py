@@ -0,0 +1,116 @@
+# app/core/auth_cache.py
+# 认证缓存：每个需要登录的请求都要解码 JWT 并按 openid 查一次 User，高峰期 /events/status、/events/signup、
+# /matches/me 的大部分数据库查询都花在这里。这里缓存两层：token -> openid (不超过 token 本身的过期时间)，
+# openid -> 用户数据快照 (字段值的 dict)。每个请求从快照重建一个新的 User 对象，请求之间不共享 ORM 实例。
+# 用户资料写入 (update_user、PATCH /users/original) 时调用 invalidate_user 使快照失效；
+# 其他实例写入的变化，以及目前没有接口、直接在数据库中修改的 is_active，最多在 AUTH_CACHE_TTL_SECONDS 秒后生效。
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core import security
+from app.core.config import settings
+from app.db.models.user_model import User
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """容量有限的 LRU 缓存，每个条目有各自的过期时间 (time.monotonic)"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_tokens: TTLCache[str] = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+_users: TTLCache[Dict[str, Any]] = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+# 每次使快照失效时加一。查询用户前记下当前值，写入快照时如果期间发生过失效就放弃写入，
+# 避免写入前读到的旧数据在失效之后才被放进缓存
+_generation = 0
+
+
+def resolve_openid(token: str) -> Optional[str]:
+    """token -> openid：先查缓存，未命中时校验并解码 token 后写入缓存。token 无效或已过期时返回 None"""
+    openid = _tokens.get(token)
+    if openid is None:
+        payload = security.decode_access_token(token)
+        openid = payload.get("sub") if payload else None
+        if openid is not None:
+            set_openid(token, openid, payload.get("exp"))
+    return openid
+
+
+def set_openid(token: str, openid: str, expires_at: Optional[float] = None) -> None:
+    """expires_at 为 token 的 exp (Unix 时间戳)，缓存不会比 token 活得更久"""
+    _tokens.set(token, openid, None if expires_at is None else expires_at - time.time())
+
+
+def get_user(openid: str) -> Optional[User]:
+    """从快照重建一个 detached 的 User (带主键标识，加入 Session 后修改会生成 UPDATE 而不是 INSERT)"""
+    snapshot = _users.get(openid)
+    if snapshot is None:
+        return None
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def generation() -> int:
+    return _generation
+
+
+def set_user(user: User, read_generation: int) -> None:
+    if read_generation == _generation:
+        _users.set(user.openid, user.model_dump())
+
+
+def invalidate_user(openid: str) -> None:
+    global _generation
+    _generation += 1
+    _users.pop(openid)
+
+
+def clear() -> None:
+    _tokens.clear()
+    _users.clear()
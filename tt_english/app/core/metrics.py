@@ -0,0 +1,140 @@
+# app/core/metrics.py
+# 接口指标 (Prometheus 文本格式，/metrics)：每个路由的请求数 (按状态码)、延迟直方图，以及进行中的请求数。
+# 路由按路径模板 (例如 /api/v1/matches/me) 统计，未匹配到路由的请求 (404 等) 统一记为 <unmatched>，标签数量有上限。
+# 每个 (路由, 方法) 第一次出现时分配一个 RouteMetrics，之后每个请求只做计数器加一和一次 bisect，不分配标签字典。
+# 计数在事件循环线程中进行，不需要加锁。
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.core import admission
+from app.db.pool_metrics import PoolStatus
+
+# 延迟直方图的桶上限 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    __slots__ = ("method", "route", "bucket_counts", "latency_sum", "count", "status_counts")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1) # 最后一个是 +Inf (非累计，导出时累加)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.status_counts: Dict[int, int] = {}
+
+    def observe(self, status_code: int, elapsed: float) -> None:
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        self.latency_sum += elapsed
+        self.count += 1
+        self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {} # (路径模板, 方法) -> RouteMetrics
+        self.in_flight = 0
+
+    def route_metrics(self, scope) -> RouteMetrics:
+        route = scope.get("route")
+        # 在路由之前就返回响应的中间件 (例如准入控制返回 429) 可以在 scope["metrics_route"] 中给出路由路径
+        key = (route.path if route is not None else scope.get("metrics_route", UNMATCHED_ROUTE), scope["method"])
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(key[1], key[0])
+        return metrics
+
+    def reset(self) -> None:
+        self.routes.clear()
+        self.in_flight = 0
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件，记录每个 HTTP 请求的状态码和耗时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500 # 未发出响应就抛出异常时按 500 统计
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            # 路由在处理请求时写入 scope["route"]
+            registry.route_metrics(scope).observe(status_code, time.perf_counter() - started)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(pools: Optional[Dict[str, Optional[PoolStatus]]] = None) -> str:
+    """生成 Prometheus 文本格式的指标 (pools 为各引擎的连接池状态，见 pool_metrics.engines_status)"""
+    lines: List[str] = [
+        "# HELP http_requests_in_flight 正在处理的 HTTP 请求数",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {registry.in_flight}",
+        "# HELP http_requests_total HTTP 请求数",
+        "# TYPE http_requests_total counter",
+    ]
+    routes = sorted(registry.routes.values(), key=lambda m: (m.route, m.method))
+    for metrics in routes:
+        labels = f'method="{metrics.method}",route="{_escape(metrics.route)}"'
+        for status_code, count in sorted(metrics.status_counts.items()):
+            lines.append(f'http_requests_total{{{labels},status="{status_code}"}} {count}')
+    lines += [
+        "# HELP http_request_duration_seconds HTTP 请求耗时",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for metrics in routes:
+        labels = f'method="{metrics.method}",route="{_escape(metrics.route)}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, metrics.bucket_counts):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.latency_sum}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+    lines += [
+        "# HELP admission_requests_total 准入控制处理的请求数 (见 app.core.admission)",
+        "# TYPE admission_requests_total counter",
+        f'admission_requests_total{{result="admitted"}} {admission.stats.admitted}',
+        f'admission_requests_total{{result="rejected_rate"}} {admission.stats.rejected_rate}',
+        f'admission_requests_total{{result="rejected_busy"}} {admission.stats.rejected_busy}',
+    ]
+
+    pools = {name: status for name, status in (pools or {}).items() if status is not None}
+    for name, field, kind, help_text in (
+        ("db_pool_checked_out", "checked_out", "gauge", "已借出的数据库连接数"),
+        ("db_pool_overflow", "overflow", "gauge", "超出 pool_size 的连接数"),
+        ("db_pool_checkouts_total", "checkouts", "counter", "累计取连接次数"),
+        ("db_pool_timeouts_total", "timeouts", "counter", "累计取连接超时次数"),
+        ("db_pool_wait_seconds_total", "wait_ms_total", "counter", "累计取连接耗时"),
+    ):
+        if not pools:
+            break
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for engine_name, status in pools.items():
+            value = getattr(status, field)
+            lines.append(f'{name}{{engine="{engine_name}"}} {value / 1000 if field == "wait_ms_total" else value}')
+    return "\n".join(lines) + "\n"
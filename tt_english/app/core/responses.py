@@ -0,0 +1,25 @@
+# app/core/responses.py
+# 快速 JSON 响应：FastAPI 默认会把接口返回值按 response_model 再校验一次，转成 dict (jsonable_encoder) 后再用 json.dumps 编码。
+# 高频接口在 FAST_JSON_RESPONSES 开启时直接返回 json_response(模型实例)，由模型自带的 pydantic-core 序列化器 (类定义时已构建)
+# 一次生成 JSON 字节；其余接口使用 FastJSONResponse 作为默认响应类，省去最后一步 json.dumps。
+# 直接返回 Response 时 FastAPI 不再处理 response_model，返回的模型实例需要与声明的 response_model 一致 (用于文档)。
+from typing import Any, Optional
+
+import pydantic_core
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+class FastJSONResponse(JSONResponse):
+    """用 pydantic-core 编码的 JSONResponse (输出与 JSONResponse 相同：紧凑、不转义非 ASCII 字符)"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return pydantic_core.to_json(content, inf_nan_mode="null")
+
+
+def json_response(model: Optional[BaseModel], status_code: int = 200) -> Response:
+    """用模型自身的序列化器生成响应 (model 为 None 时返回 null)"""
+    body = b"null" if model is None else model.__pydantic_serializer__.to_json(model)
+    return Response(content=body, status_code=status_code, media_type="application/json")
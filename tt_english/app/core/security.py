@@ -20,13 +20,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def verify_token_and_get_openid(token: str) -> Optional[str]: # 改为 async 以便 FastAPI 依赖项中调用
+def decode_access_token(token: str) -> Optional[dict]:
+    """校验并解码 token，无效或已过期时返回 None"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        openid: Optional[str] = payload.get("sub") # 我们将用 openid 作为 subject
-        if openid is None:
-            return None
-        # token_data = TokenData(openid=openid) # 可以用 Pydantic 模型验证 payload 结构
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+async def verify_token_and_get_openid(token: str) -> Optional[str]: # 改为 async 以便 FastAPI 依赖项中调用
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    openid: Optional[str] = payload.get("sub") # 我们将用 openid 作为 subject
+    # token_data = TokenData(openid=openid) # 可以用 Pydantic 模型验证 payload 结构
     return openid
\ No newline at end of file
@@ -0,0 +1,36 @@
+# app/crud/async_event_signup_crud.py
+# event_signup_crud 中接口用到的函数的异步版本。db 可以是 AsyncSession 或同步 Session (见 database.get_db)。
+from datetime import date
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from app.crud.event_signup_crud import current_signup_time, insert_signup_ignore_duplicates
+from app.db.database import DbSession, maybe_await
+from app.db.models.event_signup_model import EventSignup
+from app.db.models.user_model import User
+
+async def create_event_signup(db: DbSession, user: User, event_date: date) -> Optional[EventSignup]:
+    """
+    报名：一条语句完成插入或查重，不需要预先查询。
+    用户当天已经报名过 (包括并发的重复请求) 时返回 None。
+    """
+    signup_time = current_signup_time()
+    print(f"报名时间：{signup_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    values = {"user_id": user.id, "event_date": event_date, "signup_time": signup_time}
+    try:
+        result = await maybe_await(db.exec(insert_signup_ignore_duplicates().values(**values)))
+        await maybe_await(db.commit())
+    except IntegrityError:
+        # 不支持 IGNORE 的数据库由唯一约束直接报错
+        await maybe_await(db.rollback())
+        return None
+    if result.rowcount != 1:
+        return None
+    # 新行的 id 直接取自 INSERT 的结果，不需要再 refresh
+    return EventSignup(id=result.lastrowid, **values)
+
+async def get_event_signup_by_user_and_date(db: DbSession, user_id: int, event_date: date) -> Optional[EventSignup]:
+    statement = select(EventSignup).where(EventSignup.user_id == user_id, EventSignup.event_date == event_date)
+    return (await maybe_await(db.exec(statement))).first()
@@ -0,0 +1,67 @@
+# app/crud/async_match_crud.py
+# match_crud 中接口用到的函数的异步版本。db 可以是 AsyncSession 或同步 Session (见 database.get_db)。
+# 生成匹配 (写入房间和参与者) 仍由 MatchingService 通过同步 crud 完成。
+from datetime import date
+from typing import List, Optional
+
+from sqlmodel import select
+
+from app.crud import match_crud
+from app.db.database import DbSession, maybe_await
+from app.db.models.chat_room_model import ChatRoom
+from app.db.models.chat_room_participant_model import ChatRoomParticipant, RoomRoster
+from app.db.models.match_snapshot_model import MatchSnapshot
+from app.db.models.user_model import User
+
+async def get_user_match_for_date(db: DbSession, user_id: int, event_date: date) -> Optional[ChatRoom]:
+    """获取用户在特定日期的匹配房间信息"""
+    statement = (
+        select(ChatRoom)
+        .join(ChatRoomParticipant, ChatRoom.id == ChatRoomParticipant.room_id)
+        .where(ChatRoomParticipant.user_id == user_id)
+        .where(ChatRoom.event_date == event_date)
+    )
+    return (await maybe_await(db.exec(statement))).first()
+
+async def get_participants_for_room(db: DbSession, room_id: int) -> List[User]:
+    """获取特定房间的所有参与用户信息"""
+    statement = (
+        select(User)
+        .join(ChatRoomParticipant, User.id == ChatRoomParticipant.user_id)
+        .where(ChatRoomParticipant.room_id == room_id)
+    )
+    return (await maybe_await(db.exec(statement))).all()
+
+async def get_room_roster(db: DbSession, user_id: int, event_date: date, use_snapshot: bool = True) -> Optional[RoomRoster]:
+    """获取用户在特定日期所在房间及成员的公开信息 (见 match_crud.get_room_roster)"""
+    if use_snapshot:
+        row = (await maybe_await(db.exec(match_crud.room_snapshot_statement(user_id, event_date)))).first()
+        if row is None:
+            return None
+        roster = match_crud.roster_from_snapshot(row)
+        if roster is not None:
+            return roster
+    rows = (await maybe_await(db.exec(match_crud.room_roster_statement(user_id, event_date)))).all()
+    return match_crud.roster_from_rows(rows)
+
+async def get_match_snapshot(db: DbSession, user_id: int, event_date: date) -> Optional[str]:
+    """读取预先生成的匹配结果 (MyMatchResult 的 JSON)"""
+    statement = select(MatchSnapshot.payload).where(MatchSnapshot.user_id == user_id, MatchSnapshot.event_date == event_date)
+    return (await maybe_await(db.exec(statement))).first()
+
+async def check_if_matches_generated_for_date(db: DbSession, event_date: date) -> bool:
+    """检查指定日期是否已生成过匹配"""
+    statement = select(ChatRoom.id).where(ChatRoom.event_date == event_date).limit(1)
+    return (await maybe_await(db.exec(statement))).first() is not None
+
+async def delete_matches_for_date(db: DbSession, event_date: date) -> int:
+    """删除指定日期的所有匹配房间和参与者记录 (用于重新匹配或清理)"""
+    room_ids = list((await maybe_await(db.exec(select(ChatRoom.id).where(ChatRoom.event_date == event_date)))).all())
+    await maybe_await(db.exec(MatchSnapshot.__table__.delete().where(MatchSnapshot.event_date == event_date)))
+    if not room_ids:
+        await maybe_await(db.commit())
+        return 0
+    await maybe_await(db.exec(ChatRoomParticipant.__table__.delete().where(ChatRoomParticipant.room_id.in_(room_ids))))
+    result = await maybe_await(db.exec(ChatRoom.__table__.delete().where(ChatRoom.id.in_(room_ids))))
+    await maybe_await(db.commit())
+    return result.rowcount
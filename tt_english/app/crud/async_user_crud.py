@@ -0,0 +1,41 @@
+# app/crud/async_user_crud.py
+# user_crud 中接口用到的函数的异步版本。db 可以是 AsyncSession 或同步 Session (见 database.get_db)。
+from typing import Optional
+
+from sqlmodel import select
+
+from app.core import auth_cache
+from app.db.database import DbSession, maybe_await
+from app.db.models.user_model import User, UserCreate
+
+async def get_user_by_openid(db: DbSession, openid: str) -> Optional[User]:
+    statement = select(User).where(User.openid == openid)
+    return (await maybe_await(db.exec(statement))).first()
+
+async def create_user(db: DbSession, user_in: UserCreate) -> User:
+    db_user = User.model_validate(user_in)
+    db.add(db_user)
+    await maybe_await(db.commit())
+    await maybe_await(db.refresh(db_user))
+    return db_user
+
+async def update_user(db: DbSession, db_user: User, user_in_data: dict) -> User:
+    for key, value in user_in_data.items():
+        if hasattr(db_user, key) and value is not None: # 确保字段存在且值不是None
+            setattr(db_user, key, value)
+    openid = db_user.openid # 提交后同步 Session 会让对象过期，提交后再读属性会多一次查询
+    db.add(db_user)
+    await maybe_await(db.commit())
+    auth_cache.invalidate_user(openid)
+    await maybe_await(db.refresh(db_user))
+    return db_user
+
+async def update_user_fields(db: DbSession, db_user: User, data: dict) -> User:
+    """按 data 更新用户字段 (值为 None 也会写入)"""
+    db_user.sqlmodel_update(data)
+    openid = db_user.openid # 提交后同步 Session 会让对象过期，提交后再读属性会多一次查询
+    db.add(db_user)
+    await maybe_await(db.commit())
+    auth_cache.invalidate_user(openid)
+    await maybe_await(db.refresh(db_user))
+    return db_user
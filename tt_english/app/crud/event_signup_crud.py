@@ -1,36 +1,65 @@
 # app/crud/event_signup_crud.py
 from datetime import date, datetime
-from typing import List, Optional
-from sqlmodel import Session, select
+from typing import List, Optional, Sequence, Set, Tuple
+from sqlmodel import Session, select, func
 from app.utils.time_utils import get_current_time_in_local_tz
 
 from app.db.models.event_signup_model import EventSignup, EventSignupCreate
 from app.db.models.user_model import User # 用于类型提示
 
-def create_event_signup(db: Session, user: User, event_date: date) -> EventSignup:
-    # 检查用户当天是否已报名 (理论上API层会做，但CRUD也可以加一道保险)
-    existing_signup = get_event_signup_by_user_and_date(db, user_id=user.id, event_date=event_date)
-    if existing_signup:
-        #TODO
-        # 可以选择抛出异常或返回现有报名信息，具体取决于业务逻辑
-        # 这里假设API层已经处理了重复报名，所以直接创建
-        # 或者在这里进行更严格的控制
-        pass
-
-    # 获取时间
-    # beijing_tz = zoneinfo.ZoneInfo(settings.LOCAL_TIMEZONE)
-    # beijing_time = datetime.datetime.now(beijing_tz)
-    print(f"报名时间：{get_current_time_in_local_tz().strftime('%Y-%m-%d %H:%M:%S')}")
-    db_signup = EventSignup(
-        user_id=user.id,
-        event_date=event_date,
-        signup_time=get_current_time_in_local_tz().strftime('%Y-%m-%d %H:%M:%S')
-        # english_level_at_signup=user.english_level # 如果需要快照
-    )
-    db.add(db_signup)
-    db.commit()
-    db.refresh(db_signup)
-    return db_signup
+def insert_signup_ignore_duplicates(table=EventSignup.__table__):
+    """
+    报名用的 INSERT：(user_id, event_date) 已存在时什么也不做而不是报错，由唯一约束保证不会重复报名。
+    MySQL 使用 INSERT IGNORE，SQLite 使用 INSERT OR IGNORE，插入与查重在同一条语句中完成。
+    """
+    return table.insert().prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+
+def current_signup_time() -> datetime:
+    """报名时间：本地时区的当前时间 (不带时区信息，精确到秒)"""
+    return get_current_time_in_local_tz().replace(tzinfo=None, microsecond=0)
+
+def bulk_create_event_signups(
+    db: Session, event_date: date, user_ids: Sequence[int], signup_time: datetime
+) -> Tuple[List[EventSignup], Set[int]]:
+    """
+    批量报名 (用于组提交)：一次查询找出已报名的用户，其余用户用一条多行 INSERT 写入并提交一次。
+    INSERT 忽略的行 (查询之后由其他请求写入) 计为已报名，不会当作本批新建的记录返回。
+    返回 (新建的报名记录, 已报名过的 user_id 集合)。
+    """
+    already_signed_up = set(db.exec(
+        select(EventSignup.user_id).where(EventSignup.event_date == event_date, EventSignup.user_id.in_(user_ids))
+    ).all())
+    new_user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in already_signed_up]
+    if not new_user_ids:
+        return [], already_signed_up
+
+    rows = [{"user_id": user_id, "event_date": event_date, "signup_time": signup_time} for user_id in new_user_ids]
+    try:
+        # 忽略重复行：查询之后才由其他请求写入的报名不会导致整批失败
+        result = db.exec(insert_signup_ignore_duplicates(), params=rows)
+        if result.rowcount == len(rows):
+            # 每一行都是本批写入的，在本事务中一定能读到。多行 INSERT 拿不到每行的自增 id，按 (event_date, user_id) 取回
+            signup_ids = dict(db.exec(
+                select(EventSignup.user_id, EventSignup.id)
+                .where(EventSignup.event_date == event_date, EventSignup.user_id.in_(new_user_ids))
+            ).all())
+            created = [EventSignup(id=signup_ids[row["user_id"]], **row) for row in rows]
+        else:
+            # 查询之后有其他请求或实例写入了其中某些用户的报名 (少见)，无法从整批的结果中区分哪些行是本批写入的：
+            # 回滚后逐行插入，按每行的 rowcount 判断，lastrowid 即新行的 id
+            db.rollback()
+            created = []
+            for row in rows:
+                result = db.exec(insert_signup_ignore_duplicates().values(**row))
+                if result.rowcount == 1:
+                    created.append(EventSignup(id=result.lastrowid, **row))
+                else:
+                    already_signed_up.add(row["user_id"])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created, already_signed_up
 
 def get_event_signup_by_user_and_date(db: Session, user_id: int, event_date: date) -> Optional[EventSignup]:
     statement = select(EventSignup).where(EventSignup.user_id == user_id, EventSignup.event_date == event_date)
@@ -41,6 +70,59 @@ def get_signups_for_date(db: Session, event_date: date) -> List[EventSignup]:
     statement = select(EventSignup).where(EventSignup.event_date == event_date)
     return db.exec(statement).all()
 
+def get_signup_ids_for_date(db: Session, event_date: date) -> List[int]:
+    return list(db.exec(select(EventSignup.id).where(EventSignup.event_date == event_date)).all())
+
+def get_signup_index_for_date(db: Session, event_date: date) -> List[Tuple[int, int, datetime]]:
+    """获取指定日期所有报名的 (user_id, 报名 id, 报名时间)，只查这三列"""
+    statement = select(EventSignup.user_id, EventSignup.id, EventSignup.signup_time).where(EventSignup.event_date == event_date)
+    return db.exec(statement).all()
+
+def count_signups_by_level_and_industry(db: Session, event_date: date) -> List[Tuple[Optional[int], Optional[str], int, int]]:
+    """按 (英语水平, 行业) 分组统计指定日期的报名人数，返回 (eng_level, industry, 人数, 组内最大的报名 id)"""
+    statement = (
+        select(User.eng_level, User.industry, func.count(), func.max(EventSignup.id))
+        .join(EventSignup, User.id == EventSignup.user_id)
+        .where(EventSignup.event_date == event_date)
+        .group_by(User.eng_level, User.industry)
+    )
+    return db.exec(statement).all()
+
+def get_signup_snapshots_for_date(db: Session, event_date: date) -> List[Tuple[int, int, datetime, Optional[int], Optional[str]]]:
+    """获取指定日期的报名及报名用户当前的英语水平、行业 (id, user_id, signup_time, eng_level, industry)，按报名先后排序 (用于归档)"""
+    statement = (
+        select(EventSignup.id, EventSignup.user_id, EventSignup.signup_time, User.eng_level, User.industry)
+        .join(User, User.id == EventSignup.user_id, isouter=True)
+        .where(EventSignup.event_date == event_date)
+        .order_by(EventSignup.signup_time, EventSignup.id)
+    )
+    return db.exec(statement).all()
+
+def get_event_dates_before(db: Session, before_date: date) -> List[date]:
+    """获取 before_date 之前仍有报名记录的活动日期 (升序)"""
+    statement = select(EventSignup.event_date).where(EventSignup.event_date < before_date).distinct().order_by(EventSignup.event_date)
+    return list(db.exec(statement).all())
+
+def delete_signups_by_ids(db: Session, signup_ids: Sequence[int]) -> int:
+    """按 id 删除报名记录 (不提交，由调用方分批提交)"""
+    result = db.exec(EventSignup.__table__.delete().where(EventSignup.id.in_(signup_ids)))
+    return result.rowcount
+
+def get_event_dates_in_range(db: Session, start_date: date, end_date: date) -> List[date]:
+    """获取日期区间 [start_date, end_date] 内有报名记录的活动日期 (升序)"""
+    statement = (
+        select(EventSignup.event_date)
+        .where(EventSignup.event_date >= start_date, EventSignup.event_date <= end_date)
+        .distinct()
+        .order_by(EventSignup.event_date)
+    )
+    return list(db.exec(statement).all())
+
+def count_signups_for_date(db: Session, event_date: date) -> int:
+    """统计指定日期的报名人数"""
+    statement = select(func.count()).select_from(EventSignup).where(EventSignup.event_date == event_date)
+    return db.exec(statement).one()
+
 def get_all_active_users_signed_up_for_date(db: Session, event_date: date) -> List[User]:
     """获取指定日期已报名的所有活跃用户信息 (用于匹配)"""
     # 这需要 EventSignup 和 User 之间的联接查询
@@ -52,4 +134,20 @@ def get_all_active_users_signed_up_for_date(db: Session, event_date: date) -> Li
         # 如果 User 有 is_active 字段: .where(User.is_active == True)
     )
     users = db.exec(statement).all()
-    return users
\ No newline at end of file
+    return users
+
+def get_matching_candidates_for_date(
+    db: Session, event_date: date, order_by_signup_time: bool = False
+) -> List[Tuple[int, int, Optional[str]]]:
+    """
+    获取指定日期已报名且填写了英语水平的用户 (id, eng_level, industry)，只查匹配需要的列。
+    默认按 id 排序保证结果可复现；order_by_signup_time 为 True 时按报名先后排序 (用于重放增量匹配)。
+    """
+    statement = (
+        select(User.id, User.eng_level, User.industry)
+        .join(EventSignup, User.id == EventSignup.user_id)
+        .where(EventSignup.event_date == event_date)
+        .where(User.eng_level != None)  # noqa: E711
+        .order_by(*((EventSignup.signup_time, EventSignup.id) if order_by_signup_time else (User.id,)))
+    )
+    return [tuple(row) for row in db.exec(statement).all()]
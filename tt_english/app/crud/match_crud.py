@@ -1,11 +1,15 @@
 # app/crud/match_crud.py
 from datetime import date, datetime
-from typing import List, Optional, Sequence
+import json
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
+import uuid
 
 from app.db.models.chat_room_model import ChatRoom, ChatRoomCreate
-from app.db.models.chat_room_participant_model import ChatRoomParticipant, ChatRoomParticipantCreate
-from app.db.models.user_model import User # 用于类型提示
+from app.db.models.chat_room_participant_model import ChatRoomParticipant, ChatRoomParticipantCreate, RoomRoster, RosterParticipant
+from app.db.models.match_snapshot_model import MatchSnapshot
+from app.db.models.user_model import User, UserRead # 用于类型提示
 
 def create_chat_room(db: Session, event_date: date, room_type: Optional[str] = None) -> ChatRoom:
     room_create = ChatRoomCreate(event_date=event_date, room_type=room_type)
@@ -24,6 +28,73 @@ def add_participant_to_room(db: Session, room_id: int, user_id: int) -> ChatRoom
     db.refresh(db_participant)
     return db_participant
 
+def room_type_for_size(size: int) -> str:
+    return f"{size}-person"
+
+# 房间成员列表返回的用户列 (RosterParticipant 的字段)
+ROSTER_USER_COLUMNS = (User.id, User.nickname, User.avatar_url, User.industry, User.eng_level)
+ROSTER_FIELDS = tuple(column.key for column in ROSTER_USER_COLUMNS)
+
+def get_roster_participants(db: Session, user_ids: Sequence[int], chunk_size: int = 5000) -> dict:
+    """按 id 批量读取用户的公开信息，返回 user_id -> RosterParticipant 字段的 dict"""
+    user_ids = list(user_ids)
+    participants = {}
+    for start in range(0, len(user_ids), chunk_size):
+        statement = select(*ROSTER_USER_COLUMNS).where(User.id.in_(user_ids[start:start + chunk_size]))
+        participants.update((row.id, dict(row._mapping)) for row in db.connection().execute(statement))
+    return participants
+
+def bulk_create_rooms(db: Session, event_date: date, room_groups: Sequence[Sequence[int]], with_participant_snapshot: bool = False) -> int:
+    """
+    在同一个事务中批量创建房间及其参与者 (用于匹配)。
+    room_groups 中每个元素是一个房间的用户 id 列表，房间类型按人数确定。
+    with_participant_snapshot 为 True 时多一次用户查询，把成员的公开信息写入 ChatRoom.participant_snapshot。
+    全部写入成功才提交，任何一步失败都会回滚，不会留下半成品的匹配结果。
+    返回创建的房间数量。
+    """
+    if not room_groups:
+        return 0
+
+    now = datetime.utcnow()
+    identifiers = [str(uuid.uuid4()) for _ in room_groups]
+    room_rows = [
+        {
+            "event_date": event_date,
+            "room_identifier": identifier,
+            "created_at": now,
+            "room_type": room_type_for_size(len(group)),
+        }
+        for identifier, group in zip(identifiers, room_groups)
+    ]
+    try:
+        if with_participant_snapshot:
+            participants = get_roster_participants(db, [user_id for group in room_groups for user_id in group])
+            for row, group in zip(room_rows, room_groups):
+                row["participant_snapshot"] = json.dumps(
+                    [participants[user_id] for user_id in group if user_id in participants], ensure_ascii=False, separators=(",", ":"),
+                )
+        # 以参数列表执行 (executemany)：语句只编译一次，由 SQLAlchemy/驱动合并为多行 INSERT 分批发送
+        db.exec(ChatRoom.__table__.insert(), params=room_rows)
+
+        # 多行 INSERT 拿不到每行的自增 id，用一次查询按 room_identifier 取回
+        id_rows = db.exec(
+            select(ChatRoom.room_identifier, ChatRoom.id).where(ChatRoom.event_date == event_date)
+        ).all()
+        room_ids = dict(id_rows)
+
+        participant_rows = [
+            {"room_id": room_ids[identifier], "user_id": user_id, "joined_at": now}
+            for identifier, group in zip(identifiers, room_groups)
+            for user_id in group
+        ]
+        db.exec(ChatRoomParticipant.__table__.insert(), params=participant_rows)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(room_rows)
+
 def get_user_match_for_date(db: Session, user_id: int, event_date: date) -> Optional[ChatRoom]:
     """获取用户在特定日期的匹配房间信息"""
     statement = (
@@ -45,6 +116,131 @@ def get_participants_for_room(db: Session, room_id: int) -> List[User]:
     users = db.exec(statement).all()
     return users
 
+def room_snapshot_statement(user_id: int, event_date: date):
+    """用户在某天所在房间的一行 (room_identifier, event_date, room_type, participant_snapshot)"""
+    return (
+        select(ChatRoom.room_identifier, ChatRoom.event_date, ChatRoom.room_type, ChatRoom.participant_snapshot)
+        .join(ChatRoomParticipant, ChatRoom.id == ChatRoomParticipant.room_id)
+        .where(ChatRoomParticipant.user_id == user_id, ChatRoom.event_date == event_date)
+        .limit(1)
+    )
+
+def room_roster_statement(user_id: int, event_date: date):
+    """
+    用户在某天所在房间及全部成员的公开信息，一条语句：用户的参与记录 -> 房间 -> 房间的所有参与记录 -> 用户。
+    每个成员一行 (room_identifier, event_date, room_type, 用户列...)，按加入顺序排列
+    """
+    me = aliased(ChatRoomParticipant)
+    member = aliased(ChatRoomParticipant)
+    return (
+        select(ChatRoom.room_identifier, ChatRoom.event_date, ChatRoom.room_type, *ROSTER_USER_COLUMNS)
+        .select_from(me)
+        .join(ChatRoom, ChatRoom.id == me.room_id)
+        .join(member, member.room_id == ChatRoom.id)
+        .join(User, User.id == member.user_id)
+        .where(me.user_id == user_id, ChatRoom.event_date == event_date)
+        .order_by(member.id)
+    )
+
+def roster_from_snapshot(row) -> Optional[RoomRoster]:
+    """由 room_snapshot_statement 的结果行构造 RoomRoster，房间没有成员快照时返回 None"""
+    room_identifier, event_date, room_type, participant_snapshot = row
+    if participant_snapshot is None:
+        return None
+    return RoomRoster(
+        room_identifier=room_identifier, event_date=event_date, room_type=room_type,
+        participants=[RosterParticipant(**participant) for participant in json.loads(participant_snapshot)],
+    )
+
+def roster_from_rows(rows) -> Optional[RoomRoster]:
+    """由 room_roster_statement 的结果行构造 RoomRoster，用户当天没有房间时返回 None"""
+    if not rows:
+        return None
+    room_identifier, event_date, room_type = rows[0][:3]
+    return RoomRoster(
+        room_identifier=room_identifier, event_date=event_date, room_type=room_type,
+        participants=[RosterParticipant(**dict(zip(ROSTER_FIELDS, row[3:]))) for row in rows],
+    )
+
+def get_room_roster(db: Session, user_id: int, event_date: date, use_snapshot: bool = True) -> Optional[RoomRoster]:
+    """
+    获取用户在特定日期所在房间及成员的公开信息。
+    use_snapshot 时先读房间一行上的成员快照，没有快照 (未开启或开启前创建的房间) 时再用一条联表查询
+    """
+    if use_snapshot:
+        row = db.exec(room_snapshot_statement(user_id, event_date)).first()
+        if row is None:
+            return None
+        roster = roster_from_snapshot(row)
+        if roster is not None:
+            return roster
+    return roster_from_rows(db.exec(room_roster_statement(user_id, event_date)).all())
+
+def get_room_memberships_in_range(db: Session, start_date: date, end_date: date) -> List[Tuple[int, int]]:
+    """获取日期区间 [start_date, end_date] 内所有房间的 (room_id, user_id) (不保证顺序)"""
+    statement = (
+        select(ChatRoomParticipant.room_id, ChatRoomParticipant.user_id)
+        .join(ChatRoom, ChatRoom.id == ChatRoomParticipant.room_id)
+        .where(ChatRoom.event_date >= start_date, ChatRoom.event_date <= end_date)
+    )
+    # 行数可达数百万，直接在连接上执行，省去 ORM 对每行结果的处理
+    return db.connection().execute(statement).all()
+
+def get_room_snapshots_for_date(db: Session, event_date: date) -> List[Tuple[int, str, Optional[str], datetime, Optional[int], Optional[datetime]]]:
+    """
+    获取指定日期所有房间及其成员 (room_id, room_identifier, room_type, created_at, user_id, joined_at)，
+    按 room_id 排序，同一房间的成员相邻，没有成员的房间 user_id 为 None (用于归档)
+    """
+    statement = (
+        select(
+            ChatRoom.id, ChatRoom.room_identifier, ChatRoom.room_type, ChatRoom.created_at,
+            ChatRoomParticipant.user_id, ChatRoomParticipant.joined_at,
+        )
+        .join(ChatRoomParticipant, ChatRoom.id == ChatRoomParticipant.room_id, isouter=True)
+        .where(ChatRoom.event_date == event_date)
+        .order_by(ChatRoom.id, ChatRoomParticipant.id)
+    )
+    return db.exec(statement).all()
+
+def get_match_dates_before(db: Session, before_date: date) -> List[date]:
+    """获取 before_date 之前仍有匹配房间的活动日期 (升序)"""
+    statement = select(ChatRoom.event_date).where(ChatRoom.event_date < before_date).distinct().order_by(ChatRoom.event_date)
+    return list(db.exec(statement).all())
+
+def get_room_ids_for_date(db: Session, event_date: date) -> List[int]:
+    return list(db.exec(select(ChatRoom.id).where(ChatRoom.event_date == event_date)).all())
+
+def delete_rooms_by_ids(db: Session, room_ids: Sequence[int]) -> int:
+    """按 id 删除房间及其参与者 (不提交，由调用方分批提交)"""
+    db.exec(ChatRoomParticipant.__table__.delete().where(ChatRoomParticipant.room_id.in_(room_ids)))
+    result = db.exec(ChatRoom.__table__.delete().where(ChatRoom.id.in_(room_ids)))
+    return result.rowcount
+
+def get_users_read(db: Session, user_ids: Sequence[int], chunk_size: int = 5000) -> List[UserRead]:
+    """按 id 批量读取用户的 UserRead 数据 (只取列，不构造 ORM 对象)"""
+    user_ids = list(user_ids)
+    users = []
+    for start in range(0, len(user_ids), chunk_size):
+        statement = select(*User.__table__.columns).where(User.id.in_(user_ids[start:start + chunk_size]))
+        users.extend(UserRead.model_validate(dict(row._mapping)) for row in db.connection().execute(statement))
+    return users
+
+def bulk_create_match_snapshots(db: Session, rows: Sequence[dict]) -> int:
+    """批量写入匹配结果快照 (user_id, event_date, payload) 并提交"""
+    if rows:
+        db.exec(MatchSnapshot.__table__.insert(), params=list(rows))
+    db.commit()
+    return len(rows)
+
+def get_match_snapshot(db: Session, user_id: int, event_date: date) -> Optional[str]:
+    statement = select(MatchSnapshot.payload).where(MatchSnapshot.user_id == user_id, MatchSnapshot.event_date == event_date)
+    return db.exec(statement).first()
+
+def delete_match_snapshots_for_date(db: Session, event_date: date) -> int:
+    """删除指定日期的匹配结果快照 (不提交)"""
+    result = db.exec(MatchSnapshot.__table__.delete().where(MatchSnapshot.event_date == event_date))
+    return result.rowcount
+
 def check_if_matches_generated_for_date(db: Session, event_date: date) -> bool:
     """检查指定日期是否已生成过匹配"""
     statement = select(ChatRoom).where(ChatRoom.event_date == event_date).limit(1)
@@ -56,7 +252,9 @@ def delete_matches_for_date(db: Session, event_date: date) -> int:
     # 获取当天所有房间ID
     rooms_stmt = select(ChatRoom.id).where(ChatRoom.event_date == event_date)
     room_ids_result = db.exec(rooms_stmt).all()
+    delete_match_snapshots_for_date(db, event_date)
     if not room_ids_result:
+        db.commit()
         return 0
     
     room_ids = [r_id for r_id in room_ids_result] # 解包元组
@@ -1,6 +1,7 @@
 from sqlmodel import Session, select
 from typing import Optional
 
+from app.core import auth_cache
 from app.db.models.user_model import User, UserCreate
 
 def get_user_by_openid(db: Session, openid: str) -> Optional[User]:
@@ -19,8 +20,10 @@ def update_user(db: Session, db_user: User, user_in_data: dict) -> User:
     for key, value in user_in_data.items():
         if hasattr(db_user, key) and value is not None: # 确保字段存在且值不是None
             setattr(db_user, key, value)
+    openid = db_user.openid # 提交后对象会过期，提交后再读属性会多一次查询
     db.add(db_user)
     db.commit()
+    auth_cache.invalidate_user(openid)
     db.refresh(db_user)
     return db_user
 
@@ -32,6 +35,7 @@ def update_introduction_by_openid(db: Session, openid: str, changed_introduction
     user.introduction = changed_introduction
     db.add(user)
     db.commit()
+    auth_cache.invalidate_user(openid)
     db.refresh(user)
     return user
     
@@ -1,9 +1,54 @@
+import inspect
+from typing import Any, Callable, Optional, Union
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
+from app.db import query_stats
+from app.db.pool_metrics import MeteredAsyncQueuePool, MeteredQueuePool
+
+# DATABASE_URL 使用异步驱动 (sqlite+aiosqlite://、mysql+aiomysql://、mysql+asyncmy://，分别对应 pyproject.toml 中的
+# async-sqlite、async-mysql、async-asyncmy 可选依赖) 时，
+# 接口请求使用异步引擎和 AsyncSession，查询期间不阻塞事件循环；
+# 匹配、组提交、归档和各种离线工具仍使用同步引擎，连接串由异步连接串换成对应的同步驱动得到。
+ASYNC_TO_SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "mysql+aiomysql": "mysql+mysqlconnector",
+    "mysql+asyncmy": "mysql+mysqlconnector",
+}
+
+database_url = make_url(settings.DATABASE_URL)
+USE_ASYNC_DB = database_url.drivername in ASYNC_TO_SYNC_DRIVERS
+sync_database_url = database_url.set(drivername=ASYNC_TO_SYNC_DRIVERS[database_url.drivername]) if USE_ASYNC_DB else database_url
 
 engine_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-engine = create_engine(settings.DATABASE_URL, echo=True, connect_args=engine_args) # echo=True 用于开发时打印SQL语句
+
+def pool_args(pool_class) -> dict:
+    """连接池配置 (见 Settings 中的 DB_POOL_*)。内存 SQLite 每个连接是独立的数据库，保持默认的连接池"""
+    if database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(
+    sync_database_url, echo=settings.SQL_ECHO, connect_args=engine_args, **pool_args(MeteredQueuePool),
+) # SQL_ECHO 用于开发时打印SQL语句
+async_engine: Optional[AsyncEngine] = (
+    create_async_engine(database_url, echo=settings.SQL_ECHO, **pool_args(MeteredAsyncQueuePool)) if USE_ASYNC_DB else None
+)
+# 按请求统计语句数、数据库耗时和慢查询
+query_stats.install(engine)
+if async_engine is not None:
+    query_stats.install(async_engine.sync_engine)
 
 def create_db_and_tables():
     # 在应用启动时可以调用此函数创建表 (对于开发环境)
@@ -12,8 +57,65 @@ def create_db_and_tables():
     from app.db.models import user_model, event_signup_model
     from app.db.models import chat_room_model
     from app.db.models import chat_room_participant_model
+    from app.db.models import match_snapshot_model
     SQLModel.metadata.create_all(engine)
+    # create_all 不会给已存在的表加列，这里补上后来新增的可空列
+    from sqlalchemy import inspect
+    if "participant_snapshot" not in {column["name"] for column in inspect(engine).get_columns("chatroom")}:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE chatroom ADD COLUMN participant_snapshot TEXT")
+    ensure_signup_unique_constraint()
+
+def ensure_signup_unique_constraint():
+    """
+    报名依赖 (user_id, event_date) 唯一约束查重 (INSERT IGNORE)，create_all 不会给已存在的表加约束。
+    缺少时补建唯一索引；表中已有重复报名导致无法建立时直接报错，不带着会接受重复报名的表结构启动。
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.exc import IntegrityError
+    columns = {"user_id", "event_date"}
+    inspector = inspect(engine)
+    if any(set(constraint["column_names"]) == columns for constraint in inspector.get_unique_constraints("eventsignup")):
+        return
+    if any(index["unique"] and set(index["column_names"]) == columns for index in inspector.get_indexes("eventsignup")):
+        return
+    try:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("CREATE UNIQUE INDEX uq_eventsignup_user_date ON eventsignup (user_id, event_date)")
+    except IntegrityError as e:
+        raise RuntimeError(
+            "eventsignup 表缺少 (user_id, event_date) 唯一约束，且已有重复报名，无法自动添加。"
+            "请先清理重复数据再重启，否则报名接口会接受重复报名。"
+        ) from e
+    print("已为 eventsignup 添加唯一索引 uq_eventsignup_user_date")
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_db():
+    """接口使用的数据库会话：异步引擎时为 AsyncSession，否则为同步 Session"""
+    if async_engine is None:
+        with Session(engine) as session:
+            yield session
+        return
+    # 提交后不让对象过期：异步会话中访问过期属性会触发隐式的同步加载而报错
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+DbSession = Union[Session, AsyncSession]
+
+async def maybe_await(value: Any) -> Any:
+    """AsyncSession 的 exec / commit / refresh 等返回协程，同步 Session 直接返回结果，两种会话可以用同一份代码"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+async def run_sync(db: DbSession, fn: Callable, *args, **kwargs) -> Any:
+    """
+    在会话上调用同步函数 fn(session, *args, **kwargs) (例如同步 crud、匹配服务、进程内缓存的加载)。
+    AsyncSession 通过 run_sync 执行，其中的查询仍由异步驱动完成，不阻塞事件循环。
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
@@ -1,6 +1,7 @@
 # app/db/models/chat_room_model.py
 from datetime import datetime, date
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import Column, Text
 from sqlmodel import Field, SQLModel, Relationship
 import uuid # 用于生成唯一的房间标识
 
@@ -19,6 +20,9 @@ class ChatRoomBase(SQLModel):
 
 class ChatRoom(ChatRoomBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    # 匹配时写入的成员公开信息 (RosterParticipant 列表的 JSON)，读取房间成员时只需读这一行；
+    # 未开启 ROOM_PARTICIPANT_SNAPSHOT 时为空。是匹配时的快照，之后用户修改资料不会更新
+    participant_snapshot: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
 
     # 关系：一个聊天室可以有多个参与者
     participants: List["ChatRoomParticipant"] = Relationship(back_populates="room")
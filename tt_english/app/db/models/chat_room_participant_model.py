@@ -42,4 +42,19 @@ class MyMatchResult(SQLModel):
     room_identifier: str
     event_date: date
     room_type: Optional[str] = None
-    participants: List["UserRead"]
\ No newline at end of file
+    participants: List["UserRead"]
+
+# 房间成员的公开信息 (不含 openid、introduction 等)
+class RosterParticipant(SQLModel):
+    id: int
+    nickname: Optional[str] = None
+    avatar_url: Optional[str] = None
+    industry: Optional[str] = None
+    eng_level: Optional[int] = None
+
+# 房间及其成员列表，由一次查询得到
+class RoomRoster(SQLModel):
+    room_identifier: str
+    event_date: date
+    room_type: Optional[str] = None
+    participants: List[RosterParticipant]
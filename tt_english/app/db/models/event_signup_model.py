@@ -1,7 +1,7 @@
 # app/db/models/event_signup_model.py
 from datetime import datetime, date
-from typing import Optional, TYPE_CHECKING
-from sqlmodel import Field, SQLModel, Relationship
+from typing import Dict, Optional, TYPE_CHECKING
+from sqlmodel import Field, SQLModel, Relationship, UniqueConstraint
 
 # 为了避免循环导入，在类型检查时使用字符串引用 User
 if TYPE_CHECKING:
@@ -15,6 +15,10 @@ class EventSignupBase(SQLModel):
     # english_level_at_signup: Optional[int] = Field(default=None)
 
 class EventSignup(EventSignupBase, table=True):
+    # 每个用户每天只能报名一次，由数据库保证。已有的表在启动时补建 (见 database.ensure_signup_unique_constraint)，
+    # 已有重复数据时启动失败，需要先清理重复数据
+    __table_args__ = (UniqueConstraint("user_id", "event_date", name="uq_eventsignup_user_date"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
 
     # 建立与 User 模型的关系
@@ -38,4 +42,14 @@ class EventStatusResponse(SQLModel):
     server_time_utc: datetime
     signup_start_time_local: str # 例如 "19:00"
     signup_end_time_local: str   # 例如 "20:00"
-    local_timezone_name: str     # 例如 "Asia/Shanghai"
\ No newline at end of file
+    local_timezone_name: str     # 例如 "Asia/Shanghai"
+
+class SignupStatsResponse(SQLModel):
+    event_date: date
+    total_signups: int
+    level_histogram: Dict[int, int]   # 英语水平 -> 报名人数
+    no_level_signups: int             # 未填写英语水平的报名人数 (不参与匹配)
+    industry_counts: Dict[str, int]   # 行业 -> 报名人数，未填写的计入 "未填写"
+    predicted_two_person_rooms: int
+    predicted_three_person_rooms: int
+    predicted_unmatched: int
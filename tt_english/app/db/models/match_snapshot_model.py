@@ -0,0 +1,18 @@
+# app/db/models/match_snapshot_model.py
+from datetime import date
+from typing import Optional
+from sqlalchemy import Column, Text
+from sqlmodel import Field, SQLModel, UniqueConstraint
+
+class MatchSnapshot(SQLModel, table=True):
+    """
+    匹配完成后为每个匹配到房间的用户预先生成的 /matches/me 响应 (MyMatchResult 的 JSON)，
+    内存缓存未命中时 (例如其他进程执行的匹配、进程重启) 按 (user_id, event_date) 读取这张表。
+    参与者资料是匹配时的快照。
+    """
+    __table_args__ = (UniqueConstraint("user_id", "event_date", name="uq_matchsnapshot_user_date"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    event_date: date = Field(index=True)
+    payload: str = Field(sa_column=Column(Text, nullable=False), description="MyMatchResult 的 JSON")
@@ -0,0 +1,71 @@
+# app/db/pool_metrics.py
+# 带统计的连接池：记录取连接的次数、等待时间 (含新建连接和 pre-ping) 和超时次数，
+# 连同连接池当前状态 (已借出、溢出连接数) 通过内部接口 /api/v1/internal/db-pool 查看，用于按数据调整 DB_POOL_SIZE 等配置。
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from sqlmodel import SQLModel
+
+
+class PoolStatus(SQLModel):
+    pool_size: int
+    checked_out: int      # 当前借出的连接数
+    checked_in: int       # 池中空闲的连接数
+    overflow: int         # 当前超出 pool_size 的连接数 (为负表示还未建满 pool_size)
+    max_overflow: int
+    checkouts: int        # 累计取连接次数
+    timeouts: int         # 累计等待超时 (DB_POOL_TIMEOUT_SECONDS) 次数
+    wait_ms_total: float  # 累计取连接耗时
+    wait_ms_max: float
+
+
+class _MeteredPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def metrics(self) -> PoolStatus:
+        return PoolStatus(
+            pool_size=self.size(), checked_out=self.checkedout(), checked_in=self.checkedin(), overflow=self.overflow(),
+            max_overflow=self._max_overflow, checkouts=self.checkouts, timeouts=self.timeouts,
+            wait_ms_total=round(self.wait_total * 1000, 3), wait_ms_max=round(self.wait_max * 1000, 3),
+        )
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: Pool) -> Optional[PoolStatus]:
+    """连接池的当前状态，不是带统计的连接池 (例如内存 SQLite 使用的 SingletonThreadPool) 时返回 None"""
+    return pool.metrics() if isinstance(pool, _MeteredPoolMixin) else None
+
+
+def engines_status(engines: Dict[str, object]) -> Dict[str, Optional[PoolStatus]]:
+    return {name: pool_status(engine.pool) for name, engine in engines.items() if engine is not None}
@@ -0,0 +1,112 @@
+# app/db/query_stats.py
+# 按请求统计 SQL：引擎事件记录每条语句的耗时，累加到当前请求的 QueryStats (通过 contextvar 传递，
+# 同步 Session、AsyncSession 以及 run_sync 中执行的查询都会计入)。
+# 超过 SLOW_QUERY_MS 的语句打印慢查询日志，只打印 SQL 和参数个数，不打印参数值 (可能包含 openid 等用户数据)。
+# DEBUG 开启时在响应头中返回本次请求的语句数和数据库耗时。每个请求只累加计数，SQL 文本只在 query_budget 中收集。
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+
+class QueryStats:
+    """一个请求 (或一段代码) 中执行的 SQL 统计"""
+
+    def __init__(self, parent: Optional["QueryStats"] = None, collect_sql: bool = False):
+        self.parent = parent # 嵌套统计时同时计入外层 (例如测试中包住一次请求)
+        self.statements = 0
+        self.db_time = 0.0 # 秒
+        self.slow_statements = 0
+        # 执行过的语句，只在查询预算检查时收集 (用于超出预算时输出)，每个请求的统计只累加计数
+        self.collect_sql = collect_sql
+        self.sql: List[str] = []
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.db_time += elapsed
+        if self.collect_sql:
+            self.sql.append(statement)
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            self.slow_statements += 1
+        if self.parent is not None:
+            self.parent.record(statement, elapsed)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _redacted_params(parameters) -> str:
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{len(parameters)} 组参数 (已隐藏)" # executemany
+    return f"{len(parameters) if parameters else 0} 个参数 (已隐藏)"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        print(f"慢查询 {elapsed * 1000:.1f}ms: {' '.join(statement.split())} [{_redacted_params(parameters)}]")
+
+
+def install(engine: Engine) -> None:
+    """在引擎上注册统计事件 (异步引擎传入 async_engine.sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track(collect_sql: bool = False) -> Iterator[QueryStats]:
+    """统计 with 块中执行的 SQL，collect_sql 为 True 时同时记录语句文本"""
+    stats = QueryStats(parent=_current.get(), collect_sql=collect_sql)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(max_statements: int, label: str = "") -> Iterator[QueryStats]:
+    """
+    断言 with 块中执行的 SQL 不超过 max_statements 条 (用于测试和 app.tools.check_query_budgets，及早发现 N+1 查询)。
+    超出时抛出 AssertionError 并列出执行过的语句
+    """
+    with track(collect_sql=True) as stats:
+        yield stats
+    if stats.statements > max_statements:
+        executed = "\n".join(f"  {' '.join(sql.split())}" for sql in stats.sql)
+        raise AssertionError(f"{label or 'SQL'}: 执行了 {stats.statements} 条语句，超出预算 {max_statements} 条:\n{executed}")
+
+
+class QueryStatsMiddleware:
+    """为每个 HTTP 请求统计 SQL，DEBUG 时在响应头中返回 X-DB-Statements / X-DB-Time-Ms / X-DB-Slow-Statements"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-statements", str(stats.statements).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()),
+                        (b"x-db-slow-statements", str(stats.slow_statements).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
@@ -1,9 +1,20 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 from contextlib import asynccontextmanager # 用于 FastAPI lifespan
+from sqlmodel import Session
 
-from app.db.database import create_db_and_tables, engine # 导入数据库相关
-from app.apis.v1 import user_router, event_router, match_router # 导入路由
+from app.db.database import async_engine, create_db_and_tables, engine # 导入数据库相关
+from app.db.pool_metrics import engines_status
+from app.db.query_stats import QueryStatsMiddleware
+from app.apis.v1 import user_router, event_router, match_router, internal_router # 导入路由
+from app.apis.deps import verify_internal_token
+from app.core import admission, metrics
 from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.services import prewarm, signup_queue, signup_stats
+from app.services.wechat_service import wechat_service
+from app.utils import time_utils
 # from app.apis.v1 import event_router # 未来导入其他路由
 
 # Lifespan for application startup and shutdown events
@@ -14,25 +25,56 @@ async def lifespan(app: FastAPI):
     # 在开发环境中，可以在启动时创建表。生产环境建议使用Alembic。
     # 注意：如果表已存在，create_all 不会重复创建或修改。
     # 如果模型有变动，需要数据库迁移工具。
-    create_db_and_tables()
-    print("Database tables checked/created.")
+    if settings.FAST_STARTUP:
+        print("Fast startup: skipping table checks.") # 表结构由迁移预先建好
+    else:
+        create_db_and_tables()
+        print("Database tables checked/created.")
+    if not settings.FAST_STARTUP:
+        # 用一次聚合查询重建当天的报名统计计数器 (FAST_STARTUP 时在后台预热中重建，不预热时第一次查询统计时重建)
+        with Session(engine) as db:
+            signup_stats.rebuild(db, time_utils.get_current_time_in_local_tz().date())
+    if settings.SIGNUP_GROUP_COMMIT:
+        signup_queue.start()
+        print("Signup group commit enabled.")
+    prewarm_task = None
+    if not settings.FAST_STARTUP:
+        await wechat_service.start() # 调用微信接口的连接池
+    elif settings.STARTUP_PREWARM:
+        # yield 之后服务才开始接收请求，预热在后台进行，不推迟第一个请求
+        prewarm_task = asyncio.create_task(prewarm.run())
+    # FAST_STARTUP 且不预热时，微信接口连接池在第一次登录时创建
     yield
     # Shutdown
     print("Application shutdown...")
-    if hasattr(engine, 'dispose'): # 确保引擎有 dispose 方法
-        # await engine.dispose() # 异步关闭连接池（如果引擎支持异步）
-        # 对于同步引擎，可能是 engine.dispose()，且不需要 await
-        #TODO 这里很显然使用的是同步引擎，那么后续有没有必要换成异步引擎呢？
-        engine.dispose()
+    if prewarm_task is not None and not prewarm_task.done():
+        prewarm_task.cancel()
+    if settings.SIGNUP_GROUP_COMMIT:
+        await signup_queue.stop() # 先写完队列中的报名
+    await wechat_service.stop()
+    if async_engine is not None: # DATABASE_URL 使用异步驱动时，接口请求走异步引擎
+        await async_engine.dispose()
+    engine.dispose() # 匹配、组提交等仍使用同步引擎
     print("Database connections closed.")
 
 
-app = FastAPI(lifespan=lifespan, title=settings.APP_NAME, version="0.1.0")
+app = FastAPI(
+    lifespan=lifespan, title=settings.APP_NAME, version="0.1.0",
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse,
+)
+
+# 按请求统计 SQL (DEBUG 时通过响应头返回)
+app.add_middleware(QueryStatsMiddleware)
+if settings.ADMISSION_CONTROL:
+    app.add_middleware(admission.AdmissionMiddleware) # 在指标中间件之内，429 也计入接口指标
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware) # 最外层，耗时包含其他中间件
 
 # 包含 API 路由
 app.include_router(user_router.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(event_router.router, prefix="/api/v1/events", tags=["Events"])
 app.include_router(match_router.router, prefix="/api/v1/matches", tags=["Matches"])
+app.include_router(internal_router.router, prefix="/api/v1/internal", tags=["Internal"])
 # app.include_router(event_router.router, prefix="/api/v1/events", tags=["Events"]) # 未来
 
 
@@ -40,3 +82,9 @@ app.include_router(match_router.router, prefix="/api/v1/matches", tags=["Matches
 @app.get("/")
 async def root():
     return {"message": f"Welcome to {settings.APP_NAME}"}
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_internal_token)])
+async def export_metrics():
+    """Prometheus 文本格式的接口和连接池指标"""
+    return PlainTextResponse(metrics.render(engines_status({"sync": engine, "async": async_engine})), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,173 @@
+# app/services/archive_service.py
+# 历史活动归档：eventsignup、chatroom、chatroomparticipant 每天都在增长，而热点查询都只针对某一个 event_date。
+# 早于保留期的日期整天导出到 ARCHIVE_DIR/YYYY/MM/YYYY-MM-DD.jsonl.gz，写入成功后再分批从热表中删除，
+# 热表及其索引的大小只与保留期相关，与全部历史无关。回放等离线工具通过本模块透明地读取已归档的日期。
+#
+# 归档文件每行一条 JSON 记录，按 type 区分：
+#   header: {"type": "header", "event_date", "archived_at", "signups", "rooms"}
+#   signup: {"type": "signup", "id", "user_id", "signup_time", "eng_level", "industry"}  (按报名先后排序)
+#   room:   {"type": "room", "id", "room_identifier", "room_type", "created_at", "participants": [{"user_id", "joined_at"}]}
+# eng_level / industry 是归档时用户资料的快照，与当天匹配时的值可能略有出入。
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import event_signup_crud, match_crud
+from app.utils.time_utils import get_current_time_in_local_tz
+
+
+def archive_path(event_date: date, archive_dir: Optional[str] = None) -> Path:
+    return Path(archive_dir or settings.ARCHIVE_DIR) / f"{event_date:%Y}" / f"{event_date:%m}" / f"{event_date.isoformat()}.jsonl.gz"
+
+
+def has_archive(event_date: date) -> bool:
+    return archive_path(event_date).exists()
+
+
+def archived_dates_in_range(start_date: date, end_date: date) -> List[date]:
+    """列出 [start_date, end_date] 内已归档的日期 (升序)"""
+    root = Path(settings.ARCHIVE_DIR)
+    dates = []
+    for path in root.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/*.jsonl.gz"):
+        try:
+            event_date = date.fromisoformat(path.name[:-len(".jsonl.gz")])
+        except ValueError:
+            continue
+        if start_date <= event_date <= end_date:
+            dates.append(event_date)
+    return sorted(dates)
+
+
+def iter_archive_records(event_date: date) -> Iterator[Dict]:
+    """逐条读取某天的归档记录 (文件不存在时不产出任何记录)"""
+    path = archive_path(event_date)
+    if not path.exists():
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_archived_candidates(event_date: date) -> List[Tuple[int, int, Optional[str]]]:
+    """从归档中读取某天的匹配候选人 (user_id, eng_level, industry)，按报名先后排序，与 get_matching_candidates_for_date 的结果格式一致"""
+    return [
+        (record["user_id"], record["eng_level"], record["industry"])
+        for record in iter_archive_records(event_date)
+        if record["type"] == "signup" and record["eng_level"] is not None
+    ]
+
+
+def _signup_record(row) -> Dict:
+    signup_id, user_id, signup_time, eng_level, industry = row
+    return {
+        "type": "signup", "id": signup_id, "user_id": user_id, "signup_time": signup_time.isoformat(),
+        "eng_level": eng_level, "industry": industry,
+    }
+
+
+def _room_records(rows) -> List[Dict]:
+    # rows 按 room_id 排序，同一房间的成员相邻
+    rooms: List[Dict] = []
+    for room_id, room_identifier, room_type, created_at, user_id, joined_at in rows:
+        if not rooms or rooms[-1]["id"] != room_id:
+            rooms.append({
+                "type": "room", "id": room_id, "room_identifier": room_identifier, "room_type": room_type,
+                "created_at": created_at.isoformat(), "participants": [],
+            })
+        if user_id is not None:
+            rooms[-1]["participants"].append({"user_id": user_id, "joined_at": joined_at.isoformat()})
+    return rooms
+
+
+def write_archive(event_date: date, signups: List[Dict], rooms: List[Dict]) -> Path:
+    """
+    写入某天的归档文件。文件已存在时 (上次归档后热表中又出现了这一天的数据，或上次删除中途失败) 按 id 合并。
+    先写临时文件再改名，中途失败不会留下不完整的归档。
+    """
+    existing_signups: Dict[int, Dict] = {}
+    existing_rooms: Dict[int, Dict] = {}
+    for record in iter_archive_records(event_date):
+        if record["type"] == "signup":
+            existing_signups[record["id"]] = record
+        elif record["type"] == "room":
+            existing_rooms[record["id"]] = record
+    if existing_signups or existing_rooms:
+        existing_signups.update((record["id"], record) for record in signups)
+        existing_rooms.update((record["id"], record) for record in rooms)
+        signups = sorted(existing_signups.values(), key=lambda record: (record["signup_time"], record["id"]))
+        rooms = sorted(existing_rooms.values(), key=lambda record: record["id"])
+
+    path = archive_path(event_date)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    header = {
+        "type": "header", "event_date": event_date.isoformat(), "archived_at": datetime.utcnow().isoformat(),
+        "signups": len(signups), "rooms": len(rooms),
+    }
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for record in [header, *signups, *rooms]:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def _delete_in_chunks(db: Session, ids: List[int], delete_chunk, chunk_size: int) -> int:
+    deleted = 0
+    for start in range(0, len(ids), chunk_size):
+        deleted += delete_chunk(db, ids[start:start + chunk_size])
+        db.commit() # 每批单独提交，避免长事务和大量锁
+    return deleted
+
+
+def archive_date(db: Session, event_date: date, chunk_size: Optional[int] = None) -> Tuple[int, int]:
+    """归档某一天并从热表中删除，返回 (报名数, 房间数)"""
+    chunk_size = chunk_size or settings.ARCHIVE_DELETE_CHUNK_SIZE
+    signups = [_signup_record(row) for row in event_signup_crud.get_signup_snapshots_for_date(db, event_date)]
+    rooms = _room_records(match_crud.get_room_snapshots_for_date(db, event_date))
+    room_ids = match_crud.get_room_ids_for_date(db, event_date)
+    signup_ids = event_signup_crud.get_signup_ids_for_date(db, event_date)
+    write_archive(event_date, signups, rooms)
+
+    # 只删除已写入归档的记录 (导出之后新写入的记录留到下次归档)
+    archived_room_ids = {record["id"] for record in rooms}
+    archived_signup_ids = {record["id"] for record in signups}
+    _delete_in_chunks(db, [i for i in room_ids if i in archived_room_ids], match_crud.delete_rooms_by_ids, chunk_size)
+    _delete_in_chunks(db, [i for i in signup_ids if i in archived_signup_ids], event_signup_crud.delete_signups_by_ids, chunk_size)
+    match_crud.delete_match_snapshots_for_date(db, event_date) # 匹配结果快照可由归档中的房间还原，不单独归档
+    db.commit()
+    return len(signups), len(rooms)
+
+
+def retention_cutoff(today: Optional[date] = None) -> date:
+    """早于返回日期的活动都应归档。保留天数不小于 PAIR_HISTORY_DAYS，匹配时查询的同房记录始终在热表中"""
+    today = today or get_current_time_in_local_tz().date()
+    retention_days = max(settings.ARCHIVE_RETENTION_DAYS, settings.PAIR_HISTORY_DAYS)
+    return today - timedelta(days=retention_days)
+
+
+def dates_to_archive(db: Session, before_date: date) -> List[date]:
+    dates = set(event_signup_crud.get_event_dates_before(db, before_date))
+    dates.update(match_crud.get_match_dates_before(db, before_date))
+    return sorted(dates)
+
+
+def run_retention(db: Session, before_date: Optional[date] = None, dry_run: bool = False) -> List[Tuple[date, int, int]]:
+    """归档 before_date (默认为保留期截止日) 之前的所有日期，返回每天的 (日期, 报名数, 房间数)"""
+    before_date = before_date or retention_cutoff()
+    results = []
+    for event_date in dates_to_archive(db, before_date):
+        if dry_run:
+            signups = event_signup_crud.count_signups_for_date(db, event_date)
+            rooms = len(match_crud.get_room_ids_for_date(db, event_date))
+        else:
+            signups, rooms = archive_date(db, event_date)
+        print(f"{'[dry-run] ' if dry_run else ''}归档 {event_date}: 报名 {signups} 条, 房间 {rooms} 个")
+        results.append((event_date, signups, rooms))
+    return results
@@ -0,0 +1,149 @@
+# app/services/incremental_matching.py
+# 报名窗口开放期间的增量匹配：每有一个报名就更新内存中的临时配对，
+# 窗口关闭后只需处理少量未配对用户并写库，避免在 /matches/trigger 时集中做全量匹配。
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlmodel import Session
+
+from app.crud import event_signup_crud
+from app.services.matching_defaults import DEFAULT_MAX_LEVEL_DIFFERENCE, DEFAULT_MAX_TRIO_LEVEL_SPREAD
+
+
+class IncrementalMatcher:
+    """
+    单个活动日期的临时配对状态。
+    不变式：任意两个等待中的用户水平差异都大于 max_level_difference (否则报名时就已配对)，
+    所以每个水平最多只有一个等待者，收尾时间只与未配对人数有关。
+    """
+
+    def __init__(
+        self,
+        event_date: date,
+        max_level_difference: int = DEFAULT_MAX_LEVEL_DIFFERENCE,
+        max_trio_level_spread: int = DEFAULT_MAX_TRIO_LEVEL_SPREAD,
+    ):
+        self.event_date = event_date
+        self.max_level_difference = max_level_difference
+        self.max_trio_level_spread = max_trio_level_spread
+        self.seen_user_ids: Set[int] = set() # 已处理过的报名 (含未填写水平的用户)
+        self.pending: Dict[int, int] = {} # eng_level -> 等待配对的用户 id
+        self.rooms: List[List[int]] = [] # 临时房间
+        self.room_spans: List[Tuple[int, int]] = [] # 每个房间的 (最低水平, 最高水平)
+        self.unmatched_user_ids: List[int] = [] # 收尾后仍未能入房的用户
+        self.pair_rooms_by_levels: Dict[Tuple[int, int], List[int]] = {} # (最低水平, 最高水平) -> 二人房下标
+        self._lock = threading.Lock()
+
+    @property
+    def signup_count(self) -> int:
+        return len(self.seen_user_ids)
+
+    @property
+    def mean_level_gap(self) -> float:
+        if not self.room_spans:
+            return 0.0
+        return sum(high - low for low, high in self.room_spans) / len(self.room_spans)
+
+    def add_signup(self, user_id: int, eng_level: Optional[int]) -> None:
+        with self._lock:
+            if user_id in self.seen_user_ids:
+                return
+            self.seen_user_ids.add(user_id)
+            if eng_level is None:
+                return # 未填写英语水平的用户不参与匹配
+
+            # 优先找水平相同的等待者，其次按差异从小到大找
+            for diff in range(self.max_level_difference + 1):
+                for level in (eng_level - diff, eng_level + diff):
+                    partner_id = self.pending.pop(level, None)
+                    if partner_id is not None:
+                        levels = (min(level, eng_level), max(level, eng_level))
+                        self.pair_rooms_by_levels.setdefault(levels, []).append(len(self.rooms))
+                        self.rooms.append([partner_id, user_id])
+                        self.room_spans.append(levels)
+                        return
+            self.pending[eng_level] = user_id
+
+    def finalize(self) -> None:
+        """
+        收尾：让每个等待中的用户尝试加入一个二人房组成三人房 (加入后水平跨度不超过 max_trio_level_spread)，
+        加入不了的记入 unmatched_user_ids。只遍历等待者及其附近的水平档，复杂度 O(未配对人数 × 跨度)。
+        """
+        with self._lock:
+            for level, user_id in sorted(self.pending.items()):
+                room_idx = self._take_pair_room_for(level)
+                if room_idx is None:
+                    self.unmatched_user_ids.append(user_id)
+                else:
+                    self.rooms[room_idx].append(user_id)
+                    low, high = self.room_spans[room_idx]
+                    self.room_spans[room_idx] = (min(low, level), max(high, level))
+            self.pending.clear()
+
+    def _take_pair_room_for(self, level: int) -> Optional[int]:
+        # 只需检查水平区间与该用户相距不超过跨度上限的几档二人房
+        best: Optional[Tuple[int, Tuple[int, int]]] = None # (加入后的跨度, 房间水平区间)
+        for low in range(level - self.max_trio_level_spread, level + self.max_trio_level_spread + 1):
+            for high in range(low, low + self.max_level_difference + 1):
+                if not self.pair_rooms_by_levels.get((low, high)):
+                    continue
+                spread = max(high, level) - min(low, level)
+                if spread <= self.max_trio_level_spread and (best is None or spread < best[0]):
+                    best = (spread, (low, high))
+        if best is None:
+            return None
+        return self.pair_rooms_by_levels[best[1]].pop()
+
+
+# 每个进程只保存当前正在报名的日期的状态
+_matchers: Dict[date, IncrementalMatcher] = {}
+# 只保护 _matchers，持有期间不能访问数据库 (异步驱动下 run_sync 中的查询会让出事件循环，见 signup_cache)
+_registry_lock = threading.Lock()
+
+
+def rebuild_matcher(db: Session, event_date: date) -> IncrementalMatcher:
+    """按报名时间顺序重放当天的报名记录，重建临时配对 (进程重启后或多进程状态不一致时使用)"""
+    matcher = IncrementalMatcher(event_date)
+    signups = sorted(
+        event_signup_crud.get_signups_for_date(db, event_date=event_date),
+        key=lambda s: (s.signup_time, s.id),
+    )
+    levels = {user_id: level for user_id, level, _ in event_signup_crud.get_matching_candidates_for_date(db, event_date)}
+    for signup in signups:
+        matcher.add_signup(signup.user_id, levels.get(signup.user_id))
+    return matcher
+
+
+def get_matcher(db: Session, event_date: date) -> IncrementalMatcher:
+    matcher = _matchers.get(event_date)
+    if matcher is not None:
+        return matcher
+    # 重建时不持有锁；并发重建时先发布的生效，其他的丢弃
+    matcher = rebuild_matcher(db, event_date)
+    with _registry_lock:
+        if event_date not in _matchers:
+            # 只保留当前日期的状态，旧日期的状态随之丢弃
+            _matchers.clear()
+            _matchers[event_date] = matcher
+        return _matchers[event_date]
+
+
+def record_signup(db: Session, event_date: date, user_id: int, eng_level: Optional[int]) -> None:
+    """报名成功后调用，更新临时配对"""
+    # 首次访问时从数据库重建。生效的可能是并发的、查询早于这条报名的重建，所以总是再加入一次 (已处理过的用户会被忽略)
+    get_matcher(db, event_date).add_signup(user_id, eng_level)
+
+
+def finalize_matching(db: Session, event_date: date) -> IncrementalMatcher:
+    """
+    报名截止后收尾，返回收尾后的配对状态 (rooms / unmatched_user_ids)，并丢弃该日期的临时状态。
+    如果内存中的报名数与数据库不一致 (例如多进程部署，报名落在了其他进程)，先从数据库重建。
+    """
+    matcher = get_matcher(db, event_date)
+    if matcher.signup_count != event_signup_crud.count_signups_for_date(db, event_date):
+        matcher = rebuild_matcher(db, event_date)
+    matcher.finalize()
+    with _registry_lock:
+        _matchers.pop(event_date, None)
+    return matcher
@@ -0,0 +1,99 @@
+# app/services/match_snapshots.py
+# 预先生成的 /matches/me 响应：匹配结果提交后，用一次房间查询和一次用户查询为每个匹配到房间的用户生成 MyMatchResult，
+# 同一房间的成员共享同一个对象。结果放在进程内缓存中 (按日期，只保留最近 MATCH_SNAPSHOT_CACHE_DAYS 天)，
+# 同时写入 matchsnapshot 表，其他进程或重启后按 (user_id, event_date) 一次查询取回。
+# 清理某天的匹配 (/matches/cleanup/{date}) 时调用 invalidate 丢弃该日期的缓存。
+# 与 signup_cache 一样，其他进程中的清理不会使本进程的缓存失效，多实例部署时清理后需要重启或关闭 MATCH_SNAPSHOTS。
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import match_crud
+from app.db.models.chat_room_participant_model import MyMatchResult
+
+
+class DateSnapshots:
+    """单个活动日期的匹配结果"""
+
+    def __init__(self, complete: bool):
+        self.results: Dict[int, MyMatchResult] = {} # user_id -> MyMatchResult
+        # 为 True 表示由本进程在匹配后完整生成，缓存中没有的用户就是没有匹配到房间，不必再查数据库
+        self.complete = complete
+
+
+_cache: "OrderedDict[date, DateSnapshots]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _store_locked(event_date: date, snapshots: DateSnapshots) -> None:
+    # 调用方需持有 _lock
+    _cache[event_date] = snapshots
+    _cache.move_to_end(event_date)
+    while len(_cache) > max(settings.MATCH_SNAPSHOT_CACHE_DAYS, 1):
+        _cache.popitem(last=False)
+
+
+def build_snapshots(db: Session, event_date: date) -> int:
+    """匹配结果提交后调用：生成该日期所有匹配用户的结果并写入缓存和 matchsnapshot 表，返回生成的条数"""
+    rows = match_crud.get_room_snapshots_for_date(db, event_date)
+    users = {user.id: user for user in match_crud.get_users_read(db, {row[4] for row in rows if row[4] is not None})}
+
+    snapshots = DateSnapshots(complete=True)
+    db_rows: List[dict] = []
+    members: List[int] = []
+    for index, (room_id, room_identifier, room_type, _, user_id, _) in enumerate(rows):
+        if user_id is not None and user_id in users:
+            members.append(user_id)
+        # rows 按 room_id 排序，到一个房间的最后一行时生成该房间的结果
+        if index + 1 < len(rows) and rows[index + 1][0] == room_id:
+            continue
+        if members:
+            result = MyMatchResult(
+                room_identifier=room_identifier, event_date=event_date, room_type=room_type,
+                participants=[users[member] for member in members],
+            )
+            payload = result.model_dump_json() # 每个房间只序列化一次
+            for member in members:
+                snapshots.results[member] = result
+                db_rows.append({"user_id": member, "event_date": event_date, "payload": payload})
+        members = []
+
+    match_crud.delete_match_snapshots_for_date(db, event_date) # 重新匹配时覆盖旧的快照
+    match_crud.bulk_create_match_snapshots(db, db_rows)
+    with _lock:
+        _store_locked(event_date, snapshots)
+    return len(db_rows)
+
+
+def get_cached(event_date: date, user_id: int) -> Optional[MyMatchResult]:
+    snapshots = _cache.get(event_date)
+    return snapshots.results.get(user_id) if snapshots is not None else None
+
+
+def is_complete(event_date: date) -> bool:
+    snapshots = _cache.get(event_date)
+    return snapshots is not None and snapshots.complete
+
+
+def remember(event_date: date, user_id: int, result: MyMatchResult) -> None:
+    """缓存从 matchsnapshot 表中读到的单条结果"""
+    with _lock:
+        snapshots = _cache.get(event_date)
+        if snapshots is None:
+            snapshots = DateSnapshots(complete=False)
+            _store_locked(event_date, snapshots)
+        snapshots.results[user_id] = result
+
+
+def invalidate(event_date: date) -> None:
+    with _lock:
+        _cache.pop(event_date, None)
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
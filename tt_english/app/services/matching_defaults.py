@@ -0,0 +1,6 @@
+# app/services/matching_defaults.py
+# 匹配引擎的默认阈值。报名统计、增量匹配等只需要这些常量的模块从这里导入，不必在启动时加载 NumPy 和匹配引擎。
+
+# 默认的英语水平差异阈值
+DEFAULT_MAX_LEVEL_DIFFERENCE = 1 # 二人房内两人的水平差异上限
+DEFAULT_MAX_TRIO_LEVEL_SPREAD = 2 # 三人房内最高与最低水平的差异上限 (允许第三人把跨度拉大一级)
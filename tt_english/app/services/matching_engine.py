@@ -0,0 +1,374 @@
+# app/services/matching_engine.py
+# 可插拔的匹配引擎：输入为 NumPy 数组 (user_id, eng_level, industry 编码)，输出房间分配方案。
+# 引擎只做纯内存计算，不访问数据库，便于基准测试、回放和多进程分片复用。
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Type
+
+import numpy as np
+
+from app.services.matching_defaults import DEFAULT_MAX_LEVEL_DIFFERENCE, DEFAULT_MAX_TRIO_LEVEL_SPREAD
+
+if TYPE_CHECKING:
+    from app.services.pair_history import PairHistoryIndex
+
+DEFAULT_REPEAT_PENALTY = 1 # 房间内每对最近同房过的用户，代价相当于多少级水平差
+REPEAT_SWAP_WINDOW = 8 # 消除重复配对时，向前后各查找多少个二人房作为交换对象
+
+
+class MatchPlan:
+    """
+    一次匹配的房间分配方案。
+    第 k 个房间的成员为 member_ids[room_offsets[k]:room_offsets[k + 1]]。
+    """
+
+    def __init__(
+        self,
+        member_ids: np.ndarray,
+        room_offsets: np.ndarray,
+        unmatched_ids: np.ndarray,
+        room_level_gaps: np.ndarray,
+        repeat_pairs: int = 0,
+    ):
+        self.member_ids = member_ids
+        self.room_offsets = room_offsets
+        self.unmatched_ids = unmatched_ids
+        self.room_level_gaps = room_level_gaps # 每个房间内最高与最低水平之差
+        self.repeat_pairs = repeat_pairs # 房间内最近同房过的用户对数量 (未提供同房记录时为 0)
+
+    @property
+    def room_count(self) -> int:
+        return len(self.room_offsets) - 1
+
+    @property
+    def three_person_rooms(self) -> int:
+        return int(np.count_nonzero(np.diff(self.room_offsets) == 3))
+
+    @property
+    def mean_level_gap(self) -> float:
+        return float(self.room_level_gaps.mean()) if self.room_count else 0.0
+
+    def rooms(self) -> List[List[int]]:
+        members = self.member_ids.tolist()
+        offsets = self.room_offsets.tolist()
+        return [members[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+
+
+def empty_plan(user_ids: Optional[np.ndarray] = None) -> MatchPlan:
+    unmatched = np.asarray(user_ids if user_ids is not None else [], dtype=np.int64)
+    return MatchPlan(
+        member_ids=np.empty(0, dtype=np.int64),
+        room_offsets=np.zeros(1, dtype=np.int64),
+        unmatched_ids=unmatched,
+        room_level_gaps=np.empty(0, dtype=np.int64),
+    )
+
+
+def sort_candidates(
+    user_ids: np.ndarray, levels: np.ndarray, industries: np.ndarray, seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    先按 seed 打乱 (增加随机性)，再按 (eng_level, industry) 稳定排序，返回排序后的下标。
+    同一水平内同行业的用户相邻，更容易被分到一起。
+    """
+    shuffled = np.random.default_rng(seed).permutation(len(user_ids))
+    order = np.lexsort((industries[shuffled], levels[shuffled]))
+    return shuffled[order]
+
+
+class MatchingEngine(ABC):
+    """
+    匹配引擎基类。子类实现 _match_sorted，对已排序的水平数组给出分组。
+    传入 pair_history 时，分组后会在水平组成相同的二人房之间交换成员，尽量拆开最近同房过的用户对。
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        max_level_difference: int = DEFAULT_MAX_LEVEL_DIFFERENCE,
+        max_trio_level_spread: int = DEFAULT_MAX_TRIO_LEVEL_SPREAD,
+        repeat_penalty: int = DEFAULT_REPEAT_PENALTY,
+    ):
+        self.max_level_difference = max_level_difference
+        self.max_trio_level_spread = max_trio_level_spread
+        self.repeat_penalty = repeat_penalty
+
+    def match(
+        self,
+        user_ids: np.ndarray,
+        levels: np.ndarray,
+        industries: Optional[np.ndarray] = None,
+        seed: Optional[int] = None,
+        pair_history: Optional["PairHistoryIndex"] = None,
+    ) -> MatchPlan:
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        levels = np.asarray(levels, dtype=np.int64)
+        if industries is None:
+            industries = np.zeros(len(user_ids), dtype=np.int32)
+        if len(user_ids) < 2:
+            return empty_plan(user_ids)
+
+        order = sort_candidates(user_ids, levels, np.asarray(industries), seed)
+        return self.match_sorted(user_ids[order], levels[order], pair_history)
+
+    def match_sorted(
+        self, sorted_ids: np.ndarray, sorted_levels: np.ndarray, pair_history: Optional["PairHistoryIndex"] = None
+    ) -> MatchPlan:
+        """对已按水平排序的用户进行分组"""
+        if len(sorted_ids) < 2:
+            return empty_plan(sorted_ids)
+        if pair_history is None:
+            room_members, room_offsets, matched_mask = self._match_sorted(sorted_levels)
+        else:
+            # 批量查出相邻二人段、三人段中同房过的对数，DP 内循环只需按下标取值
+            pair_met = pair_history.contains_many(sorted_ids[:-1], sorted_ids[1:])
+            trio_met = pair_met[:-1].astype(np.int64) + pair_met[1:] + pair_history.contains_many(sorted_ids[:-2], sorted_ids[2:])
+            room_members, room_offsets, matched_mask = self._match_sorted(sorted_levels, pair_met, trio_met)
+            room_members = self._swap_repeat_partners(room_members, room_offsets, sorted_ids, sorted_levels, pair_history)
+
+        member_ids = sorted_ids[room_members]
+        member_levels = sorted_levels[room_members]
+        starts = room_offsets[:-1]
+        if len(starts):
+            gaps = np.maximum.reduceat(member_levels, starts) - np.minimum.reduceat(member_levels, starts)
+        else:
+            gaps = np.empty(0, dtype=np.int64)
+        return MatchPlan(
+            member_ids=member_ids,
+            room_offsets=room_offsets,
+            unmatched_ids=sorted_ids[~matched_mask],
+            room_level_gaps=gaps,
+            repeat_pairs=pair_history.count_repeats(member_ids, room_offsets) if pair_history is not None else 0,
+        )
+
+    @abstractmethod
+    def _match_sorted(
+        self, sorted_levels: np.ndarray, pair_met: Optional[np.ndarray] = None, trio_met: Optional[np.ndarray] = None
+    ):
+        """
+        返回 (按房间顺序排列的成员下标, 房间偏移, 已匹配掩码)，下标指向排序后的数组。
+        pair_met[i] 表示第 i、i+1 人是否同房过，trio_met[i] 为第 i..i+2 人中同房过的对数，未提供同房记录时为 None。
+        """
+
+    def _swap_repeat_partners(
+        self,
+        room_members: np.ndarray,
+        room_offsets: np.ndarray,
+        sorted_ids: np.ndarray,
+        sorted_levels: np.ndarray,
+        pair_history: "PairHistoryIndex",
+    ) -> np.ndarray:
+        """
+        对仍然同房过的二人房 (a, b)，在附近的二人房 (c, d) 中找一个 d 与 b 水平相同的，交换 b、d。
+        交换后两个房间的水平组成不变，只在 (a, d)、(c, b) 都没有同房过时才交换。
+        """
+        starts = room_offsets[:-1][np.diff(room_offsets) == 2]
+        met = pair_history.contains_many(sorted_ids[room_members[starts]], sorted_ids[room_members[starts + 1]])
+        if not met.any():
+            return room_members
+
+        room_members = room_members.copy()
+        for j in np.flatnonzero(met).tolist():
+            a, b = room_members[starts[j]], room_members[starts[j] + 1]
+            if not pair_history.contains(sorted_ids[a], sorted_ids[b]):
+                continue # 已经在之前的交换中被拆开
+            for t in range(max(0, j - REPEAT_SWAP_WINDOW), min(len(starts), j + REPEAT_SWAP_WINDOW + 1)):
+                c, d = room_members[starts[t]], room_members[starts[t] + 1]
+                if t == j or sorted_levels[d] != sorted_levels[b]:
+                    continue
+                if pair_history.contains(sorted_ids[a], sorted_ids[d]) or pair_history.contains(sorted_ids[c], sorted_ids[b]):
+                    continue
+                room_members[starts[j] + 1], room_members[starts[t] + 1] = d, b
+                break
+        return room_members
+
+
+class GreedyMatchingEngine(MatchingEngine):
+    """
+    原有的贪心策略 (保留作为基准)：
+    相邻两人水平差异在阈值内则配对，否则前一个人轮空；
+    最后只剩一人时，加入平均水平最接近的二人房。
+    分组本身不考虑同房记录，只在分组后由基类交换成员。
+    """
+
+    name = "greedy"
+
+    def _match_sorted(self, sorted_levels, pair_met=None, trio_met=None):
+        levels = sorted_levels.tolist()
+        n = len(levels)
+        rooms: List[List[int]] = []
+        unmatched: List[int] = []
+        i = 0
+        while i < n - 1:
+            if abs(levels[i] - levels[i + 1]) <= self.max_level_difference:
+                rooms.append([i, i + 1])
+                i += 2
+            else:
+                unmatched.append(i)
+                i += 1
+        unmatched.extend(range(i, n))
+
+        if len(unmatched) == 1 and rooms:
+            lone = unmatched.pop()
+            room_avgs = np.array([(levels[a] + levels[b]) / 2.0 for a, b in rooms])
+            best_room_idx = int(np.argmin(np.abs(levels[lone] - room_avgs)))
+            rooms[best_room_idx].append(lone)
+
+        return _pack_rooms(rooms, n)
+
+
+class OptimalMatchingEngine(MatchingEngine):
+    """
+    最优分组：在排序后的水平序列上做一次动态规划，把用户划分为连续的二人组/三人组/轮空。
+    优化目标按优先级依次为：轮空人数最少、房间内水平差之和 (含重复同房的惩罚) 最小、三人房最少。
+    排序后最优分组一定由相邻的人组成，所以 DP 只需考虑以当前位置结尾的 1/2/3 人段。
+    """
+
+    name = "optimal"
+
+    def _match_sorted(self, sorted_levels, pair_met=None, trio_met=None):
+        n = len(sorted_levels)
+        pair_gap = sorted_levels[1:] - sorted_levels[:-1]
+        trio_gap = sorted_levels[2:] - sorted_levels[:-2]
+        max_repeat_cost = 0
+        if pair_met is not None:
+            # 每对同房过的用户按 repeat_penalty 级水平差计入
+            pair_gap = pair_gap + pair_met * self.repeat_penalty
+            trio_gap = trio_gap + trio_met * self.repeat_penalty
+            max_repeat_cost = 3 * self.repeat_penalty
+
+        # 把三级目标编码为一个整数代价：每个三人房 +1，水平差每级 +gap_weight，每个轮空 +unmatched_weight
+        gap_weight = n + 1
+        unmatched_weight = gap_weight * ((max(self.max_level_difference, self.max_trio_level_spread) + max_repeat_cost) * n + 1)
+        infeasible = np.iinfo(np.int64).max // 4
+        pair_ok = sorted_levels[1:] - sorted_levels[:-1] <= self.max_level_difference
+        trio_ok = sorted_levels[2:] - sorted_levels[:-2] <= self.max_trio_level_spread
+        pair_cost = np.where(pair_ok, pair_gap * gap_weight, infeasible).tolist()
+        trio_cost = np.where(trio_ok, trio_gap * gap_weight + 1, infeasible).tolist()
+
+        best = [0] * (n + 1)
+        step = bytearray(n + 1) # 以位置 k 结尾的最后一段的人数 (1 表示轮空)
+        for k in range(1, n + 1):
+            cost = best[k - 1] + unmatched_weight
+            size = 1
+            if k >= 2:
+                c = best[k - 2] + pair_cost[k - 2]
+                if c < cost:
+                    cost, size = c, 2
+                if k >= 3:
+                    c = best[k - 3] + trio_cost[k - 3]
+                    if c < cost:
+                        cost, size = c, 3
+            best[k] = cost
+            step[k] = size
+
+        rooms: List[List[int]] = []
+        k = n
+        while k > 0:
+            size = step[k]
+            if size > 1:
+                rooms.append(list(range(k - size, k)))
+            k -= size
+        rooms.reverse()
+        return _pack_rooms(rooms, n)
+
+
+def _pack_rooms(rooms: List[List[int]], n: int):
+    sizes = np.fromiter((len(room) for room in rooms), dtype=np.int64, count=len(rooms))
+    room_offsets = np.zeros(len(rooms) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=room_offsets[1:])
+    room_members = np.fromiter((idx for room in rooms for idx in room), dtype=np.int64, count=int(room_offsets[-1]))
+    matched_mask = np.zeros(n, dtype=bool)
+    matched_mask[room_members] = True
+    return room_members, room_offsets, matched_mask
+
+
+def concat_plans(plans: List[MatchPlan], unmatched_ids: np.ndarray) -> MatchPlan:
+    """把多个分片的分配方案按顺序拼接为一个，轮空用户由调用方给出"""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    base = 0
+    for plan in plans:
+        offsets.append(plan.room_offsets[1:] + base)
+        base += len(plan.member_ids)
+    return MatchPlan(
+        member_ids=np.concatenate([plan.member_ids for plan in plans]),
+        room_offsets=np.concatenate(offsets),
+        unmatched_ids=unmatched_ids,
+        room_level_gaps=np.concatenate([plan.room_level_gaps for plan in plans]),
+        repeat_pairs=sum(plan.repeat_pairs for plan in plans),
+    )
+
+
+def split_level_bands(sorted_levels: np.ndarray, band_count: int) -> List[int]:
+    """
+    把排序后的水平数组切成大约 band_count 个人数相近的水平段，返回切分点 (含首尾)。
+    切分点对齐到水平边界，同一水平的用户总在同一个分片内。
+    """
+    n = len(sorted_levels)
+    cuts = [0]
+    for k in range(1, band_count):
+        pos = int(np.searchsorted(sorted_levels, sorted_levels[k * n // band_count], side="left"))
+        if pos > cuts[-1]:
+            cuts.append(pos)
+    cuts.append(n)
+    return cuts
+
+
+def _match_band(
+    engine: "MatchingEngine", sorted_ids: np.ndarray, sorted_levels: np.ndarray, pair_history: Optional["PairHistoryIndex"]
+) -> MatchPlan:
+    # 进程池 worker 的入口，必须是模块级函数才能被 pickle
+    return engine.match_sorted(sorted_ids, sorted_levels, pair_history)
+
+
+def match_sharded(
+    engine: MatchingEngine,
+    user_ids: np.ndarray,
+    levels: np.ndarray,
+    industries: Optional[np.ndarray] = None,
+    seed: Optional[int] = None,
+    workers: int = 2,
+    pair_history: Optional["PairHistoryIndex"] = None,
+) -> MatchPlan:
+    """
+    按水平段分片，在进程池中并行匹配。
+    各分片独立分组后，只把各分片的轮空用户 (集中在分片边缘) 汇总起来再匹配一次。
+    排序和切分只依赖 seed 与输入，所以同一 seed 的结果是确定的。
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    levels = np.asarray(levels, dtype=np.int64)
+    if industries is None:
+        industries = np.zeros(len(user_ids), dtype=np.int32)
+    if len(user_ids) < 2:
+        return empty_plan(user_ids)
+
+    order = sort_candidates(user_ids, levels, np.asarray(industries), seed)
+    sorted_ids, sorted_levels = user_ids[order], levels[order]
+    cuts = split_level_bands(sorted_levels, workers)
+    if len(cuts) <= 2:
+        return engine.match_sorted(sorted_ids, sorted_levels, pair_history)
+
+    bands = [(sorted_ids[a:b], sorted_levels[a:b]) for a, b in zip(cuts[:-1], cuts[1:])]
+    with ProcessPoolExecutor(max_workers=min(workers, len(bands))) as executor:
+        band_plans = list(executor.map(_match_band, *zip(*[(engine, ids, lvls, pair_history) for ids, lvls in bands])))
+
+    # 边缘合并：各分片的轮空用户保持排序后的相对顺序，重新匹配一次
+    leftover_ids = np.concatenate([plan.unmatched_ids for plan in band_plans])
+    leftover_mask = np.isin(sorted_ids, leftover_ids)
+    merge_plan = engine.match_sorted(sorted_ids[leftover_mask], sorted_levels[leftover_mask], pair_history)
+    return concat_plans(band_plans + [merge_plan], merge_plan.unmatched_ids)
+
+
+MATCHING_ENGINES: Dict[str, Type[MatchingEngine]] = {
+    GreedyMatchingEngine.name: GreedyMatchingEngine,
+    OptimalMatchingEngine.name: OptimalMatchingEngine,
+}
+
+
+def get_matching_engine(name: str, **kwargs) -> MatchingEngine:
+    try:
+        engine_cls = MATCHING_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"未知的匹配引擎: {name}，可选: {', '.join(MATCHING_ENGINES)}")
+    return engine_cls(**kwargs)
@@ -1,148 +1,124 @@
 # app/services/matching_service.py
 from datetime import date
-from typing import List, Tuple, Optional
-from sqlmodel import Session
-import random
+from typing import List, Optional, Tuple
+from sqlmodel import Session, SQLModel
+import numpy as np
 
-from app.db.models.user_model import User
-from app.db.models.chat_room_model import ChatRoom # 需要导入 ChatRoom
+from app.core.config import settings
 from app.crud import event_signup_crud, match_crud
+from app.services import incremental_matching, match_snapshots
+from app.services.matching_engine import MatchingEngine, MatchPlan, get_matching_engine, match_sharded
+from app.services.pair_history import PairHistoryIndex, build_pair_history
 
-class MatchingService:
-    def __init__(self, db: Session):
-        self.db = db
 
-    def _get_eligible_users(self, event_date: date) -> List[User]:
-        signed_up_users = event_signup_crud.get_all_active_users_signed_up_for_date(
-            self.db, event_date=event_date
-        )
-        eligible_users = [user for user in signed_up_users if user.eng_level is not None]
-        random.shuffle(eligible_users) # 初始打乱，增加一些随机性
-        return eligible_users
+class MatchingReport(SQLModel):
+    """一次匹配的结果统计"""
+    event_date: date
+    engine: str = ""
+    rooms_created: int = 0
+    three_person_upgrades: int = 0 # 三人房数量
+    unmatched_user_ids: List[int] = []
+    mean_level_gap: float = 0.0 # 房间内最高与最低水平之差的平均值
+    repeat_pairs: int = 0 # 房间内最近同房过的用户对数量
+
 
-    def perform_matching(self, event_date: date) -> int:
+def encode_candidates(candidates: List[Tuple[int, int, Optional[str]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """把 (user_id, eng_level, industry) 列表转换为匹配引擎使用的数组，行业按名称排序编码，未填写为 -1"""
+    industry_codes = {name: code for code, name in enumerate(sorted({c[2] for c in candidates if c[2]}))}
+    user_ids = np.fromiter((c[0] for c in candidates), dtype=np.int64, count=len(candidates))
+    levels = np.fromiter((c[1] for c in candidates), dtype=np.int64, count=len(candidates))
+    industries = np.fromiter((industry_codes.get(c[2], -1) for c in candidates), dtype=np.int32, count=len(candidates))
+    return user_ids, levels, industries
+
+
+class MatchingService:
+    def __init__(
+        self,
+        db: Session,
+        engine: Optional[MatchingEngine] = None,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        incremental: Optional[bool] = None,
+    ):
+        self.db = db
+        self.engine = engine or get_matching_engine(settings.MATCHING_ENGINE, repeat_penalty=settings.MATCHING_REPEAT_PENALTY)
+        self.seed = seed # 指定 seed 时同一批报名数据的匹配结果可复现
+        self.workers = workers if workers is not None else settings.MATCHING_WORKERS
+        self.incremental = incremental if incremental is not None else settings.INCREMENTAL_MATCHING
+
+    def _get_eligible_users(self, event_date: date) -> List[Tuple[int, int, Optional[str]]]:
+        # 只取匹配需要的列，匹配过程完全在内存中进行
+        return event_signup_crud.get_matching_candidates_for_date(self.db, event_date=event_date)
+
+    def plan_matching(
+        self, candidates: List[Tuple[int, int, Optional[str]]], pair_history: Optional[PairHistoryIndex] = None
+    ) -> MatchPlan:
+        user_ids, levels, industries = encode_candidates(candidates)
+        if self.workers > 1 and len(candidates) >= settings.MATCHING_SHARD_MIN_SIZE:
+            return match_sharded(
+                self.engine, user_ids, levels, industries, seed=self.seed, workers=self.workers, pair_history=pair_history
+            )
+        return self.engine.match(user_ids, levels, industries, seed=self.seed, pair_history=pair_history)
+
+    def perform_matching(self, event_date: date) -> MatchingReport:
+        report = MatchingReport(event_date=event_date, engine=self.engine.name)
         if match_crud.check_if_matches_generated_for_date(self.db, event_date):
             print(f"警告: {event_date} 的匹配已经生成过。")
-            # 可以根据需要决定是否清除或直接返回
-            # match_crud.delete_matches_for_date(self.db, event_date) # 如果需要重新生成则取消注释
-            # print(f"{event_date} 的旧匹配已清除。")
-            return 0 # 或者抛出异常表明已匹配
+            return report
+
+        if self.incremental:
+            return self._finalize_incremental(report)
 
         users_to_match = self._get_eligible_users(event_date)
 
-        if not users_to_match or len(users_to_match) < 2:
+        if len(users_to_match) < 2:
             print(f"{event_date}: 没有足够的用户进行匹配 (需要至少2人)。实际人数: {len(users_to_match)}")
-            return 0
-
-        # 1. 按英语水平排序 (值越小水平越初级，便于寻找相近水平)
-        users_to_match.sort(key=lambda u: u.eng_level)
-        print(f"{event_date}: 参与匹配用户数 {len(users_to_match)}, 水平排序后: {[ (u.id, u.eng_level) for u in users_to_match]}")
-
-        created_rooms_count = 0
-        # 用于存储已创建的二人房间及其代表性英语水平 (例如房间内两人的平均水平，或其中一人的水平)
-        # (room_db_object, representative_level)
-        two_person_rooms_created: List[Tuple[ChatRoom, float]] = []
-        
-        participants_buffer = list(users_to_match)
-
-        # 2. 优先进行一对一匹配 (两人房)
-        # 我们将从头开始，每次尝试取两个水平相近的人
-        # 设定一个最大可接受的英语水平差异阈值（可选，但推荐）
-        MAX_LEVEL_DIFFERENCE = 1 # 例如，只允许水平相同或差异为1的用户匹配
-
-        # 使用一个索引来遍历，因为我们会从中移除元素
-        i = 0
-        while i < len(participants_buffer) -1: # 至少需要两个人才能匹配
-            user1 = participants_buffer[i]
-            
-            # 寻找与 user1 水平相近的 user2
-            # 最简单的方式是取下一个 user2 = participants_buffer[i+1]
-            # 但为了更好的水平控制，我们可以向前查找几个用户
-            best_match_user2 = None
-            smallest_diff = float('inf')
-            best_match_idx = -1
-
-            # 在 user1 后面的用户中寻找最佳匹配 (在设定的差异阈值内)
-            # 查找范围可以限定，比如 user1 后面的 k 个用户
-            # 为了简化，我们先考虑直接取下一个 (i+1)，如果差异在阈值内
-            if abs(user1.eng_level - participants_buffer[i+1].eng_level) <= MAX_LEVEL_DIFFERENCE:
-                best_match_user2 = participants_buffer[i+1]
-                best_match_idx = i + 1
-            
-            if best_match_user2:
-                room_participants = [user1, best_match_user2]
-                
-                # 从 participants_buffer 中移除已匹配的用户
-                # 必须先移除索引较大的，再移除索引较小的，避免索引错位
-                participants_buffer.pop(best_match_idx)
-                participants_buffer.pop(i)
-                
-                # 创建二人聊天室
-                new_room = match_crud.create_chat_room(self.db, event_date=event_date, room_type="2-person")
-                created_rooms_count += 1
-                avg_level = (user1.eng_level + best_match_user2.eng_level) / 2.0
-                two_person_rooms_created.append((new_room, avg_level))
-
-                print(f"创建二人房间: {new_room.room_identifier}, 用户: [({user1.id},{user1.eng_level}), ({best_match_user2.id},{best_match_user2.eng_level})], 平均水平: {avg_level}")
-                for p_user in room_participants:
-                    match_crud.add_participant_to_room(self.db, room_id=new_room.id, user_id=p_user.id)
-                
-                # 因为移除了元素，所以下一次循环的i不需要增加 (i保持不变，检查新的participants_buffer[i])
-            else:
-                # 如果 user1 找不到合适的匹配 (例如，下一个用户的水平差异过大)
-                # 这种情况下，user1 暂时会被跳过，i 增加，尝试为下一个用户匹配
-                # 这个被跳过的 user1 可能会成为最后的落单者
-                i += 1
-        
-        # 3. 处理剩余的用户 (此时 participants_buffer 中剩下的都是无法两两配对的)
-        if len(participants_buffer) == 1 and two_person_rooms_created:
-            lone_user = participants_buffer[0]
-            print(f"处理落单用户: ({lone_user.id}, {lone_user.eng_level})")
-
-            # 为这个落单用户寻找一个最合适的二人房间加入
-            best_room_to_join: Optional[ChatRoom] = None
-            min_level_diff_to_room = float('inf')
-
-            for room, room_avg_level in two_person_rooms_created:
-                # 计算落单用户与该房间代表水平的差异
-                # 同时，我们也应该考虑落单用户与房间内已有成员的个体差异，确保不会太离谱
-                # 这里简化为与房间平均水平的差异
-                diff = abs(lone_user.eng_level - room_avg_level)
-                
-                # 检查与房间内每个成员的差异是否也在可接受范围内 (可选，更严格)
-                # room_original_participants = match_crud.get_participants_for_room(self.db, room.id)
-                # individual_diffs_ok = True
-                # for p in room_original_participants:
-                #     if abs(lone_user.eng_level - p.eng_level) > MAX_LEVEL_DIFFERENCE + 1: # 可以用更宽松的阈值
-                #         individual_diffs_ok = False
-                #         break
-                # if not individual_diffs_ok:
-                #     continue
-
-                if diff < min_level_diff_to_room:
-                    # 同时，要确保加入后，这个三人间的水平差异不会过大
-                    # 这里可以加入更多关于“水平相近”的判断逻辑
-                    min_level_diff_to_room = diff
-                    best_room_to_join = room
-            
-            if best_room_to_join:
-                print(f"落单用户 {lone_user.id} 将加入房间 {best_room_to_join.room_identifier}")
-                match_crud.add_participant_to_room(self.db, room_id=best_room_to_join.id, user_id=lone_user.id)
-                
-                # 更新房间类型为三人房
-                best_room_to_join.room_type = "3-person"
-                self.db.add(best_room_to_join)
-                self.db.commit()
-                self.db.refresh(best_room_to_join)
-                
-                participants_buffer.pop(0) # 从buffer移除已处理的落单用户
-            else:
-                print(f"落单用户 {lone_user.id} 未能找到合适的二人房间加入 (可能所有房间水平差异过大)。该用户轮空。")
-
-        elif participants_buffer: # 如果还剩下超过1个用户，说明之前的两两配对逻辑有缺陷，或者人数太少
-            print(f"匹配结束后仍有多个用户未处理: {[ (u.id, u.eng_level) for u in participants_buffer]} (可能轮空)")
-        
-        if not participants_buffer:
-            print("所有用户均已成功匹配或处理。")
-
-        return created_rooms_count # 注意：这个计数目前只统计了初始创建的房间数，三人房是修改的
\ No newline at end of file
+            report.unmatched_user_ids = [c[0] for c in users_to_match]
+            return report
+
+        # 同房记录每次触发只用一次范围查询构建
+        pair_history = build_pair_history(self.db, event_date, settings.PAIR_HISTORY_DAYS)
+        plan = self.plan_matching(users_to_match, pair_history)
+
+        # 所有房间和参与者在一个事务中批量写入
+        report.rooms_created = match_crud.bulk_create_rooms(
+            self.db, event_date=event_date, room_groups=plan.rooms(), with_participant_snapshot=settings.ROOM_PARTICIPANT_SNAPSHOT,
+        )
+        report.three_person_upgrades = plan.three_person_rooms
+        report.unmatched_user_ids = plan.unmatched_ids.tolist()
+        report.mean_level_gap = plan.mean_level_gap
+        report.repeat_pairs = plan.repeat_pairs
+        self._build_snapshots(report)
+
+        print(
+            f"{event_date}: [{self.engine.name}] 参与匹配用户数 {len(users_to_match)}, 创建房间 {report.rooms_created} 个, "
+            f"三人房 {report.three_person_upgrades} 个, 轮空 {len(report.unmatched_user_ids)} 人, 重复同房 {report.repeat_pairs} 对"
+        )
+        return report
+
+    def _finalize_incremental(self, report: MatchingReport) -> MatchingReport:
+        """增量模式：报名期间已完成临时配对，这里只处理未配对用户并写库"""
+        matcher = incremental_matching.finalize_matching(self.db, report.event_date)
+        report.engine = "incremental"
+        report.rooms_created = match_crud.bulk_create_rooms(
+            self.db, event_date=report.event_date, room_groups=matcher.rooms, with_participant_snapshot=settings.ROOM_PARTICIPANT_SNAPSHOT,
+        )
+        report.three_person_upgrades = sum(1 for room in matcher.rooms if len(room) == 3)
+        report.unmatched_user_ids = matcher.unmatched_user_ids
+        report.mean_level_gap = matcher.mean_level_gap
+        self._build_snapshots(report)
+        print(
+            f"{report.event_date}: [incremental] 创建房间 {report.rooms_created} 个, "
+            f"三人房 {report.three_person_upgrades} 个, 轮空 {len(report.unmatched_user_ids)} 人"
+        )
+        return report
+
+    def _build_snapshots(self, report: MatchingReport) -> None:
+        """匹配结果提交后为每个用户生成 /matches/me 的结果。失败时只记录，接口会回退到按房间查询"""
+        if not settings.MATCH_SNAPSHOTS or not report.rooms_created:
+            return
+        try:
+            match_snapshots.build_snapshots(self.db, report.event_date)
+        except Exception as e:
+            self.db.rollback()
+            print(f"{report.event_date}: 生成匹配结果快照失败: {e}")
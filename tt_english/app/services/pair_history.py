@@ -0,0 +1,104 @@
+# app/services/pair_history.py
+# 历史同房记录索引：用于匹配时避免最近几天已经同房过的用户再次被分到一起。
+# 每对用户 (小 id, 大 id) 打包为一个 uint64 键，全部键排序去重后存放在一个 NumPy 数组中，
+# 每对只占 8 字节，查询用 searchsorted 批量进行，不需要逐对访问数据库。
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlmodel import Session
+
+from app.crud import match_crud
+
+# user_id 需小于 2^32 才能打包进一个 uint64
+_ID_BITS = np.uint64(32)
+
+
+def pack_pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """把两组 user_id 逐个组合打包为 (min_id << 32) | max_id，与顺序无关"""
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    return (np.minimum(a, b) << _ID_BITS) | np.maximum(a, b)
+
+
+def room_pairs(room_ids: np.ndarray, user_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    从按 room_id 排好序的 (room_id, user_id) 成员列表中取出所有同房用户对。
+    同一房间的成员在数组中连续，位置相差 k 且 room_id 相同的两人即为一对。
+    """
+    firsts, seconds = [], []
+    k = 1
+    while k < len(room_ids):
+        same_room = room_ids[k:] == room_ids[:-k]
+        if not same_room.any():
+            break
+        firsts.append(user_ids[:-k][same_room])
+        seconds.append(user_ids[k:][same_room])
+        k += 1
+    if not firsts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+class PairHistoryIndex:
+    """最近若干天内同房过的用户对集合 (只读)"""
+
+    def __init__(self, keys: np.ndarray):
+        self.keys = keys # 已排序且去重的 uint64 键
+
+    @classmethod
+    def from_pairs(cls, a: np.ndarray, b: np.ndarray) -> "PairHistoryIndex":
+        # 排序后去掉相邻重复 (比 np.unique 对 uint64 的处理快得多)
+        keys = np.sort(pack_pair_keys(a, b))
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return cls(keys)
+
+    @classmethod
+    def from_memberships(cls, room_ids: np.ndarray, user_ids: np.ndarray) -> "PairHistoryIndex":
+        return cls.from_pairs(*room_pairs(room_ids, user_ids))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes
+
+    def contains_many(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """批量查询，返回每对用户是否同房过的布尔数组"""
+        queries = pack_pair_keys(a, b)
+        found = np.zeros(len(queries), dtype=bool)
+        if not len(self.keys):
+            return found
+        # 先把查询排序再二分，访问索引数组时基本是顺序的，比直接对乱序查询二分快很多
+        order = np.argsort(queries)
+        sorted_queries = queries[order]
+        positions = np.searchsorted(self.keys, sorted_queries)
+        np.minimum(positions, len(self.keys) - 1, out=positions)
+        found[order] = self.keys[positions] == sorted_queries
+        return found
+
+    def contains(self, a: int, b: int) -> bool:
+        key = np.uint64((min(a, b) << 32) | max(a, b))
+        position = int(self.keys.searchsorted(key))
+        return position < len(self.keys) and bool(self.keys[position] == key)
+
+    def count_repeats(self, member_ids: np.ndarray, room_offsets: np.ndarray) -> int:
+        """统计一个房间分配方案中同房过的用户对数量"""
+        room_ids = np.repeat(np.arange(len(room_offsets) - 1), np.diff(room_offsets))
+        return int(np.count_nonzero(self.contains_many(*room_pairs(room_ids, member_ids))))
+
+
+def build_pair_history(db: Session, event_date: date, days: int) -> Optional[PairHistoryIndex]:
+    """用一次范围查询取出 event_date 之前 days 天内的所有房间成员，构建同房记录索引。days <= 0 时不启用。"""
+    if days <= 0:
+        return None
+    memberships = match_crud.get_room_memberships_in_range(
+        db, start_date=event_date - timedelta(days=days), end_date=event_date - timedelta(days=1)
+    )
+    room_ids = np.fromiter((row[0] for row in memberships), dtype=np.int64, count=len(memberships))
+    user_ids = np.fromiter((row[1] for row in memberships), dtype=np.int64, count=len(memberships))
+    order = np.argsort(room_ids, kind="stable") # 让同一房间的成员相邻
+    return PairHistoryIndex.from_memberships(room_ids[order], user_ids[order])
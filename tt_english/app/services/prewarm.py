@@ -0,0 +1,62 @@
+# app/services/prewarm.py
+# 冷启动后的后台预热 (FAST_STARTUP 且 STARTUP_PREWARM 时由 lifespan 在开始接收请求后启动)：
+# 提前建立几个数据库连接放回连接池，并创建微信接口的连接池、与微信接口完成一次握手，
+# 再加载本地时区、重建当天的报名统计计数器，缩容到零后的第一批请求不必再等这些工作。预热失败只打印日志，不影响服务。
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.database import async_engine, engine
+from app.services import signup_stats
+from app.services.wechat_service import wechat_service
+from app.utils import time_utils
+
+
+def _warm_sync_pool(connections: int) -> None:
+    opened = []
+    try:
+        for _ in range(connections): # 同时借出 connections 个连接，归还后都留在池中
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+async def _warm_async_pool(connections: int) -> None:
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = await async_engine.connect()
+            opened.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            await connection.close()
+
+
+async def _warm_db(connections: int) -> None:
+    await asyncio.to_thread(_warm_sync_pool, connections)
+    if async_engine is not None:
+        await _warm_async_pool(connections)
+
+
+def _warm_signup_stats() -> None:
+    with Session(engine) as db:
+        signup_stats.rebuild(db, time_utils.get_current_time_in_local_tz().date()) # 同时导入 pytz、加载本地时区
+
+
+async def run() -> None:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        _warm_db(settings.STARTUP_PREWARM_DB_CONNECTIONS), wechat_service.warm_up(), asyncio.to_thread(_warm_signup_stats),
+        return_exceptions=True,
+    )
+    for name, result in zip(("数据库连接池", "微信接口连接", "报名统计"), results):
+        if isinstance(result, Exception):
+            print(f"预热{name}失败: {result!r}")
+    print(f"后台预热完成，用时 {(time.perf_counter() - started) * 1000:.0f}ms")
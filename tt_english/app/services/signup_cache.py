@@ -0,0 +1,92 @@
+# app/services/signup_cache.py
+# 当天报名记录的进程内缓存：/events/status 是访问最频繁的接口，但某个用户的报名状态只在他自己报名时才会变化。
+# 每天第一次访问时用一次查询加载当天的全部报名 (user_id -> 报名 id、报名时间)，之后每次报名成功时更新，
+# /status 对已报名的用户直接查内存，不再逐个用户查询 EventSignup。
+# 缓存只能看到本进程处理的报名：缓存中没有的用户 (未报名，或在其他实例报名) 仍查询数据库，查到后加入缓存，多实例部署时结果也是准确的。
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.crud import event_signup_crud
+from app.db.models.event_signup_model import EventSignupRead
+
+
+class TodaySignupCache:
+    """单个活动日期的报名记录"""
+
+    def __init__(self, event_date: date, signups: Dict[int, Tuple[int, datetime]]):
+        self.event_date = event_date
+        self.signups = signups # user_id -> (报名 id, 报名时间)
+
+    def __len__(self) -> int:
+        return len(self.signups)
+
+    def get(self, user_id: int) -> Optional[EventSignupRead]:
+        entry = self.signups.get(user_id)
+        if entry is None:
+            return None
+        signup_id, signup_time = entry
+        return EventSignupRead(id=signup_id, user_id=user_id, event_date=self.event_date, signup_time=signup_time)
+
+    def add(self, signup) -> None:
+        self.signups[signup.user_id] = (signup.id, signup.signup_time)
+
+
+_cache: Optional[TodaySignupCache] = None
+_loading: Dict[date, Dict[int, Tuple[int, datetime]]] = {} # 正在加载的日期 -> 加载期间记录的报名
+# 只保护内存中的状态，持有期间不能访问数据库：异步驱动下同步函数通过 run_sync 在事件循环线程的 greenlet 中执行，
+# 查询时会让出事件循环，其他请求再获取这把锁会阻塞整个事件循环
+_lock = threading.Lock()
+
+
+def _get_cache(db: Session, event_date: date) -> Tuple[TodaySignupCache, bool]:
+    """返回 (当天的缓存, 是否由本次调用从数据库加载)，日期变化时重新加载 (旧日期的缓存随之丢弃)"""
+    global _cache
+    cache = _cache
+    if cache is not None and cache.event_date == event_date:
+        return cache, False
+    with _lock:
+        _loading.setdefault(event_date, {})
+    # 查询时不持有锁，加载期间的报名由 record_signup 记入 _loading，发布时合并
+    rows = event_signup_crud.get_signup_index_for_date(db, event_date)
+    with _lock:
+        signups = {user_id: (signup_id, signup_time) for user_id, signup_id, signup_time in rows}
+        signups.update(_loading.pop(event_date, {}))
+        if _cache is not None and _cache.event_date == event_date:
+            # 并发的加载已经发布，合并进去
+            for user_id, entry in signups.items():
+                _cache.signups.setdefault(user_id, entry)
+        else:
+            _cache = TodaySignupCache(event_date, signups)
+        return _cache, True
+
+
+def get_user_signup(db: Session, event_date: date, user_id: int) -> Optional[EventSignupRead]:
+    cache, loaded = _get_cache(db, event_date)
+    signup = cache.get(user_id)
+    if signup is not None or loaded:
+        return signup # 刚从数据库加载的缓存中没有就是没有报名
+    # 缓存中没有时查询数据库：报名可能是其他实例处理的
+    db_signup = event_signup_crud.get_event_signup_by_user_and_date(db, user_id=user_id, event_date=event_date)
+    if db_signup is None:
+        return None
+    record_signup(db_signup)
+    return EventSignupRead.model_validate(db_signup)
+
+
+def record_signup(signup) -> None:
+    """报名成功后调用。只更新已加载或正在加载的当天缓存，未加载时等下次访问从数据库加载"""
+    with _lock:
+        if _cache is not None and _cache.event_date == signup.event_date:
+            _cache.add(signup)
+        elif signup.event_date in _loading:
+            _loading[signup.event_date][signup.user_id] = (signup.id, signup.signup_time)
+
+
+def clear() -> None:
+    global _cache
+    with _lock:
+        _cache = None
+        _loading.clear()
@@ -0,0 +1,120 @@
+# app/services/signup_queue.py
+# 报名组提交：报名窗口刚开放时大量请求同时到达，逐个 SELECT + INSERT + COMMIT 会让数据库成为瓶颈。
+# 开启 SIGNUP_GROUP_COMMIT 后，报名请求只把 (user_id, event_date) 放进 asyncio 队列并等待结果，
+# 后台任务每隔几毫秒取出一批，用一次查询 + 一条多行 INSERT + 一次提交完成整批写入。
+import asyncio
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import event_signup_crud
+from app.db.database import engine
+from app.db.models.event_signup_model import EventSignupRead
+
+
+class DuplicateSignupError(Exception):
+    """用户当天已经报名过"""
+
+
+class SignupBatcher:
+    def __init__(self, batch_interval_ms: int, max_batch_size: int):
+        self.batch_interval = batch_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务，队列中已提交的报名会先写完"""
+        if not self.running:
+            return
+        await self._queue.put(None) # 结束标记
+        await self._task
+        self._task = None
+
+    async def submit(self, user_id: int, event_date: date) -> EventSignupRead:
+        """提交一个报名并等待所在批次写入完成，重复报名抛出 DuplicateSignupError"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((user_id, event_date, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            # 收到第一个报名后再等一个批次间隔，让同一时刻到达的报名进入同一批 (队列里已经攒够一批时不再等待)
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.batch_interval)
+            batch = [item]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            # 数据库操作是同步的，放到线程中执行，避免阻塞事件循环
+            try:
+                results = await asyncio.to_thread(self._write_batch, [(user_id, event_date) for user_id, event_date, _ in batch])
+            except Exception as exc:
+                print(f"报名批量写入失败 ({len(batch)} 条): {exc}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (user_id, event_date, future), result in zip(batch, results):
+                if future.done(): # 请求已被取消
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _write_batch(self, items: List[Tuple[int, date]]) -> List[object]:
+        """写入一批报名，按提交顺序返回每个请求的 EventSignupRead 或 DuplicateSignupError"""
+        signup_time = event_signup_crud.current_signup_time()
+        user_ids_by_date: Dict[date, List[int]] = defaultdict(list)
+        for user_id, event_date in items:
+            user_ids_by_date[event_date].append(user_id) # 跨零点时同一批可能有两个日期
+
+        created: Dict[Tuple[int, date], EventSignupRead] = {}
+        with Session(engine) as db:
+            for event_date, user_ids in user_ids_by_date.items():
+                signups, _ = event_signup_crud.bulk_create_event_signups(db, event_date, user_ids, signup_time)
+                for signup in signups:
+                    created[(signup.user_id, event_date)] = EventSignupRead.model_validate(signup)
+
+        results = []
+        for key in items:
+            # 同一用户在一批里重复提交时，只有第一个请求拿到新建的记录
+            result = created.pop(key, None)
+            results.append(result if result is not None else DuplicateSignupError())
+        return results
+
+
+_batcher = SignupBatcher(settings.SIGNUP_BATCH_INTERVAL_MS, settings.SIGNUP_BATCH_MAX_SIZE)
+
+
+def start() -> None:
+    """在应用启动时调用 (需要在事件循环中)"""
+    if not _batcher.running:
+        _batcher.start()
+
+
+async def stop() -> None:
+    await _batcher.stop()
+
+
+async def submit_signup(user_id: int, event_date: date) -> EventSignupRead:
+    return await _batcher.submit(user_id, event_date)
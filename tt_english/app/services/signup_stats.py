@@ -0,0 +1,138 @@
+# app/services/signup_stats.py
+# 当晚报名情况的实时统计 (供运维接口轮询)：总人数、英语水平分布、行业分布和预计房间数。
+# 计数器在启动时 (FAST_STARTUP 时在后台预热中，以及日期变化后第一次访问时) 用一次分组聚合查询重建，之后每次报名成功时累加，
+# 查询接口只读内存，不访问数据库。与 signup_cache 一样只统计本进程处理的报名。
+# 聚合查询同时取出已计入的最大报名 id，之后 record_signup 收到的报名 id 不大于它时视为已计入，
+# 在重建查询之前提交、但在重建之后才调用 record_signup 的报名不会被重复计数。
+# (并发事务的自增 id 可能乱序提交：id 较小、但在重建查询之后才提交的报名会被漏计，直到下次重建。)
+import threading
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.crud import event_signup_crud
+from app.db.models.event_signup_model import SignupStatsResponse
+from app.services.matching_defaults import DEFAULT_MAX_LEVEL_DIFFERENCE, DEFAULT_MAX_TRIO_LEVEL_SPREAD
+
+NO_INDUSTRY = "未填写"
+
+
+# 同一水平的人数超过这个值时，多出的人两两组成水平差为 0 的二人房，不影响其余的分组 (见 predict_room_counts)
+_RUN_KEEP = 7
+
+
+def predict_room_counts(
+    level_counts: Dict[int, int],
+    max_level_difference: int = DEFAULT_MAX_LEVEL_DIFFERENCE,
+    max_trio_level_spread: int = DEFAULT_MAX_TRIO_LEVEL_SPREAD,
+) -> Tuple[int, int, int]:
+    """
+    按英语水平分布计算 optimal 引擎分组后的 (二人房数, 三人房数, 轮空人数)，不考虑同房记录和分片匹配。
+    引擎的目标依次为轮空最少、水平差之和最小、三人房最少，这三项的最优值唯一确定了三个数，与并列时选哪种分组无关。
+    同一水平有 8 人以上时，最优分组中完全在这一档内部的至少有 4 人，其中一定有一个二人房 (否则两个三人房、
+    三人房加轮空或两个轮空都能改成二人房而更优)，去掉这两人不改变其余分组；反之也总能在档内插入一个二人房。
+    所以每档只保留 6 或 7 人 (与原人数奇偶相同) 交给引擎的动态规划，再把去掉的人数按二人房加回，耗时只与水平档数有关。
+    """
+    import numpy as np  # 只在查询统计时导入 NumPy 和匹配引擎，不拖慢冷启动
+
+    from app.services.matching_engine import OptimalMatchingEngine
+
+    kept_levels: List[int] = []
+    extra_pairs = 0
+    for level in sorted(level for level, count in level_counts.items() if count > 0):
+        count = level_counts[level]
+        kept = count if count <= _RUN_KEEP else _RUN_KEEP - 1 + count % 2
+        extra_pairs += (count - kept) // 2
+        kept_levels.extend([level] * kept)
+
+    engine = OptimalMatchingEngine(max_level_difference=max_level_difference, max_trio_level_spread=max_trio_level_spread)
+    sorted_levels = np.array(kept_levels, dtype=np.int64)
+    plan = engine.match_sorted(np.arange(len(kept_levels), dtype=np.int64), sorted_levels)
+    room_sizes = np.diff(plan.room_offsets)
+    return int(np.count_nonzero(room_sizes == 2)) + extra_pairs, int(np.count_nonzero(room_sizes == 3)), len(plan.unmatched_ids)
+
+
+class SignupStats:
+    """单个活动日期的报名计数器"""
+
+    def __init__(self, event_date: date):
+        self.event_date = event_date
+        self.total = 0
+        self.level_counts: Counter = Counter() # eng_level -> 人数，未填写为 None
+        self.industry_counts: Counter = Counter()
+        self.rebuilt_max_id = 0 # 重建时已计入的最大报名 id
+        self._lock = threading.Lock()
+
+    def add(self, eng_level: Optional[int], industry: Optional[str], count: int = 1) -> None:
+        with self._lock:
+            self.total += count
+            self.level_counts[eng_level] += count
+            self.industry_counts[industry or NO_INDUSTRY] += count
+
+    def add_signup(self, signup_id: int, eng_level: Optional[int], industry: Optional[str]) -> None:
+        """计入一条新报名，重建时已计入的报名忽略"""
+        if signup_id > self.rebuilt_max_id:
+            self.add(eng_level, industry)
+
+    def snapshot(self) -> SignupStatsResponse:
+        with self._lock:
+            level_histogram = dict(sorted((level, count) for level, count in self.level_counts.items() if level is not None))
+            no_level = self.level_counts.get(None, 0)
+            industry_counts = dict(self.industry_counts.most_common())
+            total = self.total
+        pairs, trios, unmatched = predict_room_counts(level_histogram)
+        return SignupStatsResponse(
+            event_date=self.event_date,
+            total_signups=total,
+            level_histogram=level_histogram,
+            no_level_signups=no_level,
+            industry_counts=industry_counts,
+            predicted_two_person_rooms=pairs,
+            predicted_three_person_rooms=trios,
+            predicted_unmatched=unmatched,
+        )
+
+
+_stats: Optional[SignupStats] = None
+_loading: Dict[date, List[Tuple[int, Optional[int], Optional[str]]]] = {} # 正在重建的日期 -> 重建期间记录的报名
+# 只保护内存中的状态，持有期间不能访问数据库 (异步驱动下 run_sync 中的查询会让出事件循环，见 signup_cache)
+_registry_lock = threading.Lock()
+
+
+def rebuild(db: Session, event_date: date) -> SignupStats:
+    """用一次分组聚合查询重建某天的计数器"""
+    global _stats
+    with _registry_lock:
+        _loading.setdefault(event_date, [])
+    # 查询时不持有锁，重建期间的报名由 record_signup 记入 _loading，发布时合并
+    rows = event_signup_crud.count_signups_by_level_and_industry(db, event_date)
+    with _registry_lock:
+        buffered = _loading.pop(event_date, [])
+        if _stats is not None and _stats.event_date == event_date:
+            return _stats # 并发的重建已经发布 (期间的报名已计入)，丢弃本次结果
+        stats = SignupStats(event_date)
+        for eng_level, industry, count, max_id in rows:
+            stats.add(eng_level, industry, count)
+            stats.rebuilt_max_id = max(stats.rebuilt_max_id, max_id)
+        for signup_id, eng_level, industry in buffered:
+            stats.add_signup(signup_id, eng_level, industry)
+        _stats = stats
+        return stats
+
+
+def get_stats(db: Session, event_date: date) -> SignupStats:
+    stats = _stats
+    if stats is None or stats.event_date != event_date:
+        stats = rebuild(db, event_date)
+    return stats
+
+
+def record_signup(event_date: date, signup_id: int, eng_level: Optional[int], industry: Optional[str]) -> None:
+    """报名成功后调用。计数器尚未加载或属于其他日期时不处理，下次访问时会从数据库重建"""
+    with _registry_lock:
+        if _stats is not None and _stats.event_date == event_date:
+            _stats.add_signup(signup_id, eng_level, industry)
+        elif event_date in _loading:
+            _loading[event_date].append((signup_id, eng_level, industry))
@@ -1,19 +1,91 @@
 
 #! 此文件用于模拟微信提供的api
 # app/services/wechat_service.py
-import httpx
+# 调用真实接口时使用一个在应用启动时创建的长连接 httpx.AsyncClient，登录高峰时不必每次重新建立 TCP + TLS 连接；
+# 同一个 code 的并发请求 (例如小程序重复提交) 合并为一次接口调用。
+import asyncio
+import random
 import uuid # 用于生成模拟数据
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from fastapi import HTTPException, status
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    import httpx # 在第一次创建连接池时才导入，缩短冷启动时间
+
+CODE2SESSION_PATH = "/sns/jscode2session"
+
+def mock_code_to_session_payload(code: str) -> Dict[str, Any]:
+    """模拟的 code2Session 返回数据，进程内模拟和 app.tools.mock_wechat_server 共用"""
+    if code == "invalid_mock_code":
+        return {"errcode": 40029, "errmsg": "无效的code (模拟错误)"}
+
+    # if code == "test_code_new_user":
+    #     mock_openid = f"mock_openid_new_{uuid.uuid4().hex[:10]}"
+    # elif code == "test_code_existing_user_1":
+    #     mock_openid = "mock_openid_existing_001" # 用于测试已存在用户的固定 openid
+    # elif code == "test_code_existing_user_2":
+    #     mock_openid = "mock_openid_existing_002"
+    # else:
+    #     # 默认行为：根据 code 生成一个 唯一的 openid
+    #     mock_openid = f"mock_openid_for_{code}_{uuid.uuid4().hex[:6]}"
+
+    mock_openid = f"mock_openid_for_{code}_"
+
+    mock_session_key = f"mock_session_key_{uuid.uuid4().hex[:10]}"
+
+    return {
+        "openid": mock_openid,
+        "session_key": mock_session_key,
+        # "unionid": "mock_unionid_..." # 如果你计划使用 unionid
+    }
+
 class WeChatService:
+    def __init__(self):
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._inflight: Dict[str, asyncio.Task] = {} # code -> 正在进行的接口调用
+
+    async def start(self) -> None:
+        """在应用启动时调用，创建连接池"""
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=settings.WECHAT_API_BASE_URL,
+                limits=httpx.Limits(
+                    max_connections=settings.WECHAT_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WECHAT_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(settings.WECHAT_HTTP_TIMEOUT_SECONDS),
+            )
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self) -> None:
+        """创建连接池并提前与微信接口建立一个连接 (TCP + TLS)，第一个登录请求不必再等握手"""
+        client = await self._get_client()
+        if not settings.MOCK_WECHAT_API:
+            await client.head("/")
+
+    async def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None: # 没有经过 lifespan 启动时 (例如脚本中直接调用) 按需创建
+            await self.start()
+        return self._client
+
     async def code_to_session(self, code: str) -> Dict[str, Any]:
         if settings.MOCK_WECHAT_API:
             return await self._mock_code_to_session(code)
-        else:
-            return await self._real_code_to_session(code)
+        # 同一个 code 只能换取一次 session，并发的重复请求等待同一次调用的结果
+        task = self._inflight.get(code)
+        if task is None:
+            task = asyncio.create_task(self._real_code_to_session(code))
+            self._inflight[code] = task
+            task.add_done_callback(lambda done: self._inflight.pop(code, None) if self._inflight.get(code) is done else None)
+        # shield：某个请求被取消时不影响其他等待同一结果的请求
+        return await asyncio.shield(task)
 
     async def _real_code_to_session(self, code: str) -> Dict[str, Any]:
         if not settings.WECHAT_APPID or not settings.WECHAT_APPSECRET:
@@ -29,27 +101,33 @@ class WeChatService:
             "js_code": code,
             "grant_type": "authorization_code",
         }
-        async with httpx.AsyncClient() as client:
+        client = await self._get_client()
+        import httpx # 已由 _get_client 导入，这里只是取得模块引用
+        # 登录 code 只能使用一次，请求一旦发出 (即使读取响应超时) 微信可能已经消费了它，再发会得到 40163 (code been used)。
+        # 所以只重试请求发出之前的失败 (建立连接失败、连接超时、等待连接池超时)，其余失败直接返回 503，由小程序重新获取 code 登录。
+        retries = settings.WECHAT_HTTP_RETRIES
+        for attempt in range(retries + 1):
+            if attempt:
+                # 指数退避 + 随机抖动，避免大量登录在同一时刻重试
+                await asyncio.sleep(random.uniform(0, settings.WECHAT_HTTP_RETRY_BACKOFF_MS * 2 ** (attempt - 1) / 1000))
+            try:
+                response = await client.get(CODE2SESSION_PATH, params=params)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as exc:
+                if attempt < retries:
+                    print(f"连接微信 API 失败: {exc!r}，第 {attempt + 1} 次重试")
+                    continue
+                print(f"连接微信 API 失败: {exc!r}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"连接微信 API 失败: {exc!r}")
+            except httpx.RequestError as exc:
+                # 读取超时等请求已发出后的网络错误不重试
+                print(f"请求微信 API 失败: {exc!r}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"请求微信 API 失败: {exc!r}")
+
+            if response.status_code >= 500:
+                print(f"微信 API 返回 {response.status_code}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"微信 API 暂不可用: {response.status_code}")
             try:
-                response = await client.get("https://api.weixin.qq.com/sns/jscode2session", params=params)
-                response.raise_for_status() # 如果HTTP状态码是4xx或5xx，则抛出异常
-                wechat_data = response.json()
-
-                # 对微信返回结果的基本校验
-                if "errcode" in wechat_data and wechat_data["errcode"] != 0:
-                    # 记录错误信息以便调试
-                    print(f"微信 API 错误: {wechat_data}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"微信 API 错误: {wechat_data.get('errmsg', '未知错误')}"
-                    )
-                if "openid" not in wechat_data:
-                    print(f"微信 API 错误: 'openid' 未在响应中 - {wechat_data}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="从微信获取 openid 失败 (响应格式错误)。"
-                    )
-                return wechat_data
+                response.raise_for_status() # 如果HTTP状态码是4xx，则抛出异常
             except httpx.HTTPStatusError as exc:
                 # 尽可能记录微信返回的实际错误信息
                 error_detail = f"连接微信 API 出错: {exc.response.status_code}"
@@ -59,9 +137,27 @@ class WeChatService:
                     error_detail += f" - {exc.response.text}"
                 print(error_detail)
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_detail)
-            except httpx.RequestError as exc:
-                print(f"请求微信 API 失败: {exc}")
-                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"请求微信 API 失败: {exc}")
+
+            wechat_data = response.json()
+            if wechat_data.get("errcode") == -1: # 系统繁忙
+                print(f"微信 API 系统繁忙: {wechat_data}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="微信 API 系统繁忙，请稍后重试")
+
+            # 对微信返回结果的基本校验
+            if "errcode" in wechat_data and wechat_data["errcode"] != 0:
+                # 记录错误信息以便调试
+                print(f"微信 API 错误: {wechat_data}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"微信 API 错误: {wechat_data.get('errmsg', '未知错误')}"
+                )
+            if "openid" not in wechat_data:
+                print(f"微信 API 错误: 'openid' 未在响应中 - {wechat_data}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="从微信获取 openid 失败 (响应格式错误)。"
+                )
+            return wechat_data
 
 
     async def _mock_code_to_session(self, code: str) -> Dict[str, Any]:
@@ -71,28 +167,7 @@ class WeChatService:
         （例如，新用户、已存在用户、无效 code）。
         """
         print(f"--- 调用模拟微信 API，code: {code} ---")
-        if code == "invalid_mock_code":
-            return {"errcode": 40029, "errmsg": "无效的code (模拟错误)"}
-        
-        # if code == "test_code_new_user":
-        #     mock_openid = f"mock_openid_new_{uuid.uuid4().hex[:10]}"
-        # elif code == "test_code_existing_user_1":
-        #     mock_openid = "mock_openid_existing_001" # 用于测试已存在用户的固定 openid
-        # elif code == "test_code_existing_user_2":
-        #     mock_openid = "mock_openid_existing_002"
-        # else:
-        #     # 默认行为：根据 code 生成一个 唯一的 openid
-        #     mock_openid = f"mock_openid_for_{code}_{uuid.uuid4().hex[:6]}"
-
-        mock_openid = f"mock_openid_for_{code}_"
-
-        mock_session_key = f"mock_session_key_{uuid.uuid4().hex[:10]}"
-        
-        return {
-            "openid": mock_openid,
-            "session_key": mock_session_key,
-            # "unionid": "mock_unionid_..." # 如果你计划使用 unionid
-        }
+        return mock_code_to_session_payload(code)
 
 # 你可以创建一个实例方便导入，或者使用 Depends 注入
 wechat_service = WeChatService()
\ No newline at end of file
@@ -0,0 +1,36 @@
+# app/tools/archive_events.py
+"""
+历史活动归档工具：把早于保留期 (ARCHIVE_RETENTION_DAYS) 的报名和匹配记录写入 ARCHIVE_DIR 下的 gzip JSON Lines 文件，
+再分批从 eventsignup / chatroom / chatroomparticipant 中删除。可以每天定时运行一次，重复运行是安全的。
+
+在 tt_english 目录下运行:
+    python -m app.tools.archive_events --dry-run
+    python -m app.tools.archive_events
+    python -m app.tools.archive_events --before 2025-01-01
+"""
+import argparse
+from datetime import date
+
+from sqlmodel import Session
+
+from app.db.database import engine
+from app.services import archive_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="归档并清理保留期之前的活动数据")
+    parser.add_argument("--before", type=date.fromisoformat, help="归档此日期之前的活动 YYYY-MM-DD (默认按 ARCHIVE_RETENTION_DAYS 计算)")
+    parser.add_argument("--dry-run", action="store_true", help="只列出将要归档的日期，不写文件也不删除")
+    args = parser.parse_args()
+
+    before_date = args.before or archive_service.retention_cutoff()
+    with Session(engine) as db:
+        results = archive_service.run_retention(db, before_date, dry_run=args.dry_run)
+    if not results:
+        print(f"{before_date} 之前没有需要归档的活动。")
+    else:
+        print(f"共 {len(results)} 天, 报名 {sum(r[1] for r in results)} 条, 房间 {sum(r[2] for r in results)} 个。")
+
+
+if __name__ == "__main__":
+    main()
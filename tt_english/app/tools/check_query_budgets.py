@@ -0,0 +1,109 @@
+# app/tools/check_query_budgets.py
+"""
+接口 SQL 查询预算检查：在一个临时 SQLite 数据库中准备用户、报名和匹配结果，然后逐个调用接口，
+断言每次请求执行的 SQL 语句数不超过 QUERY_BUDGETS 中的预算。每次请求前清空进程内的认证缓存和匹配结果缓存，
+按刚启动的进程 (最坏情况) 计数。有接口超出预算 (例如引入了 N+1 查询) 时列出执行过的语句并以非 0 状态退出，可以放在 CI 中运行。
+
+在 tt_english 目录下运行:
+    python -m app.tools.check_query_budgets
+    python -m app.tools.check_query_budgets --async-driver   # 接口使用异步引擎 (sqlite+aiosqlite)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+BUDGET_DATE = date(2025, 1, 1)
+USERS = 5
+
+# (方法, 路径) -> 允许的 SQL 语句数
+QUERY_BUDGETS = {
+    ("GET", "/api/v1/users/me"): 1,              # 认证：按 openid 读取用户
+    ("PUT", "/api/v1/users/me"): 3,              # 认证 + UPDATE + 刷新
+    ("GET", "/api/v1/events/status"): 2,         # 认证 + 加载当天报名缓存
+    ("GET", "/api/v1/matches/me"): 2,            # 认证 + matchsnapshot 一行
+    ("GET", "/api/v1/matches/me/roster"): 2,     # 认证 + 一条联表查询 (或房间一行成员快照)
+}
+
+
+def prepare() -> None:
+    """创建表，写入 USERS 个用户和他们在 BUDGET_DATE 的报名"""
+    from sqlmodel import Session
+
+    from app.db.database import create_db_and_tables, engine
+    from app.db.models.event_signup_model import EventSignup
+    from app.db.models.user_model import User
+
+    create_db_and_tables()
+    with Session(engine) as db:
+        db.exec(User.__table__.insert(), params=[
+            {"openid": f"budget_{i}", "nickname": f"u{i}", "eng_level": 3, "industry": "it", "is_active": True} for i in range(USERS)
+        ])
+        db.exec(EventSignup.__table__.insert(), params=[
+            {"user_id": i + 1, "event_date": BUDGET_DATE, "signup_time": datetime.utcnow()} for i in range(USERS)
+        ])
+        db.commit()
+
+
+async def check() -> list:
+    import httpx
+
+    from app.core import auth_cache
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.query_stats import query_budget
+    from app.main import app
+    from app.services import match_snapshots
+
+    failures = []
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'budget_0'})}"}
+    params = {"event_date_str": BUDGET_DATE.isoformat()}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://budget") as client:
+            response = await client.post(
+                "/api/v1/matches/trigger", params=params, headers={"X-Internal-Trigger-Token": settings.INTERNAL_TRIGGER_TOKEN},
+            )
+            response.raise_for_status()
+            for (method, path), budget in QUERY_BUDGETS.items():
+                auth_cache.clear()
+                match_snapshots.clear()
+                body = {"introduction": "hello"} if method == "PUT" else None
+                try:
+                    with query_budget(budget, label=f"{method} {path}") as stats:
+                        response = await client.request(method, path, params=params, headers=headers, json=body)
+                    response.raise_for_status()
+                    print(f"通过 {method} {path}: {stats.statements}/{budget} 条语句")
+                except (AssertionError, httpx.HTTPStatusError) as e:
+                    print(f"失败 {e}")
+                    failures.append((method, path))
+    return failures
+
+
+def run(db_path: str, async_driver: bool) -> list:
+    # 配置在导入 app 时读取，所以在导入之前指定临时数据库
+    os.environ["DATABASE_URL"] = f"{'sqlite+aiosqlite' if async_driver else 'sqlite'}:///{db_path}"
+    os.environ["MOCK_WECHAT_API"] = "true"
+    prepare()
+    return asyncio.run(check())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查各接口每次请求执行的 SQL 语句数")
+    parser.add_argument("--db-path", default=None, help="检查用的 SQLite 数据库文件，默认在临时目录中创建，检查结束后删除")
+    parser.add_argument("--async-driver", action="store_true", help="使用 sqlite+aiosqlite，检查异步引擎下的语句数")
+    args = parser.parse_args()
+
+    if args.db_path:
+        failures = run(args.db_path, args.async_driver)
+    else:
+        with tempfile.TemporaryDirectory(prefix="tt_english_budget_") as tmp_dir:
+            failures = run(os.path.join(tmp_dir, "budget.db"), args.async_driver)
+    if failures:
+        print(f"{len(failures)} 个接口超出查询预算")
+        sys.exit(1)
+    print("所有接口都在查询预算内")
+
+if __name__ == "__main__":
+    main()
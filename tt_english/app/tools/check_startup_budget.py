@@ -0,0 +1,90 @@
+# app/tools/check_startup_budget.py
+"""
+冷启动预算检查：在全新的子进程中测量 `import app.main` 的耗时和 FAST_STARTUP 模式下 lifespan 启动阶段的耗时 (取中位数)，
+并检查启动完成后没有提前导入只在少数接口中用到的重量级模块 (LAZY_MODULES)。超出预算或提前导入时以非 0 状态退出，可以放在 CI 中运行。
+预算按开发机上的实测值留出余量，CI 机器较慢时可以用参数调大。
+
+在 tt_english 目录下运行:
+    python -m app.tools.check_startup_budget
+    python -m app.tools.check_startup_budget --runs 7 --import-budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+IMPORT_BUDGET_MS = 1200
+STARTUP_BUDGET_MS = 100
+# 只在触发匹配 / 调用真实微信接口 / 用到本地时间时才需要的模块，不应在启动时导入
+LAZY_MODULES = ("numpy", "httpx", "pytz", "app.services.matching_service", "app.services.matching_engine")
+
+MEASURE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - started
+        loaded = [name for name in LAZY_MODULES if name in sys.modules]
+    return ready, loaded
+
+ready, loaded = asyncio.run(main())
+print("RESULT " + json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": ready * 1000, "eager_modules": loaded}))
+"""
+
+
+def measure(env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", f"LAZY_MODULES = {LAZY_MODULES!r}\n{MEASURE}"], env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(next(line for line in output.splitlines() if line.startswith("RESULT "))[len("RESULT "):])
+
+
+def measure_runs(db_path: str, runs: int) -> list:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", FAST_STARTUP="true", STARTUP_PREWARM="false")
+    # FAST_STARTUP 不建表，先在单独的进程中建好
+    subprocess.run([sys.executable, "-c", "from app.db.database import create_db_and_tables; create_db_and_tables()"],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    return [measure(env) for _ in range(runs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查冷启动耗时和启动时导入的模块")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--db-path", default=None, help="启动时连接的 SQLite 数据库文件，默认在临时目录中创建，检查结束后删除")
+    args = parser.parse_args()
+
+    if args.db_path:
+        results = measure_runs(args.db_path, args.runs)
+    else:
+        with tempfile.TemporaryDirectory(prefix="tt_english_startup_") as tmp_dir:
+            results = measure_runs(os.path.join(tmp_dir, "startup.db"), args.runs)
+    import_ms = statistics.median(result["import_ms"] for result in results)
+    startup_ms = statistics.median(result["startup_ms"] for result in results)
+    eager_modules = sorted({name for result in results for name in result["eager_modules"]})
+
+    failures = []
+    print(f"import app.main: {import_ms:.0f}ms (预算 {args.import_budget_ms:.0f}ms)")
+    print(f"lifespan 启动: {startup_ms:.0f}ms (预算 {args.startup_budget_ms:.0f}ms)")
+    if import_ms > args.import_budget_ms:
+        failures.append("导入耗时超出预算")
+    if startup_ms > args.startup_budget_ms:
+        failures.append("启动耗时超出预算")
+    if eager_modules:
+        failures.append(f"启动时提前导入了 {', '.join(eager_modules)}")
+    if failures:
+        print("失败: " + "; ".join(failures))
+        sys.exit(1)
+    print("冷启动在预算内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# app/tools/mock_wechat_server.py
+"""
+本地模拟的微信 code2Session 接口 (GET /sns/jscode2session)，用于离线压测登录。
+
+返回数据与 MOCK_WECHAT_API 的进程内模拟相同，另外可以注入延迟和错误：
+  --latency-ms / --latency-jitter-ms  每个请求的延迟 (均匀分布在 latency ± jitter 之间)
+  --error-rate                        返回 HTTP 500 的比例
+  --busy-rate                         返回 errcode -1 (系统繁忙) 的比例
+GET /stats 返回收到的请求数，可用来确认同一 code 合并的效果 (HTTP 500 和系统繁忙不会重试，应用直接返回 503)。
+
+在 tt_english 目录下运行，然后让应用以 MOCK_WECHAT_API=False、WECHAT_API_BASE_URL=http://127.0.0.1:8100 启动:
+    python -m app.tools.mock_wechat_server --port 8100 --latency-ms 80 --latency-jitter-ms 40 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+from fastapi import FastAPI, Response
+
+from app.services.wechat_service import CODE2SESSION_PATH, mock_code_to_session_payload
+
+
+def create_app(latency_ms: float = 0, latency_jitter_ms: float = 0, error_rate: float = 0, busy_rate: float = 0) -> FastAPI:
+    app = FastAPI(title="mock wechat api")
+    app.state.counts = Counter()
+
+    @app.get(CODE2SESSION_PATH)
+    async def jscode2session(js_code: str, appid: str = "", secret: str = "", grant_type: str = ""):
+        app.state.counts["requests"] += 1
+        delay = latency_ms + random.uniform(-latency_jitter_ms, latency_jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = random.random()
+        if roll < error_rate:
+            app.state.counts["errors"] += 1
+            return Response(status_code=500, content="mock internal error")
+        if roll < error_rate + busy_rate:
+            app.state.counts["busy"] += 1
+            return {"errcode": -1, "errmsg": "system busy (mock)"}
+        return mock_code_to_session_payload(js_code)
+
+    @app.get("/stats")
+    async def stats():
+        return dict(app.state.counts)
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地模拟微信 code2Session 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--busy-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.latency_jitter_ms, args.error_rate, args.busy_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
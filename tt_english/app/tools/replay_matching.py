@@ -0,0 +1,195 @@
+# app/tools/replay_matching.py
+"""
+匹配参数的历史回放 / what-if 工具。
+
+读取一段日期内每天的报名与用户数据，在一组参数组合 (匹配策略 × MAX_LEVEL_DIFFERENCE × 三人房跨度上限) 下
+重新运行匹配，只在内存中计算，不写入 chatroom 相关表。按天逐日处理并在进程池中并行，
+每个 worker 每次只加载一天的数据，一整年的历史也不需要同时放进内存。
+已归档 (从热表中删除) 的日期直接从归档文件读取，可以与热表中的日期混合回放。
+输出每天的明细表和按参数组合汇总的对比表，也可以把明细逐行写入 JSON Lines 文件。
+
+在 tt_english 目录下运行:
+    python -m app.tools.replay_matching --start 2025-01-01 --end 2025-03-31 \\
+        --strategies greedy optimal --max-level-differences 0 1 2 --max-trio-spreads 1 2 --workers 4
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.crud import event_signup_crud
+from app.db.database import engine
+from app.services import archive_service
+from app.services.incremental_matching import IncrementalMatcher
+from app.services.matching_engine import get_matching_engine
+from app.services.matching_service import encode_candidates
+
+STRATEGIES = ["greedy", "optimal", "incremental"]
+
+# (策略, MAX_LEVEL_DIFFERENCE, 三人房跨度上限)
+ParamSet = Tuple[str, int, int]
+
+
+def load_day(event_date: date) -> List[Tuple[int, int, Optional[str]]]:
+    """读取某一天的匹配候选人 (按报名先后排序)，已归档的日期从归档文件读取"""
+    if archive_service.has_archive(event_date):
+        return archive_service.load_archived_candidates(event_date)
+    with Session(engine) as db:
+        return event_signup_crud.get_matching_candidates_for_date(db, event_date, order_by_signup_time=True)
+
+
+def replay_candidates(
+    event_date: date, candidates: List[Tuple[int, int, Optional[str]]], param_sets: List[ParamSet], seed: int
+) -> List[Dict]:
+    rows = []
+    user_ids, levels, industries = encode_candidates(candidates)
+    for strategy, max_level_difference, max_trio_spread in param_sets:
+        started = time.perf_counter()
+        if strategy == "incremental":
+            matcher = IncrementalMatcher(event_date, max_level_difference, max_trio_spread)
+            for user_id, level, _ in candidates:
+                matcher.add_signup(user_id, level)
+            matcher.finalize()
+            rooms = len(matcher.rooms)
+            three_person_rooms = sum(1 for room in matcher.rooms if len(room) == 3)
+            unmatched = len(matcher.unmatched_user_ids)
+            mean_level_gap = matcher.mean_level_gap
+        else:
+            matching_engine = get_matching_engine(
+                strategy, max_level_difference=max_level_difference, max_trio_level_spread=max_trio_spread
+            )
+            plan = matching_engine.match(user_ids, levels, industries, seed=seed)
+            rooms, three_person_rooms = plan.room_count, plan.three_person_rooms
+            unmatched, mean_level_gap = len(plan.unmatched_ids), plan.mean_level_gap
+        rows.append({
+            "event_date": event_date.isoformat(),
+            "strategy": strategy,
+            "max_level_difference": max_level_difference,
+            "max_trio_spread": max_trio_spread,
+            "signups": len(candidates),
+            "rooms": rooms,
+            "three_person_rooms": three_person_rooms,
+            "unmatched": unmatched,
+            "mean_level_gap": round(mean_level_gap, 4),
+            "runtime_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+    return rows
+
+
+def replay_day(event_date: date, param_sets: List[ParamSet], seed: int) -> List[Dict]:
+    # 进程池 worker 的入口：只加载这一天的数据
+    return replay_candidates(event_date, load_day(event_date), param_sets, seed)
+
+
+def _init_worker():
+    # fork 出来的子进程不能复用父进程连接池里的连接
+    engine.dispose(close=False)
+
+
+def replay_range(
+    start_date: date, end_date: date, param_sets: List[ParamSet], seed: int = 42, workers: int = 1
+) -> Iterator[List[Dict]]:
+    """按日期顺序逐天产出每天的回放结果"""
+    with Session(engine) as db:
+        event_dates = event_signup_crud.get_event_dates_in_range(db, start_date, end_date)
+    event_dates = sorted(set(event_dates) | set(archive_service.archived_dates_in_range(start_date, end_date)))
+    if workers <= 1:
+        for event_date in event_dates:
+            yield replay_day(event_date, param_sets, seed)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # 按 workers 个一批提交，保持内存中待处理的结果有限
+        for batch_start in range(0, len(event_dates), workers):
+            batch = event_dates[batch_start:batch_start + workers]
+            yield from executor.map(replay_day, batch, [param_sets] * len(batch), [seed] * len(batch))
+
+
+class ReplaySummary:
+    """按参数组合累计的汇总统计"""
+
+    def __init__(self):
+        self.totals: Dict[ParamSet, Dict[str, float]] = {}
+
+    def add(self, row: Dict) -> None:
+        key = (row["strategy"], row["max_level_difference"], row["max_trio_spread"])
+        total = self.totals.setdefault(
+            key, {"days": 0, "signups": 0, "rooms": 0, "three_person_rooms": 0, "unmatched": 0, "gap_sum": 0.0, "runtime_ms": 0.0}
+        )
+        total["days"] += 1
+        for field in ("signups", "rooms", "three_person_rooms", "unmatched", "runtime_ms"):
+            total[field] += row[field]
+        total["gap_sum"] += row["mean_level_gap"] * row["rooms"]
+
+    def rows(self) -> List[Dict]:
+        result = []
+        for (strategy, max_level_difference, max_trio_spread), total in self.totals.items():
+            result.append({
+                "strategy": strategy,
+                "max_level_difference": max_level_difference,
+                "max_trio_spread": max_trio_spread,
+                "days": total["days"],
+                "signups": total["signups"],
+                "rooms": total["rooms"],
+                "three_person_rooms": total["three_person_rooms"],
+                "unmatched": total["unmatched"],
+                "unmatched_rate": round(total["unmatched"] / total["signups"], 4) if total["signups"] else 0.0,
+                "mean_level_gap": round(total["gap_sum"] / total["rooms"], 4) if total["rooms"] else 0.0,
+                "mean_runtime_ms": round(total["runtime_ms"] / total["days"], 2),
+            })
+        return result
+
+
+def print_table(rows: List[Dict], columns: List[str]) -> None:
+    widths = [max(len(col), *(len(str(row[col])) for row in rows)) for col in columns]
+    print("  ".join(col.rjust(width) for col, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[col]).rjust(width) for col, width in zip(columns, widths)))
+
+
+DAY_COLUMNS = ["event_date", "strategy", "max_level_difference", "max_trio_spread", "signups", "rooms",
+               "three_person_rooms", "unmatched", "mean_level_gap", "runtime_ms"]
+SUMMARY_COLUMNS = ["strategy", "max_level_difference", "max_trio_spread", "days", "signups", "rooms",
+                   "three_person_rooms", "unmatched", "unmatched_rate", "mean_level_gap", "mean_runtime_ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匹配参数历史回放 (只读，不写入匹配结果)")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="结束日期 YYYY-MM-DD (含)")
+    parser.add_argument("--strategies", nargs="+", default=["greedy", "optimal"], choices=STRATEGIES)
+    parser.add_argument("--max-level-differences", type=int, nargs="+", default=[1])
+    parser.add_argument("--max-trio-spreads", type=int, nargs="+", default=[2])
+    parser.add_argument("--workers", type=int, default=1, help="并行处理的进程数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="把每天的明细写入 JSON Lines 文件")
+    args = parser.parse_args()
+
+    param_sets = list(product(args.strategies, args.max_level_differences, args.max_trio_spreads))
+    summary = ReplaySummary()
+    output = open(args.output, "w") if args.output else None
+    try:
+        for day_rows in replay_range(args.start, args.end, param_sets, seed=args.seed, workers=args.workers):
+            print_table(day_rows, DAY_COLUMNS)
+            print()
+            for row in day_rows:
+                summary.add(row)
+                if output:
+                    output.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if output:
+            output.close()
+
+    if summary.totals:
+        print("汇总:")
+        print_table(summary.rows(), SUMMARY_COLUMNS)
+    else:
+        print(f"{args.start} ~ {args.end} 没有报名记录。")
+
+
+if __name__ == "__main__":
+    main()
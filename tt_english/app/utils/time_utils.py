@@ -1,17 +1,52 @@
 # app/utils/time_utils.py
-from datetime import datetime, time, timedelta
-import pytz # pip install pytz
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 from typing import Tuple # <--- 导入 Tuple
 
 from app.core.config import settings
 
+@lru_cache(maxsize=4)
+def _load_timezone(timezone_name: str):
+    # pytz 导入和加载时区数据共约 20ms，在第一次用到本地时间时才做 (FAST_STARTUP 时由后台预热完成)，不计入冷启动
+    import pytz # pip install pytz
+    return pytz.timezone(timezone_name)
+
 def get_local_timezone():
-    return pytz.timezone(settings.LOCAL_TIMEZONE)
+    return _load_timezone(settings.LOCAL_TIMEZONE)
 
 def get_current_time_in_local_tz() -> datetime:
     local_tz = get_local_timezone()
     return datetime.now(local_tz)
 
+class SignupWindow:
+    """某一天的报名窗口 (本地时间)"""
+
+    def __init__(self, start_local: datetime, end_local: datetime, start_time: time, end_time: time):
+        self.start_local = start_local
+        self.end_local = end_local
+        self.start_time = start_time # 用于展示和与 timetz() 比较的 time 对象
+        self.end_time = end_time
+
+    def contains(self, now_local: datetime) -> bool:
+        return self.start_local <= now_local < self.end_local
+
+
+@lru_cache(maxsize=4)
+def _build_signup_window(day: date, start_hour: int, end_hour: int, timezone_name: str) -> SignupWindow:
+    local_tz = _load_timezone(timezone_name)
+    return SignupWindow(
+        start_local=local_tz.localize(datetime.combine(day, time(start_hour))),
+        end_local=local_tz.localize(datetime.combine(day, time(end_hour))),
+        start_time=time(start_hour, 0, 0, tzinfo=local_tz),
+        end_time=time(end_hour, 0, 0, tzinfo=local_tz),
+    )
+
+def get_signup_window(day: date) -> SignupWindow:
+    """获取某一天的报名窗口，每天 (以及配置变化后) 只计算一次"""
+    return _build_signup_window(
+        day, settings.EVENT_SIGNUP_START_HOUR_LOCAL, settings.EVENT_SIGNUP_END_HOUR_LOCAL, settings.LOCAL_TIMEZONE
+    )
+
 # 修改返回类型注解
 def is_signup_window_open() -> tuple[bool, datetime, time, time]: # <--- 修改这里
     """
@@ -19,21 +54,11 @@ def is_signup_window_open() -> tuple[bool, datetime, time, time]: # <--- 修改
     返回: (是否开放, 当前本地时间, 开始时间对象, 结束时间对象)
     元组元素依次为: is_open (bool), now_local (datetime), signup_start_time_obj (time), signup_end_time_obj (time)
     """
-    local_tz = get_local_timezone()
-    now_local = datetime.now(local_tz) # 当前本地时区的 datetime 对象
-
-    # 创建不带日期的 time 对象，但包含时区信息，用于比较
-    signup_start_time_obj = time(settings.EVENT_SIGNUP_START_HOUR_LOCAL, 0, 0, tzinfo=local_tz)
-    signup_end_time_obj = time(settings.EVENT_SIGNUP_END_HOUR_LOCAL, 0, 0, tzinfo=local_tz)
-
-    # 获取当前本地时间的 time 部分 (包含时区)
-    current_local_timetz = now_local.timetz()
-
-    # 比较 time 对象
+    now_local = get_current_time_in_local_tz() # 当前本地时区的 datetime 对象
+    # 窗口边界按天预先计算好，这里只需比较
     # 报名开始时间 <= 当前时间 < 报名结束时间
-    is_open = signup_start_time_obj <= current_local_timetz < signup_end_time_obj
-    
-    return is_open, now_local, signup_start_time_obj, signup_end_time_obj
+    window = get_signup_window(now_local.date())
+    return window.contains(now_local), now_local, window.start_time, window.end_time
 
 def get_current_utc_time() -> datetime:
-    return datetime.now(pytz.utc)
\ No newline at end of file
+    return datetime.now(timezone.utc)
\ No newline at end of file
@@ -0,0 +1,134 @@
+# benchmarks/admission_benchmark.py
+"""
+准入控制 (app.core.admission.AdmissionMiddleware) 的开销和过载时的效果。
+
+1. 开销：直接在事件循环中调用一个最简单的 ASGI 应用，比较加上准入控制 (令牌充足、并发未满，请求全部放行) 前后每个请求的耗时。
+2. 过载：模拟的后端同时只能处理 --backend-concurrency 个请求 (相当于数据库连接池)，每个请求耗时 --service-ms，
+   按后端容量的 --overload 倍速率开环发送请求 (持续 --seconds 秒，来自 --users 个用户)，
+   比较不加准入控制 (请求在后端前无限排队) 和加上准入控制 (并发上限等于后端容量，最多排队 --queue-timeout-ms) 时
+   成功请求的延迟分位数和被拒绝 (429) 的请求数。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.admission_benchmark
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.admission import AdmissionMiddleware
+from app.core.security import create_access_token
+
+PATH = "/api/v1/matches/me"
+_authorization: Dict[int, bytes] = {} # 用户 -> Authorization 头 (准入控制按 token 对应的 openid 区分用户)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+def make_scope(user: int) -> Dict:
+    authorization = _authorization.get(user)
+    if authorization is None:
+        authorization = _authorization[user] = b"Bearer " + create_access_token({"sub": f"user-{user}"}).encode()
+    return {"type": "http", "method": "GET", "path": PATH, "headers": [(b"authorization", authorization)], "client": ("10.0.0.1", 1)}
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"null"})
+
+
+async def measure_overhead(requests: int, rounds: int) -> None:
+    scopes = [make_scope(i) for i in range(10000)]
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def run(app) -> float:
+        started = time.perf_counter()
+        for i in range(requests):
+            await app(scopes[i % len(scopes)], receive, send)
+        return time.perf_counter() - started
+
+    limited = AdmissionMiddleware(ok_app, rate=1e9, burst=10**9, max_concurrency=1000)
+    baseline = min([await run(ok_app) for _ in range(rounds)])
+    measured = min([await run(limited) for _ in range(rounds)])
+    print(f"开销 ({requests} 个请求 x {rounds} 轮取最小值): 不加 {baseline / requests * 1e6:.2f} us/请求, "
+          f"准入控制 {measured / requests * 1e6:.2f} us/请求, 增加 {(measured - baseline) / requests * 1e6:.2f} us/请求, "
+          f"全部放行: {set(statuses) == {200}}")
+
+
+async def overload(args, admission: bool) -> None:
+    backend = asyncio.Semaphore(args.backend_concurrency)
+
+    async def slow_app(scope, receive, send):
+        async with backend:
+            await asyncio.sleep(args.service_ms / 1000)
+        await ok_app(scope, receive, send)
+
+    app = AdmissionMiddleware(
+        slow_app, rate=args.user_rate, burst=args.user_burst, max_concurrency=args.backend_concurrency,
+        queue_timeout_ms=args.queue_timeout_ms, max_queue=args.max_queue,
+    ) if admission else slow_app
+    capacity = args.backend_concurrency * 1000 / args.service_ms
+    rate = capacity * args.overload
+    total = int(rate * args.seconds)
+    latencies: Dict[int, List[float]] = {}
+
+    async def one(i: int):
+        status = 0
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        started = time.perf_counter()
+        await app(make_scope(i % args.users), receive, send)
+        latencies.setdefault(status, []).append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(total): # 开环发送：按固定速率到达，不等待前面的请求完成
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    ok = np.array(latencies.get(200, [0.0])) * 1000
+    rejected = len(latencies.get(429, []))
+    print(
+        f"{'准入控制' if admission else '不加限制':>6}: 发送 {total} 个 ({rate:.0f} req/s, 后端容量 {capacity:.0f} req/s), 用时 {elapsed:.1f}s, "
+        f"成功 {len(latencies.get(200, []))} 个 p50 {np.percentile(ok, 50):.1f}ms p99 {np.percentile(ok, 99):.1f}ms, 429 {rejected} 个"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="准入控制的开销和过载时的效果")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--backend-concurrency", type=int, default=8)
+    parser.add_argument("--service-ms", type=float, default=10)
+    parser.add_argument("--overload", type=float, default=2.0, help="发送速率是后端容量的多少倍")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--user-rate", type=float, default=2.0)
+    parser.add_argument("--user-burst", type=int, default=10)
+    parser.add_argument("--queue-timeout-ms", type=int, default=50)
+    parser.add_argument("--max-queue", type=int, default=64)
+    args = parser.parse_args()
+
+    asyncio.run(measure_overhead(args.requests, args.rounds))
+    asyncio.run(overload(args, admission=False))
+    asyncio.run(overload(args, admission=True))
+
+
+if __name__ == "__main__":
+    main()
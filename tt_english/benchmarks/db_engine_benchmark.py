@@ -0,0 +1,169 @@
+# benchmarks/db_engine_benchmark.py
+"""
+同步引擎 vs 异步引擎的并发请求延迟对比。
+
+同步 Session 的查询在事件循环上执行，一个慢查询会让同一 worker 中所有进行中的请求一起等待；
+异步引擎 (DATABASE_URL 使用 sqlite+aiosqlite:// 等异步驱动) 在等待数据库时让出事件循环。
+测试中 C 个客户端循环调用 GET /api/v1/matches/me (每次 2 个查询，httpx ASGITransport 进程内调用)，
+同时有 --slow-tasks 个客户端不断调用一个只在测试中挂载的接口，它通过 get_db 执行一个耗时 --slow-query-ms 的查询
+(模拟某个慢请求)，比较两种引擎下 /matches/me 的吞吐量和延迟分位数。
+
+引擎在导入时由 DATABASE_URL 决定，所以每种模式在单独的子进程中运行。数据库默认为临时目录下的 SQLite 文件，
+慢查询通过注册到每个连接上的 SQL 函数 bench_sleep(ms) 实现，它在驱动执行查询的线程中休眠，与数据库端耗时的效果相同。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.db_engine_benchmark --requests 2000 --concurrency 10 --slow-tasks 0 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Dict, List
+
+BENCH_DATE = date(2025, 1, 1)
+OPENID_PREFIX = "db_engine_bench_"
+MODES = {"sync": "sqlite", "async": "sqlite+aiosqlite"}
+
+
+def seed(users: int) -> None:
+    """准备 users 个用户，两两一个房间"""
+    from sqlmodel import Session, SQLModel, select
+
+    from app.db.database import engine
+    from app.db.models.chat_room_model import ChatRoom
+    from app.db.models.chat_room_participant_model import ChatRoomParticipant
+    from app.db.models.user_model import User
+
+    engine.echo = False
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        if db.exec(select(User.id).where(User.openid == f"{OPENID_PREFIX}0")).first() is not None:
+            return
+        db.exec(User.__table__.insert(), params=[
+            {"openid": f"{OPENID_PREFIX}{i}", "eng_level": i % 10 + 1, "is_active": True} for i in range(users)
+        ])
+        user_ids = db.exec(select(User.id).where(User.openid.startswith(OPENID_PREFIX)).order_by(User.id)).all()
+        now = datetime.utcnow()
+        db.exec(ChatRoom.__table__.insert(), params=[
+            {"event_date": BENCH_DATE, "room_identifier": f"{OPENID_PREFIX}room_{i}", "created_at": now, "room_type": "2-person"}
+            for i in range(users // 2)
+        ])
+        room_ids = db.exec(select(ChatRoom.id).where(ChatRoom.room_identifier.startswith(OPENID_PREFIX)).order_by(ChatRoom.id)).all()
+        db.exec(ChatRoomParticipant.__table__.insert(), params=[
+            {"user_id": user_id, "room_id": room_ids[i // 2], "joined_at": now} for i, user_id in enumerate(user_ids[:len(room_ids) * 2])
+        ])
+        db.commit()
+
+
+def run_worker(requests: int, concurrency: int, slow_tasks: int, slow_query_ms: int) -> Dict:
+    import httpx
+    import numpy as np
+    from sqlalchemy import event, text
+    from fastapi import Depends
+
+    from app.core.security import create_access_token
+    from app.db.database import DbSession, async_engine, engine, get_db, maybe_await
+    from app.main import app
+
+    def register_sleep(dbapi_connection, connection_record):
+        dbapi_connection.create_function("bench_sleep", 1, lambda ms: time.sleep(ms / 1000) or 1)
+
+    engines = [engine] + ([async_engine] if async_engine is not None else [])
+    for e in engines:
+        e.echo = False # 关闭 SQL 日志，否则打印本身就会成为瓶颈
+        event.listen(getattr(e, "sync_engine", e), "connect", register_sleep)
+
+    tokens = [create_access_token({"sub": f"{OPENID_PREFIX}{i % 1000}"}) for i in range(requests)]
+    slow_statement = text("SELECT bench_sleep(:ms)").bindparams(ms=slow_query_ms)
+
+    @app.get("/bench/slow")
+    async def slow_endpoint(db: DbSession = Depends(get_db)):
+        await maybe_await(db.exec(slow_statement))
+        return {}
+
+    async def main():
+        latencies = []
+        statuses: Dict[int, int] = {}
+        pending = list(reversed(tokens))
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                async def fast_client():
+                    while pending:
+                        token = pending.pop()
+                        started = time.perf_counter()
+                        response = await client.get(
+                            "/api/v1/matches/me", params={"event_date_str": BENCH_DATE.isoformat()},
+                            headers={"Authorization": f"Bearer {token}"},
+                        )
+                        latencies.append(time.perf_counter() - started)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                        await asyncio.sleep(0)
+
+                async def slow_client(counter: List[int]):
+                    while pending:
+                        await client.get("/bench/slow")
+                        counter[0] += 1
+                        await asyncio.sleep(0) # 进程内调用没有网络等待，主动让出一次，否则同步模式下会一直占着事件循环
+
+                slow_count = [0]
+                slow = [asyncio.create_task(slow_client(slow_count)) for _ in range(slow_tasks)]
+                started = time.perf_counter()
+                await asyncio.gather(*(fast_client() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+                await asyncio.gather(*slow)
+        latencies_ms = np.array(latencies) * 1000
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(tokens) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+            "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+            "slow_queries": slow_count[0],
+            "statuses": statuses,
+        }
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步引擎 vs 异步引擎的并发请求延迟对比")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--slow-tasks", type=int, nargs="+", default=[0, 2], help="持续调用慢接口的客户端数，可给多个值")
+    parser.add_argument("--slow-query-ms", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--db-path", default=os.path.join(tempfile.gettempdir(), "tt_english_db_engine_bench.db"))
+    parser.add_argument("--worker", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.requests, args.concurrency, args.slow_tasks[0], args.slow_query_ms)
+        print("RESULT " + json.dumps(result))
+        return
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{args.db_path}")
+    subprocess.run([sys.executable, "-c", "from benchmarks.db_engine_benchmark import seed; seed(1000)"], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    print(f"数据库: {args.db_path}, {args.requests} 个请求, 并发 {args.concurrency}, 慢查询 {args.slow_query_ms}ms")
+    for slow_tasks in args.slow_tasks:
+        for mode in args.modes:
+            env["DATABASE_URL"] = f"{MODES[mode]}:///{args.db_path}"
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.db_engine_benchmark", "--worker", mode, "--requests", str(args.requests),
+                 "--concurrency", str(args.concurrency), "--slow-tasks", str(slow_tasks), "--slow-query-ms", str(args.slow_query_ms)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(next(line for line in output.splitlines() if line.startswith("RESULT "))[len("RESULT "):])
+            print(
+                f"{mode:>5} 慢请求客户端 {slow_tasks}: {result['elapsed_s']}s, {result['throughput_rps']} req/s, "
+                f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, 期间慢查询 {result['slow_queries']} 次, 状态码 {result['statuses']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# benchmarks/loadtest
+"""
+模拟一个完整晚上的端到端压测：登录高峰 -> 报名窗口打开时的报名高峰 (含重复提交) -> 报名状态轮询 -> 触发匹配 -> /matches/me 集中查询。
+请求通过 httpx ASGITransport 直接调用 FastAPI 应用 (MOCK_WECHAT_API=True)，数据库为 SQLite 文件或 --database-url 指定的 MySQL。
+
+    python -m benchmarks.loadtest.seed --users 5000                  # 批量准备用户 (可单独运行，重复运行只补齐缺少的用户)
+    python -m benchmarks.loadtest.run --users 5000 --concurrency 50  # 运行场景，报告写入 JSON 文件
+    python -m benchmarks.loadtest.run --users 5000 --baseline loadtest-report-old.json  # 与之前的报告对比
+
+应用的配置在导入时读取，两个入口都先根据参数设置环境变量再导入 app。
+"""
+import os
+import tempfile
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'tt_english_loadtest.db')}"
+
+
+def configure_environment(database_url: str) -> None:
+    """在导入 app 之前调用"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["MOCK_WECHAT_API"] = "true"
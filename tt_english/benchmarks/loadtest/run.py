@@ -0,0 +1,231 @@
+# benchmarks/loadtest/run.py
+"""
+按晚上的流量顺序运行压测场景，每个阶段由 --concurrency 个客户端并发发送请求：
+  login       每个用户登录一次 (模拟微信登录)，得到 token
+  signup      每个用户报名一次，其中 --signup-retry-ratio 比例的用户重复提交一次 (得到 409)
+  status      每个用户轮询 /events/status --status-polls 次
+  trigger     触发当天的匹配
+  matches_me  每个用户查询 /matches/me --match-polls 次
+报告中每个阶段、每个接口有请求数、吞吐量、p50/p95/p99 延迟、状态码分布和 SQL 语句数 (见 app.db.query_stats)，
+写入 --output 指定的 JSON 文件；--baseline 指定之前的报告时打印对比。
+
+为了随时都能运行，默认把 LOCAL_TIMEZONE 设为当前正值中午的固定时区 (Etc/GMT±N)，报名窗口设为 0-23 点，
+保证报名窗口是打开的 (--keep-window 时使用原有配置)。运行前会删除压测用户当天的报名和当天的匹配结果，请使用专门的压测数据库。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.loadtest.run --users 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.loadtest import DEFAULT_DATABASE_URL, configure_environment
+
+Request = Tuple[str, str, dict] # (方法, 路径, httpx 参数)
+
+
+def open_signup_window() -> None:
+    """选一个当前为 12 点的固定时区，报名窗口 0-23 点"""
+    offset = 12 - datetime.utcnow().hour # 本地时间 = UTC + offset，范围 -11..12
+    os.environ["LOCAL_TIMEZONE"] = "Etc/GMT" + (f"{-offset:+d}" if offset else "") # Etc/GMT 时区名的符号与偏移相反
+    os.environ["EVENT_SIGNUP_START_HOUR_LOCAL"] = "0"
+    os.environ["EVENT_SIGNUP_END_HOUR_LOCAL"] = "23"
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.statements = 0
+        self.db_time = 0.0
+
+    def report(self, elapsed: float) -> Dict:
+        latencies_ms = np.array(self.latencies) * 1000
+        requests = len(self.latencies)
+        return {
+            "requests": requests,
+            "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+            "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+            "db_statements": self.statements,
+            "db_statements_per_request": round(self.statements / requests, 2),
+            "db_time_ms": round(self.db_time * 1000, 1),
+        }
+
+
+async def run_phase(client, requests: List[Request], concurrency: int) -> Tuple[Dict, List]:
+    """并发发送 requests，返回 (阶段报告, 每个请求的响应 (按 requests 的顺序))"""
+    from app.db.query_stats import track
+
+    endpoints: Dict[str, EndpointStats] = {}
+    responses: List = [None] * len(requests)
+    pending = list(range(len(requests) - 1, -1, -1))
+
+    async def worker():
+        while pending:
+            index = pending.pop()
+            method, path, kwargs = requests[index]
+            stats = endpoints.setdefault(f"{method} {path}", EndpointStats())
+            started = time.perf_counter()
+            with track() as query_stats: # ASGITransport 在同一个任务中调用应用，请求中的 SQL 都会计入
+                response = await client.request(method, path, **kwargs)
+            stats.latencies.append(time.perf_counter() - started)
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            stats.statements += query_stats.statements
+            stats.db_time += query_stats.db_time
+            responses[index] = response
+            await asyncio.sleep(0) # 进程内调用没有网络等待，主动让出，让并发的客户端交替执行
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(requests),
+        "endpoints": {name: stats.report(elapsed) for name, stats in endpoints.items()},
+    }, responses
+
+
+def reset_event_date(users: int) -> None:
+    """删除压测用户当天的报名和当天的匹配结果"""
+    from sqlmodel import Session, select
+
+    from app.crud import match_crud
+    from app.db.database import engine
+    from app.db.models.event_signup_model import EventSignup
+    from app.db.models.user_model import User
+    from app.utils import time_utils
+    from benchmarks.loadtest.seed import openid_for
+
+    today = time_utils.get_current_time_in_local_tz().date()
+    with Session(engine) as db:
+        user_ids = select(User.id).where(User.openid.in_([openid_for(i) for i in range(users)]))
+        db.exec(EventSignup.__table__.delete().where(EventSignup.event_date == today, EventSignup.user_id.in_(user_ids)))
+        match_crud.delete_matches_for_date(db, today) # 同时提交
+    print(f"活动日期 {today} ({os.environ.get('LOCAL_TIMEZONE', '默认时区')})")
+
+
+async def run_scenario(args) -> Dict:
+    import httpx
+
+    from app.core.config import settings
+    from app.db.database import async_engine, engine
+    from app.main import app
+    from app.utils import time_utils
+    from benchmarks.loadtest.seed import login_code
+
+    for e in [engine] + ([async_engine] if async_engine is not None else []):
+        e.echo = False
+    rng = random.Random(args.seed)
+    phases: Dict[str, Dict] = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            print("login ...")
+            phases["login"], responses = await run_phase(client, [
+                ("POST", "/api/v1/users/login", {"json": {"code": login_code(i)}}) for i in range(args.users)
+            ], args.concurrency)
+            headers = [{"Authorization": f"Bearer {r.json()['access_token']}"} for r in responses if r.status_code == 200]
+
+            print("signup ...")
+            signups = [("POST", "/api/v1/events/signup", {"headers": h}) for h in headers]
+            signups += [("POST", "/api/v1/events/signup", {"headers": h}) for h in headers if rng.random() < args.signup_retry_ratio]
+            phases["signup"], _ = await run_phase(client, signups, args.concurrency)
+
+            print("status ...")
+            polls = [("GET", "/api/v1/events/status", {"headers": h}) for h in headers for _ in range(args.status_polls)]
+            rng.shuffle(polls)
+            phases["status"], _ = await run_phase(client, polls, args.concurrency)
+
+            print("trigger ...")
+            today = time_utils.get_current_time_in_local_tz().date()
+            phases["trigger"], responses = await run_phase(client, [(
+                "POST", "/api/v1/matches/trigger",
+                {"params": {"event_date_str": today.isoformat()}, "headers": {"X-Internal-Trigger-Token": settings.INTERNAL_TRIGGER_TOKEN}},
+            )], 1)
+            if responses[0].status_code == 200:
+                phases["trigger"]["report"] = {
+                    key: value for key, value in responses[0].json()["report"].items() if key != "unmatched_user_ids"
+                }
+
+            print("matches_me ...")
+            lookups = [("GET", "/api/v1/matches/me", {"headers": h}) for h in headers for _ in range(args.match_polls)]
+            rng.shuffle(lookups)
+            phases["matches_me"], _ = await run_phase(client, lookups, args.concurrency)
+
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {
+            "users": args.users, "concurrency": args.concurrency, "status_polls": args.status_polls, "match_polls": args.match_polls,
+            "signup_retry_ratio": args.signup_retry_ratio, "database": engine.url.get_backend_name(),
+            "async_db": async_engine is not None,
+            "settings": {name: getattr(settings, name) for name in (
+                "SIGNUP_GROUP_COMMIT", "INCREMENTAL_MATCHING", "TODAY_SIGNUP_CACHE", "MATCH_SNAPSHOTS", "FAST_JSON_RESPONSES",
+                "ADMISSION_CONTROL", "MATCHING_ENGINE", "DB_POOL_SIZE",
+            )},
+        },
+        "phases": phases,
+    }
+
+
+def print_report(report: Dict, baseline: Optional[Dict]) -> None:
+    for phase, result in report["phases"].items():
+        print(f"[{phase}] {result['requests']} 个请求, {result['elapsed_s']}s")
+        for name, stats in result["endpoints"].items():
+            line = (
+                f"  {name:<32} {stats['throughput_rps']:>8} req/s  p50 {stats['p50_ms']:>7}ms  p95 {stats['p95_ms']:>7}ms  "
+                f"p99 {stats['p99_ms']:>7}ms  SQL {stats['db_statements_per_request']}/请求  状态码 {stats['statuses']}"
+            )
+            old = (baseline or {}).get("phases", {}).get(phase, {}).get("endpoints", {}).get(name)
+            if old:
+                line += f"  (基线 {old['throughput_rps']} req/s, p99 {old['p99_ms']}ms, SQL {old['db_statements_per_request']}/请求)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟一个晚上的端到端压测")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--status-polls", type=int, default=3)
+    parser.add_argument("--match-polls", type=int, default=2)
+    parser.add_argument("--signup-retry-ratio", type=float, default=0.2, help="重复提交报名的用户比例")
+    parser.add_argument("--distribution", default="bimodal", choices=["uniform", "skewed", "bimodal"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--keep-window", action="store_true", help="使用原有的时区和报名窗口配置")
+    parser.add_argument("--output", default=f"loadtest-report-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--baseline", help="之前的报告，打印对比")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    if not args.keep_window:
+        open_signup_window()
+    from benchmarks.loadtest.seed import seed_users
+
+    created = seed_users(args.users, args.distribution, args.seed)
+    print(f"新写入 {created} 个用户 (共 {args.users} 个)")
+    reset_event_date(args.users)
+    report = asyncio.run(run_scenario(args))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"报告已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
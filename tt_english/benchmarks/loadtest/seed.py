@@ -0,0 +1,72 @@
+# benchmarks/loadtest/seed.py
+"""
+批量准备压测用户：第 i 个用户的 openid 与用 code "loadtest_{i}" 调用模拟微信登录得到的 openid 相同，
+登录时按已有用户处理。英语水平按 benchmarks.matching_benchmark 中的分布生成，行业按 INDUSTRY_WEIGHTS 的比例。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.loadtest.seed --users 5000 --distribution bimodal
+"""
+import argparse
+from typing import List
+
+import numpy as np
+
+from benchmarks.loadtest import DEFAULT_DATABASE_URL, configure_environment
+
+CODE_PREFIX = "loadtest_"
+SEED_CHUNK_SIZE = 5000
+INDUSTRY_WEIGHTS = {
+    "互联网": 0.24, "金融": 0.14, "教育": 0.12, "制造": 0.10, "医疗": 0.08, "外贸": 0.08,
+    "咨询": 0.06, "媒体": 0.05, "公务员": 0.05, "学生": 0.05, "其他": 0.03,
+}
+
+
+def login_code(index: int) -> str:
+    return f"{CODE_PREFIX}{index}"
+
+
+def openid_for(index: int) -> str:
+    from app.services.wechat_service import mock_code_to_session_payload
+    return mock_code_to_session_payload(login_code(index))["openid"]
+
+
+def seed_users(users: int, distribution: str = "bimodal", seed: int = 42) -> int:
+    """补齐 users 个压测用户，返回新写入的数量"""
+    from sqlmodel import Session, SQLModel, select
+
+    from app.db.database import engine
+    from app.db.models.user_model import User
+    from benchmarks.matching_benchmark import generate_levels
+
+    SQLModel.metadata.create_all(engine)
+    rng = np.random.default_rng(seed)
+    levels = generate_levels(users, distribution, rng).tolist()
+    industries = rng.choice(list(INDUSTRY_WEIGHTS), size=users, p=list(INDUSTRY_WEIGHTS.values())).tolist()
+    prefix = openid_for(0).split(login_code(0))[0] + CODE_PREFIX # 所有压测用户 openid 的共同前缀
+    with Session(engine) as db:
+        existing = set(db.exec(select(User.openid).where(User.openid.startswith(prefix))).all())
+        rows: List[dict] = [
+            {"openid": openid_for(i), "nickname": f"lt{i}", "eng_level": levels[i], "industry": industries[i], "is_active": True}
+            for i in range(users) if openid_for(i) not in existing
+        ]
+        for start in range(0, len(rows), SEED_CHUNK_SIZE):
+            db.exec(User.__table__.insert(), params=rows[start:start + SEED_CHUNK_SIZE])
+        db.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量准备压测用户")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--distribution", default="bimodal", choices=["uniform", "skewed", "bimodal"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    created = seed_users(args.users, args.distribution, args.seed)
+    print(f"新写入 {created} 个用户 (共 {args.users} 个)")
+
+
+if __name__ == "__main__":
+    main()
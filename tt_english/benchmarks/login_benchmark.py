@@ -0,0 +1,117 @@
+# benchmarks/login_benchmark.py
+"""
+登录接口基准测试：模拟报名窗口开放前的集中登录。
+
+在后台线程中启动 app.tools.mock_wechat_server (可注入延迟和错误率)，应用以 MOCK_WECHAT_API=False 通过
+连接池调用它，N 个登录以 C 的并发调用 POST /api/v1/users/login (httpx ASGITransport，进程内调用)。
+--duplicate-rate 比例的请求重复使用前一个请求的 code，用来观察同一 code 的并发请求是否被合并。
+输出吞吐量、延迟分位数、状态码分布，以及模拟服务实际收到的请求数。
+数据库默认使用临时目录下的 SQLite 文件；与报名基准测试一样，并发数不宜超过数据库连接池容量。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.login_benchmark --logins 2000 --concurrency 10 --latency-ms 80
+    python -m benchmarks.login_benchmark --error-rate 0.05 --busy-rate 0.05 --duplicate-rate 0.2
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'tt_english_login_bench.db')}")
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+import numpy as np
+import uvicorn
+
+from app.core.config import settings
+from app.db.database import engine
+from app.main import app
+from app.tools.mock_wechat_server import create_app
+
+
+def start_mock_server(latency_ms: float, latency_jitter_ms: float, error_rate: float, busy_rate: float):
+    """在后台线程中启动模拟微信接口，返回 (base_url, 模拟服务的 app)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    mock_app = create_app(latency_ms, latency_jitter_ms, error_rate, busy_rate)
+    server = uvicorn.Server(uvicorn.Config(mock_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", mock_app
+
+
+def make_codes(count: int, duplicate_rate: float, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    codes = []
+    for _ in range(count):
+        if codes and rng.random() < duplicate_rate:
+            codes.append(codes[-1]) # 小程序重复提交同一个 code
+        else:
+            codes.append(f"bench_{uuid.uuid4().hex[:12]}")
+    return codes
+
+
+async def run(codes: List[str], concurrency: int) -> Dict:
+    latencies = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def login(code: str):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/v1/users/login", json={"code": code})
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(login(code) for code in codes))
+            elapsed = time.perf_counter() - started
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(codes) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录接口基准测试 (本地模拟微信接口)")
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--busy-rate", type=float, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine.echo = False # 关闭 SQL 日志，否则打印本身就会成为瓶颈
+    base_url, mock_app = start_mock_server(args.latency_ms, args.latency_jitter_ms, args.error_rate, args.busy_rate)
+    settings.MOCK_WECHAT_API = False
+    settings.WECHAT_API_BASE_URL = base_url
+
+    codes = make_codes(args.logins, args.duplicate_rate, args.seed)
+    result = asyncio.run(run(codes, args.concurrency))
+    print(f"数据库: {engine.url.render_as_string(hide_password=True)}, 模拟微信接口: {base_url} (延迟 {args.latency_ms}ms)")
+    print(
+        f"{len(codes)} 个登录 (不同 code {len(set(codes))} 个) {result['elapsed_s']}s, {result['throughput_rps']} req/s, "
+        f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, 状态码 {result['statuses']}"
+    )
+    print(f"模拟接口收到: {dict(mock_app.state.counts)}")
+
+
+if __name__ == "__main__":
+    main()
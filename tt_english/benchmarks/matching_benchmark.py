@@ -0,0 +1,233 @@
+# benchmarks/matching_benchmark.py
+"""
+匹配性能基准测试。
+
+用合成的报名人群 (1k/10k/100k/1M，英语水平分布为 uniform/skewed/bimodal) 运行各匹配策略，
+分别在纯内存模式 (只跑匹配引擎) 和内存 SQLite 模式 (完整的 MatchingService.perform_matching，含读库和写库) 下测量：
+耗时、内存峰值、SQL 语句数，以及匹配质量 (房间内平均水平差、轮空人数)。
+结果保存为 JSON，可以用 --compare 与之前某次提交的结果对比。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.matching_benchmark --output bench_matching.json
+    python -m benchmarks.matching_benchmark --sizes 1000 10000 --compare bench_matching.json
+"""
+import argparse
+import json
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.db.models.user_model import User
+from app.db.models.event_signup_model import EventSignup
+from app.db.models import chat_room_model, chat_room_participant_model  # noqa: F401 注册表结构
+from app.services.incremental_matching import IncrementalMatcher
+from app.services.matching_engine import get_matching_engine, match_sharded
+from app.services.matching_service import MatchingService
+
+EVENT_DATE = date(2025, 1, 1)
+LEVEL_COUNT = 10 # 英语水平取值 1..LEVEL_COUNT
+INDUSTRY_COUNT = 12
+SEED_CHUNK_SIZE = 5000
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DISTRIBUTIONS = ["uniform", "skewed", "bimodal"]
+STRATEGIES = ["greedy", "optimal", "optimal-sharded", "incremental"]
+MODES = ["memory", "sqlite"]
+
+
+def generate_levels(size: int, distribution: str, rng: np.random.Generator) -> np.ndarray:
+    if distribution == "uniform":
+        levels = rng.integers(1, LEVEL_COUNT + 1, size)
+    elif distribution == "skewed":
+        # 大多数用户集中在低水平
+        levels = rng.geometric(0.35, size)
+    elif distribution == "bimodal":
+        # 初级和中高级两个峰
+        centers = np.where(rng.random(size) < 0.5, LEVEL_COUNT * 0.3, LEVEL_COUNT * 0.75)
+        levels = np.rint(rng.normal(centers, 1.0))
+    else:
+        raise ValueError(f"未知的分布: {distribution}")
+    return np.clip(levels, 1, LEVEL_COUNT).astype(np.int64)
+
+
+def generate_population(size: int, distribution: str, seed: int):
+    rng = np.random.default_rng(seed)
+    user_ids = np.arange(1, size + 1, dtype=np.int64)
+    return user_ids, generate_levels(size, distribution, rng), rng.integers(0, INDUSTRY_COUNT, size).astype(np.int32)
+
+
+def run_memory(strategy: str, user_ids, levels, industries, seed: int, workers: int) -> Dict:
+    """纯内存模式：只运行匹配算法本身"""
+    if strategy == "incremental":
+        matcher = IncrementalMatcher(EVENT_DATE)
+        for user_id, level in zip(user_ids.tolist(), levels.tolist()):
+            matcher.add_signup(user_id, level)
+        matcher.finalize()
+        return {
+            "rooms": len(matcher.rooms),
+            "unmatched": len(matcher.unmatched_user_ids),
+            "three_person_rooms": sum(1 for room in matcher.rooms if len(room) == 3),
+            "mean_level_gap": matcher.mean_level_gap,
+        }
+    if strategy == "optimal-sharded":
+        plan = match_sharded(get_matching_engine("optimal"), user_ids, levels, industries, seed=seed, workers=workers)
+    else:
+        plan = get_matching_engine(strategy).match(user_ids, levels, industries, seed=seed)
+    return {
+        "rooms": plan.room_count,
+        "unmatched": len(plan.unmatched_ids),
+        "three_person_rooms": plan.three_person_rooms,
+        "mean_level_gap": plan.mean_level_gap,
+    }
+
+
+def seed_sqlite(user_ids, levels, industries) -> Session:
+    db_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(db_engine)
+    db = Session(db_engine)
+    now = datetime.utcnow()
+    ids, lvls, inds = user_ids.tolist(), levels.tolist(), industries.tolist()
+    for start in range(0, len(ids), SEED_CHUNK_SIZE):
+        chunk = range(start, min(start + SEED_CHUNK_SIZE, len(ids)))
+        db.exec(User.__table__.insert(), params=[
+            {"id": ids[i], "openid": f"bench_{ids[i]}", "eng_level": lvls[i], "industry": f"industry_{inds[i]}", "is_active": True}
+            for i in chunk
+        ])
+        db.exec(EventSignup.__table__.insert(), params=[
+            {"user_id": ids[i], "event_date": EVENT_DATE, "signup_time": now} for i in chunk
+        ])
+    db.commit()
+    return db
+
+
+def run_sqlite(strategy: str, db: Session, seed: int, workers: int, statements: List[int]) -> Dict:
+    """内存 SQLite 模式：完整运行 perform_matching，包括读取报名和批量写入房间"""
+    if strategy == "optimal-sharded":
+        service = MatchingService(db, engine=get_matching_engine("optimal"), seed=seed, workers=workers, incremental=False)
+    elif strategy == "incremental":
+        service = MatchingService(db, seed=seed, incremental=True)
+    else:
+        service = MatchingService(db, engine=get_matching_engine(strategy), seed=seed, workers=1, incremental=False)
+
+    counter = lambda *args: statements.__setitem__(0, statements[0] + 1)
+    event.listen(db.get_bind(), "before_cursor_execute", counter)
+    try:
+        report = service.perform_matching(EVENT_DATE)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", counter)
+    return {
+        "rooms": report.rooms_created,
+        "unmatched": len(report.unmatched_user_ids),
+        "three_person_rooms": report.three_person_upgrades,
+        "mean_level_gap": report.mean_level_gap,
+    }
+
+
+def measure(run: Callable[[], Dict], reset: Optional[Callable[[], None]] = None) -> Dict:
+    """先不开 tracemalloc 测耗时，再单独跑一遍测内存峰值 (tracemalloc 本身会显著拖慢运行)"""
+    started = time.perf_counter()
+    result = run()
+    result["wall_time_s"] = round(time.perf_counter() - started, 4)
+    if reset:
+        reset()
+    tracemalloc.start()
+    run()
+    result["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    tracemalloc.stop()
+    return result
+
+
+def run_case(size: int, distribution: str, strategy: str, mode: str, seed: int, workers: int) -> Dict:
+    user_ids, levels, industries = generate_population(size, distribution, seed)
+    case = {"size": size, "distribution": distribution, "strategy": strategy, "mode": mode}
+    if mode == "memory":
+        case.update(measure(lambda: run_memory(strategy, user_ids, levels, industries, seed, workers)))
+        case["statements"] = 0
+        return case
+
+    db = seed_sqlite(user_ids, levels, industries)
+    statements = [0]
+
+    def reset():
+        db.exec(chat_room_participant_model.ChatRoomParticipant.__table__.delete())
+        db.exec(chat_room_model.ChatRoom.__table__.delete())
+        db.commit()
+        statements[0] = 0
+
+    try:
+        case.update(measure(lambda: run_sqlite(strategy, db, seed, workers, statements), reset))
+        case["statements"] = statements[0]
+    finally:
+        db.close()
+    return case
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {
+            (c["size"], c["distribution"], c["strategy"], c["mode"]): c for c in json.load(f)["results"]
+        }
+    print(f"\n与 {baseline_path} 对比 (耗时比 / 语句数 / 轮空人数):")
+    for case in results:
+        old = baseline.get((case["size"], case["distribution"], case["strategy"], case["mode"]))
+        if not old:
+            continue
+        ratio = case["wall_time_s"] / old["wall_time_s"] if old["wall_time_s"] else float("inf")
+        flag = "  <-- 变慢" if ratio > 1.2 else ""
+        print(
+            f"{case['mode']:>6} {case['strategy']:>15} {case['distribution']:>8} {case['size']:>8}: "
+            f"x{ratio:.2f}  {old['statements']}->{case['statements']}  {old['unmatched']}->{case['unmatched']}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匹配性能基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--distributions", nargs="+", default=DISTRIBUTIONS, choices=DISTRIBUTIONS)
+    parser.add_argument("--strategies", nargs="+", default=STRATEGIES, choices=STRATEGIES)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--sqlite-max-size", type=int, default=100_000, help="SQLite 模式只运行不超过此人数的规模")
+    parser.add_argument("--workers", type=int, default=4, help="optimal-sharded 策略的进程数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        for size in args.sizes:
+            if mode == "sqlite" and size > args.sqlite_max_size:
+                continue
+            for distribution in args.distributions:
+                for strategy in args.strategies:
+                    case = run_case(size, distribution, strategy, mode, args.seed, args.workers)
+                    results.append(case)
+                    print(
+                        f"{mode:>6} {strategy:>15} {distribution:>8} {size:>8}: {case['wall_time_s']:.3f}s "
+                        f"peak={case['peak_memory_mb']}MB stmts={case['statements']} rooms={case['rooms']} "
+                        f"gap={case['mean_level_gap']:.3f} unmatched={case['unmatched']}"
+                    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"revision": git_revision(), "created_at": datetime.utcnow().isoformat(), "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/metrics_benchmark.py
+"""
+MetricsMiddleware 的单次请求开销。
+
+直接在事件循环中调用一个最简单的 ASGI 应用 (写入 scope["route"] 后发出 200 响应) --requests 次，
+分别测不加中间件和加上 MetricsMiddleware 的耗时，两者之差除以请求数即为中间件的开销。重复 --rounds 轮取最小值，减少抖动的影响。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.metrics_benchmark --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import metrics
+
+
+class _Route:
+    path = "/api/v1/matches/me"
+
+
+ROUTE = _Route()
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"null"}
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def run(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/matches/me"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetricsMiddleware 的单次请求开销")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    middleware = metrics.MetricsMiddleware(endpoint)
+    baseline = min(asyncio.run(run(endpoint, args.requests)) for _ in range(args.rounds))
+    measured = min(asyncio.run(run(middleware, args.requests)) for _ in range(args.rounds))
+    overhead_us = (measured - baseline) / args.requests * 1e6
+    print(f"{args.requests} 个请求 x {args.rounds} 轮 (取最小值)")
+    print(f"  不加中间件: {baseline / args.requests * 1e6:.2f} us/请求")
+    print(f"  MetricsMiddleware: {measured / args.requests * 1e6:.2f} us/请求")
+    print(f"  中间件开销: {overhead_us:.2f} us/请求")
+    print(f"  记录的请求数: {sum(m.count for m in metrics.registry.routes.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/pair_history_benchmark.py
+"""
+同房记录索引 (PairHistoryIndex) 的基准测试。
+
+合成 N 个用户连续 D 天的匹配结果 (默认 100k 用户 × 30 天，每天约 80% 的用户报名)，测量：
+索引构建耗时与大小、批量/单次查询耗时，以及 optimal 引擎在使用同房记录前后的匹配耗时和重复同房对数。
+加 --sqlite 时还会把房间写入内存 SQLite，测量 build_pair_history 的完整耗时 (一次范围查询 + 构建)。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.pair_history_benchmark
+    python -m benchmarks.pair_history_benchmark --users 100000 --days 30 --sqlite
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.db.models.chat_room_model import ChatRoom
+from app.db.models.chat_room_participant_model import ChatRoomParticipant
+from app.db.models import user_model, event_signup_model  # noqa: F401 注册表结构
+from app.services.matching_engine import get_matching_engine
+from app.services.pair_history import PairHistoryIndex, build_pair_history
+
+EVENT_DATE = date(2025, 2, 1)
+LEVEL_COUNT = 10
+SIGNUP_RATE = 0.8
+LOOKUP_COUNT = 1_000_000
+SCALAR_LOOKUP_COUNT = 10_000
+SEED_CHUNK_SIZE = 20000
+
+
+def generate_history(users: int, days: int, rng: np.random.Generator):
+    """返回按 room_id 排序的 (room_ids, user_ids, room_dates)，每天报名的用户随机两两配对"""
+    room_ids, user_ids, room_dates = [], [], []
+    next_room_id = 1
+    for day in range(days):
+        signed_up = rng.permutation(users)[: int(users * SIGNUP_RATE) // 2 * 2] + 1
+        rooms = len(signed_up) // 2
+        room_ids.append(np.repeat(np.arange(next_room_id, next_room_id + rooms), 2))
+        user_ids.append(signed_up)
+        room_dates.append(np.full(rooms, day))
+        next_room_id += rooms
+    return np.concatenate(room_ids), np.concatenate(user_ids), np.concatenate(room_dates)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def seed_sqlite(room_ids, user_ids, room_dates, days: int) -> Session:
+    db_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(db_engine)
+    db = Session(db_engine)
+    now = datetime.utcnow()
+    first_day = EVENT_DATE - timedelta(days=days)
+    unique_rooms = np.unique(room_ids)
+    for start in range(0, len(unique_rooms), SEED_CHUNK_SIZE):
+        chunk = unique_rooms[start:start + SEED_CHUNK_SIZE]
+        db.exec(ChatRoom.__table__.insert(), params=[
+            {"id": int(r), "event_date": first_day + timedelta(days=int(room_dates[r - 1])), "room_identifier": f"bench_{r}",
+             "created_at": now, "room_type": "2-person"}
+            for r in chunk.tolist()
+        ])
+    rows, users = room_ids.tolist(), user_ids.tolist()
+    for start in range(0, len(rows), SEED_CHUNK_SIZE):
+        db.exec(ChatRoomParticipant.__table__.insert(), params=[
+            {"room_id": rows[i], "user_id": users[i], "joined_at": now}
+            for i in range(start, min(start + SEED_CHUNK_SIZE, len(rows)))
+        ])
+    db.commit()
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同房记录索引基准测试")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sqlite", action="store_true", help="同时测量从内存 SQLite 查询并构建的耗时")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    room_ids, user_ids, room_dates = generate_history(args.users, args.days, rng)
+    print(f"{args.users} 用户 × {args.days} 天: {len(room_ids)} 条房间成员记录")
+
+    index, build_s = timed(lambda: PairHistoryIndex.from_memberships(room_ids, user_ids))
+    print(f"构建索引: {build_s * 1000:.1f}ms, {len(index)} 对, {index.nbytes / 1024 / 1024:.1f}MB")
+
+    a = rng.integers(1, args.users + 1, LOOKUP_COUNT)
+    b = rng.integers(1, args.users + 1, LOOKUP_COUNT)
+    # 一半查询取自真实同房记录，保证命中与未命中都覆盖到
+    half = LOOKUP_COUNT // 2
+    a[:half], b[:half] = user_ids[0:2 * half:2][:half], user_ids[1:2 * half:2][:half]
+    hits, lookup_s = timed(lambda: index.contains_many(a, b))
+    print(f"批量查询 {LOOKUP_COUNT} 次: {lookup_s * 1000:.1f}ms ({lookup_s / LOOKUP_COUNT * 1e9:.0f}ns/次), 命中 {int(hits.sum())}")
+
+    pairs = list(zip(a[:SCALAR_LOOKUP_COUNT].tolist(), b[:SCALAR_LOOKUP_COUNT].tolist()))
+    _, scalar_s = timed(lambda: [index.contains(x, y) for x, y in pairs])
+    print(f"单次查询 {SCALAR_LOOKUP_COUNT} 次: {scalar_s / SCALAR_LOOKUP_COUNT * 1e6:.1f}us/次")
+
+    # 当天报名的用户重新匹配，对比使用同房记录前后
+    match_ids = rng.permutation(args.users)[: int(args.users * SIGNUP_RATE)] + 1
+    match_levels = rng.integers(1, LEVEL_COUNT + 1, len(match_ids))
+    engine = get_matching_engine("optimal")
+    baseline, baseline_s = timed(lambda: engine.match(match_ids, match_levels, seed=args.seed))
+    with_history, history_s = timed(lambda: engine.match(match_ids, match_levels, seed=args.seed, pair_history=index))
+    print(
+        f"optimal 匹配 {len(match_ids)} 人: 不使用同房记录 {baseline_s * 1000:.1f}ms 重复同房 "
+        f"{index.count_repeats(baseline.member_ids, baseline.room_offsets)} 对; "
+        f"使用 {history_s * 1000:.1f}ms 重复同房 {with_history.repeat_pairs} 对"
+    )
+
+    if args.sqlite:
+        db = seed_sqlite(room_ids, user_ids, room_dates, args.days)
+        try:
+            db_index, db_s = timed(lambda: build_pair_history(db, EVENT_DATE, args.days))
+        finally:
+            db.close()
+        print(f"SQLite 范围查询 + 构建: {db_s * 1000:.1f}ms, {len(db_index)} 对")
+
+
+if __name__ == "__main__":
+    main()
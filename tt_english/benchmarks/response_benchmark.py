@@ -0,0 +1,109 @@
+# benchmarks/response_benchmark.py
+"""
+FastAPI 默认响应路径 vs FAST_JSON_RESPONSES 的吞吐量对比。
+
+默认路径中接口返回的模型会按 response_model 再校验一次，经 jsonable_encoder 转成 dict 后再用 json.dumps 编码；
+FAST_JSON_RESPONSES 开启时由模型自带的 pydantic-core 序列化器一次生成 JSON 字节。
+测试对 GET /api/v1/users/me 和 GET /api/v1/matches/me 各发送 --requests 个请求 (httpx ASGITransport 进程内调用)，
+认证缓存和匹配结果快照都已预热，请求不访问数据库，测到的主要是序列化和框架开销。
+两种模式分别在子进程中运行 (设置在导入时读取)，并核对两种模式的响应体完全相同。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.response_benchmark --requests 5000 --concurrency 10
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.db_engine_benchmark import BENCH_DATE, OPENID_PREFIX
+
+MODES = {"default": "false", "fast": "true"}
+ENDPOINTS = {
+    "/users/me": ("/api/v1/users/me", {}),
+    "/matches/me": ("/api/v1/matches/me", {"event_date_str": BENCH_DATE.isoformat()}),
+}
+USERS = 200
+
+
+def run_worker(requests: int, concurrency: int) -> Dict:
+    import httpx
+    from sqlmodel import Session
+
+    from app.core.security import create_access_token
+    from app.db.database import engine
+    from app.main import app
+    from app.services import match_snapshots
+
+    engine.echo = False
+    tokens = [create_access_token({"sub": f"{OPENID_PREFIX}{i}"}) for i in range(USERS)]
+
+    async def main():
+        results = {}
+        async with app.router.lifespan_context(app):
+            with Session(engine) as db:
+                match_snapshots.build_snapshots(db, BENCH_DATE)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, (path, params) in ENDPOINTS.items():
+                    digest = hashlib.sha256()
+                    for token in tokens: # 预热认证缓存，同时记录每个用户的响应体
+                        response = await client.get(path, params=params, headers={"Authorization": f"Bearer {token}"})
+                        digest.update(response.content)
+                    pending = list(range(requests))
+
+                    async def worker():
+                        while pending:
+                            i = pending.pop()
+                            await client.get(path, params=params, headers={"Authorization": f"Bearer {tokens[i % USERS]}"})
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*(worker() for _ in range(concurrency)))
+                    elapsed = time.perf_counter() - started
+                    results[name] = {"throughput_rps": round(requests / elapsed, 1), "body_sha256": digest.hexdigest()[:16]}
+        return results
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="默认响应路径 vs FAST_JSON_RESPONSES 的吞吐量对比")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--db-path", default=os.path.join(tempfile.gettempdir(), "tt_english_response_bench.db"))
+    parser.add_argument("--worker", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print("RESULT " + json.dumps(run_worker(args.requests, args.concurrency)))
+        return
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{args.db_path}")
+    subprocess.run([sys.executable, "-c", f"from benchmarks.db_engine_benchmark import seed; seed({USERS})"], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    print(f"数据库: {args.db_path}, 每个接口 {args.requests} 个请求, 并发 {args.concurrency}")
+    results = {}
+    for mode, flag in MODES.items():
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.response_benchmark", "--worker", mode,
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=dict(env, FAST_JSON_RESPONSES=flag), check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(next(line for line in output.splitlines() if line.startswith("RESULT "))[len("RESULT "):])
+    for name in ENDPOINTS:
+        default, fast = results["default"][name], results["fast"][name]
+        same = "响应体一致" if default["body_sha256"] == fast["body_sha256"] else "响应体不一致!"
+        print(
+            f"{name:>12}: 默认 {default['throughput_rps']} req/s, FAST_JSON_RESPONSES {fast['throughput_rps']} req/s "
+            f"({fast['throughput_rps'] / default['throughput_rps']:.2f}x), {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/signup_benchmark.py
+"""
+报名接口基准测试：模拟报名窗口刚开放时的集中报名。
+
+N 个用户以 C 的并发同时调用 POST /api/v1/events/signup (通过 httpx 的 ASGITransport 在进程内调用，不经过网络)，
+分别测量逐个提交 (原有路径) 和组提交 (SIGNUP_GROUP_COMMIT) 的吞吐量和延迟分位数。
+数据库使用配置中的 DATABASE_URL，默认用临时目录下的 SQLite 文件；每种模式开始前会清空当天的报名记录。
+注意：逐个提交路径中每个请求在事件循环上同步等待连接池，并发数超过连接池容量 (默认 5 + 10) 时会卡在取连接上，
+所以默认并发取 10；组提交路径在等待批次前就释放了连接，可以用更高的并发测试。
+
+在 tt_english 目录下运行:
+    python -m benchmarks.signup_benchmark --users 2000 --concurrency 10
+    python -m benchmarks.signup_benchmark --users 2000 --concurrency 200 --modes group-commit
+    DATABASE_URL=mysql+mysqlconnector://... python -m benchmarks.signup_benchmark
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'tt_english_signup_bench.db')}")
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+from sqlmodel import Session, SQLModel, delete, select
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.database import engine
+from app.db.models.event_signup_model import EventSignup
+from app.db.models.user_model import User
+from app.main import app
+from app.utils import time_utils
+
+MODES = ["per-request", "group-commit"]
+OPENID_PREFIX = "signup_bench_"
+
+
+def seed_users(count: int) -> List[str]:
+    """准备 count 个测试用户，返回各自的访问令牌"""
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        existing = set(db.exec(select(User.openid).where(User.openid.startswith(OPENID_PREFIX))).all())
+        missing = [f"{OPENID_PREFIX}{i}" for i in range(count) if f"{OPENID_PREFIX}{i}" not in existing]
+        if missing:
+            db.exec(User.__table__.insert(), params=[
+                {"openid": openid, "eng_level": i % 10 + 1, "is_active": True} for i, openid in enumerate(missing)
+            ])
+            db.commit()
+    return [create_access_token({"sub": f"{OPENID_PREFIX}{i}"}) for i in range(count)]
+
+
+def clear_signups() -> None:
+    today = time_utils.get_current_time_in_local_tz().date()
+    with Session(engine) as db:
+        db.exec(delete(EventSignup).where(EventSignup.event_date == today))
+        db.commit()
+
+
+async def run_mode(mode: str, tokens: List[str], concurrency: int) -> Dict:
+    settings.SIGNUP_GROUP_COMMIT = mode == "group-commit"
+    clear_signups()
+    latencies = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def signup(token: str):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/api/v1/events/signup", headers={"Authorization": f"Bearer {token}"})
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(signup(token) for token in tokens))
+            elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "mode": mode,
+        "requests": len(tokens),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(tokens) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+        "max_ms": round(float(latencies_ms.max()), 2),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报名接口基准测试 (逐个提交 vs 组提交)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    engine.echo = False # 关闭 SQL 日志，否则打印本身就会成为瓶颈
+    # 基准测试不受报名时间窗口限制
+    open_window = time_utils.is_signup_window_open
+    time_utils.is_signup_window_open = lambda: (True, *open_window()[1:])
+
+    tokens = seed_users(args.users)
+    print(f"数据库: {engine.url.render_as_string(hide_password=True)}")
+    for mode in args.modes:
+        result = asyncio.run(run_mode(mode, tokens, args.concurrency))
+        print(
+            f"{result['mode']:>12}: {result['requests']} 个请求 {result['elapsed_s']}s, {result['throughput_rps']} req/s, "
+            f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, max {result['max_ms']}ms, 状态码 {result['statuses']}"
+        )
+    clear_signups()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# 计数器并发检查：多个线程同时调用 POST /api/count {"action": "inc"}，检查没有丢失的自增。
+# 原子自增模式下每次返回的计数各不相同，恰好是 1..N；写回模式下写入数据库后的计数等于自增次数。
+# 在项目根目录下运行 (默认连接 config 中的 MySQL，可用 DATABASE_URI 指定其他数据库):
+#     DATABASE_URI=sqlite:////tmp/counter.db python -m wxcloudrun.check_counter_concurrency --threads 32 --increments 50
+#     DATABASE_URI=sqlite:////tmp/counter.db python -m wxcloudrun.check_counter_concurrency --write-behind
+import argparse
+import json
+import sys
+import threading
+import time
+
+from wxcloudrun import app, counter, db
+from wxcloudrun.dao import query_counterbyid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='计数器并发自增检查')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--increments', type=int, default=50, help='每个线程的自增次数')
+    parser.add_argument('--write-behind', action='store_true', help='检查写回模式')
+    args = parser.parse_args()
+
+    app.config['COUNTER_WRITE_BEHIND'] = args.write_behind
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # SQLite 同时只允许一个写事务，其他连接最多等待 30 秒拿到写锁 (默认 5 秒，高并发下会报 database is locked)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    with app.app_context():
+        db.create_all()
+        counter.clear(1)
+
+    barrier = threading.Barrier(args.threads)
+    results = [[] for _ in range(args.threads)]
+    errors = []
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(args.increments):
+            body = json.loads(client.post('/api/count', json={'action': 'inc'}).data)
+            if body['code'] != 0:
+                errors.append(body)
+            else:
+                results[index].append(body['data'])
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        if args.write_behind:
+            counter.flush()
+        stored = query_counterbyid(1)
+        stored = 0 if stored is None else stored.count
+
+    expected = args.threads * args.increments
+    returned = sorted(value for values in results for value in values)
+    print('{} 次自增, {:.2f}s ({:.0f} 次/秒), 失败 {} 次, 数据库中的计数 {}'.format(
+        expected, elapsed, expected / elapsed, len(errors), stored))
+    ok = not errors and stored == expected
+    if not args.write_behind and returned != list(range(1, expected + 1)):
+        print('返回的计数有重复或缺失')
+        ok = False
+    print('通过' if ok else '失败: 有丢失的自增')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
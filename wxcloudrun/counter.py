@@ -0,0 +1,123 @@
+# 计数器的自增与读取
+# 默认每次自增执行一条原子的 INSERT ... ON DUPLICATE KEY UPDATE count = count + 1 (见 dao.increment_counterbyid)。
+# 开启 COUNTER_WRITE_BEHIND 时自增只在内存中累加，由后台线程每隔 COUNTER_FLUSH_INTERVAL 秒合并成一条语句写入，
+# 进程退出时再写入一次。返回的计数为数据库中的值加上本进程尚未写入的增量。
+# 数据库中的值缓存 COUNTER_CACHE_TTL 秒，GET /api/count 在缓存有效期内不查询数据库。
+import atexit
+import logging
+import threading
+import time
+
+from wxcloudrun import app
+from wxcloudrun.dao import delete_counterbyid, increment_counterbyid, query_counterbyid
+
+# 初始化日志
+logger = logging.getLogger('log')
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # 写入与清零互斥，清零后不会再写入清零前的增量
+_pending = {}  # id -> 尚未写入数据库的增量
+_in_flight = {}  # id -> 正在写入数据库的增量
+_cache = {}  # id -> (数据库中的值, 过期时间)
+_flusher = None
+
+
+def _cache_put(id, value):
+    # 调用方需持有 _lock。并发自增的结果可能乱序到达，有效期内只保留较大的值
+    cached = _cache.get(id)
+    if cached is not None and cached[1] > time.monotonic() and cached[0] > value:
+        return
+    _cache[id] = (value, time.monotonic() + app.config['COUNTER_CACHE_TTL'])
+
+
+def _stored_count(id):
+    with _lock:
+        cached = _cache.get(id)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    counter = query_counterbyid(id)
+    value = 0 if counter is None else counter.count
+    with _lock:
+        _cache_put(id, value)
+    return value
+
+
+def get_count(id):
+    """
+    :return: 计数的值 (包含本进程尚未写入数据库的增量)
+    """
+    stored = _stored_count(id)
+    with _lock:
+        return stored + _pending.get(id, 0) + _in_flight.get(id, 0)
+
+
+def increment(id):
+    """
+    :return: 自增后的计数，数据库出错时返回None
+    """
+    if not app.config['COUNTER_WRITE_BEHIND']:
+        value = increment_counterbyid(id)
+        if value is not None:
+            with _lock:
+                _cache_put(id, value)
+        return value
+
+    _start_flusher()
+    with _lock:
+        _pending[id] = _pending.get(id, 0) + 1
+    return get_count(id)
+
+
+def clear(id):
+    """
+    清零，同时丢弃尚未写入的增量
+    """
+    with _flush_lock:
+        with _lock:
+            _pending.pop(id, None)
+            _cache.pop(id, None)
+        delete_counterbyid(id)
+
+
+def flush():
+    """
+    把内存中累加的增量写入数据库，需在应用上下文中调用。写入失败的增量留到下次
+    """
+    with _flush_lock:
+        with _lock:
+            batch = dict(_pending)
+            _pending.clear()
+            _in_flight.update(batch)
+        for id, delta in batch.items():
+            value = increment_counterbyid(id, delta)
+            with _lock:
+                del _in_flight[id]
+                if value is None:
+                    _pending[id] = _pending.get(id, 0) + delta
+                else:
+                    _cache_put(id, value)
+
+
+def _flush_in_app_context():
+    with app.app_context():
+        flush()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(app.config['COUNTER_FLUSH_INTERVAL'])
+        try:
+            _flush_in_app_context()
+        except Exception as e:
+            logger.info("counter flush errorMsg= {} ".format(e))
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name='counter-flusher', daemon=True)
+            _flusher.start()
+            atexit.register(_flush_in_app_context)
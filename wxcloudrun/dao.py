@@ -1,5 +1,9 @@
 import logging
+import time
+from datetime import datetime
 
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import OperationalError
 
 from wxcloudrun import db
@@ -8,6 +12,9 @@ from wxcloudrun.model import Counters
 # 初始化日志
 logger = logging.getLogger('log')
 
+# 自增遇到锁冲突 (MySQL 锁等待超时 1205 / 死锁 1213，SQLite database is locked) 时的重试次数
+INCREMENT_LOCK_RETRIES = 3
+
 
 def query_counterbyid(id):
     """
@@ -62,3 +69,41 @@ def update_counterbyid(counter):
         db.session.commit()
     except OperationalError as e:
         logger.info("update_counterbyid errorMsg= {} ".format(e))
+
+
+def _is_lock_error(e):
+    code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+    return code in (1205, 1213) or 'database is locked' in str(e.orig)
+
+
+def increment_counterbyid(id, delta=1):
+    """
+    原子地给Counter的值加上delta，记录不存在时以delta插入
+    在数据库中执行 count = count + delta，并发的自增不会互相覆盖。遇到锁冲突时回滚后重试
+    :param id: Counter的ID
+    :param delta: 增量
+    :return: 自增后的值，数据库出错 (或重试后仍有锁冲突) 时返回None
+    """
+    for attempt in range(INCREMENT_LOCK_RETRIES + 1):
+        try:
+            now = datetime.now()
+            table = Counters.__table__
+            values = {'id': id, 'count': delta, 'createdAt': now, 'updatedAt': now}
+            on_conflict = {'count': table.c.count + delta, 'updatedAt': now}
+            # 云托管使用MySQL，本地检查可使用SQLite
+            if db.engine.dialect.name == 'mysql':
+                statement = mysql_insert(table).values(**values).on_duplicate_key_update(**on_conflict)
+            else:
+                statement = sqlite_insert(table).values(**values).on_conflict_do_update(index_elements=[table.c.id], set_=on_conflict)
+            db.session.execute(statement)
+            # 在同一事务中读取，行锁在提交前不会释放，读到的就是本次自增后的值
+            count = db.session.query(Counters.count).filter(Counters.id == id).scalar()
+            db.session.commit()
+            return count
+        except OperationalError as e:
+            db.session.rollback()
+            if _is_lock_error(e) and attempt < INCREMENT_LOCK_RETRIES:
+                time.sleep(0.01 * (attempt + 1))
+                continue
+            logger.info("increment_counterbyid errorMsg= {} ".format(e))
+            return None
@@ -1,8 +1,6 @@
-from datetime import datetime
 from flask import render_template, request
 from run import app
-from wxcloudrun.dao import delete_counterbyid, query_counterbyid, insert_counter, update_counterbyid
-from wxcloudrun.model import Counters
+from wxcloudrun import counter
 from wxcloudrun.response import make_succ_empty_response, make_succ_response, make_err_response
 
 
@@ -32,24 +30,14 @@ def count():
 
     # 执行自增操作
     if action == 'inc':
-        counter = query_counterbyid(1)
-        if counter is None:
-            counter = Counters()
-            counter.id = 1
-            counter.count = 1
-            counter.created_at = datetime.now()
-            counter.updated_at = datetime.now()
-            insert_counter(counter)
-        else:
-            counter.id = 1
-            counter.count += 1
-            counter.updated_at = datetime.now()
-            update_counterbyid(counter)
-        return make_succ_response(counter.count)
+        value = counter.increment(1)
+        if value is None:
+            return make_err_response('计数失败')
+        return make_succ_response(value)
 
     # 执行清0操作
     elif action == 'clear':
-        delete_counterbyid(1)
+        counter.clear(1)
         return make_succ_empty_response()
 
     # action参数错误
@@ -62,5 +50,4 @@ def get_count():
     """
     :return: 计数的值
     """
-    counter = Counters.query.filter(Counters.id == 1).first()
-    return make_succ_response(0) if counter is None else make_succ_response(counter.count)
+    return make_succ_response(counter.get_count(1))